@@ -0,0 +1,233 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+from .app_version import version
+from .arguments import parser as argparse
+
+# Bump this whenever the format of the key or of cache entries changes.
+_key_version = 1
+_default_size = 5 * 1024 ** 3
+_size_file = '.size'
+_size_suffixes = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+
+def cache_dir():
+    path = os.getenv('BFG9000_ACTION_CACHE')
+    if path:
+        return path
+    base = os.getenv('XDG_CACHE_HOME') or os.path.join(
+        os.path.expanduser('~'), '.cache'
+    )
+    return os.path.join(base, 'bfg9000', 'actions')
+
+
+def parse_size(size):
+    size = size.strip().upper()
+    scale = _size_suffixes.get(size[-1:], 1)
+    if scale != 1:
+        size = size[:-1]
+    return int(size) * scale
+
+
+def cache_size():
+    size = os.getenv('BFG9000_ACTION_CACHE_SIZE')
+    return _default_size if size is None else parse_size(size)
+
+
+def _hash_file(path, h):
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+
+
+def _hash_input(path):
+    h = hashlib.sha256()
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for i in sorted(files):
+                full = os.path.join(root, i)
+                h.update(os.path.relpath(full, path).encode('utf-8') + b'\0')
+                _hash_file(full, h)
+    elif os.path.exists(path):
+        _hash_file(path, h)
+    else:
+        return None
+    return h.hexdigest()
+
+
+def action_key(command, inputs, environment=()):
+    data = [_key_version, list(command), sorted(environment),
+            [(i, _hash_input(i)) for i in inputs]]
+    return hashlib.sha256(json.dumps(data).encode('utf-8')).hexdigest()
+
+
+def _entry_dir(root, key):
+    return os.path.join(root, key[:2], key)
+
+
+def _remove(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    elif os.path.lexists(path):
+        os.remove(path)
+
+
+def _size(path):
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, i))
+               for root, _, files in os.walk(path) for i in files)
+
+
+def _read_size(root):
+    try:
+        with open(os.path.join(root, _size_file)) as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def _write_size(root, size):
+    fd, tmp = tempfile.mkstemp(dir=root, prefix='.tmp-')
+    with os.fdopen(fd, 'w') as f:
+        f.write(str(size))
+    os.replace(tmp, os.path.join(root, _size_file))
+
+
+def fetch(key, outputs, root=None):
+    entry = _entry_dir(root or cache_dir(), key)
+    items = [os.path.join(entry, str(i)) for i in range(len(outputs))]
+
+    if not all(os.path.lexists(i) for i in items):
+        return False
+
+    # Copy the outputs out of the cache rather than hard-linking them so that
+    # modifying an output in place can't corrupt the cache entry.
+    for item, out in zip(items, outputs):
+        _remove(out)
+        if os.path.isdir(item):
+            shutil.copytree(item, out)
+        else:
+            shutil.copy2(item, out)
+        # Restored outputs should look newer than the inputs that produced
+        # them.
+        os.utime(out, None)
+    os.utime(entry, None)
+    return True
+
+
+def store(key, outputs, root=None, max_size=None):
+    root = root or cache_dir()
+    entry = _entry_dir(root, key)
+    if os.path.exists(entry):
+        os.utime(entry, None)
+        return
+
+    # Populate the entry in a temporary directory and move it into place
+    # afterwards so that concurrent builds never see a partial entry.
+    os.makedirs(os.path.dirname(entry), exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=root, prefix='.tmp-')
+    try:
+        for i, out in enumerate(outputs):
+            item = os.path.join(tmp, str(i))
+            if os.path.isdir(out):
+                shutil.copytree(out, item)
+            else:
+                shutil.copy2(out, item)
+        os.rename(tmp, entry)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not os.path.exists(entry):
+            raise
+        # Another build stored this entry first.
+        return
+
+    # Keep a running total of the cache's size so that we only need to look
+    # at every entry once the cache has actually grown too large. The total
+    # may drift a bit if several builds store entries at once, but `evict`
+    # recalculates it from scratch.
+    if max_size is None:
+        max_size = cache_size()
+    total = _read_size(root)
+    if total is None:
+        evict(root, max_size)
+    elif total + _size(entry) > max_size:
+        # Leave some room so that the next few stores don't need to evict
+        # again right away.
+        evict(root, max_size * 9 // 10)
+    else:
+        _write_size(root, total + _size(entry))
+
+
+def evict(root, max_size):
+    # Drop the least-recently used entries until the cache fits. Entries are
+    # touched whenever they're fetched, so their mtime tracks their last use.
+    entries = []
+    for prefix in os.listdir(root):
+        prefix_dir = os.path.join(root, prefix)
+        if prefix.startswith('.') or not os.path.isdir(prefix_dir):
+            continue
+        for i in os.listdir(prefix_dir):
+            path = os.path.join(prefix_dir, i)
+            entries.append((os.stat(path).st_mtime, _size(path), path))
+
+    total = sum(i[1] for i in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_size:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+
+    _write_size(root, total)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='bfg9000-actioncache',
+        usage=('%(prog)s {fetch,store} [-i INPUT...] -o OUTPUT... ' +
+               '[-e NAME=VALUE...] -- COMMAND...'),
+        description=('Fetch the outputs of a command from the action ' +
+                     'cache, or store them after running the command. The ' +
+                     'cache key is formed from the command, its ' +
+                     'environment, and the contents of its inputs.')
+    )
+    parser.add_argument('--version', action='version',
+                        version='%(prog)s ' + version)
+    parser.add_argument('action', choices=['fetch', 'store'],
+                        help='the action to perform')
+    parser.add_argument('-i', '--input', nargs='+', default=[],
+                        metavar='INPUT', dest='inputs',
+                        help='the inputs of the command')
+    parser.add_argument('-o', '--output', nargs='+', required=True,
+                        metavar='OUTPUT', dest='outputs',
+                        help='the outputs of the command')
+    parser.add_argument('-e', '--env', nargs='+', default=[],
+                        metavar='NAME=VALUE', dest='environment',
+                        help='the environment variables set for the command')
+
+    # Everything after `--` is the command line, which we only hash, so split
+    # it off ourselves rather than letting argparse interpret any of it.
+    argv = sys.argv[1:]
+    command = []
+    if '--' in argv:
+        index = argv.index('--')
+        argv, command = argv[:index], argv[index + 1:]
+    args = parser.parse_args(argv)
+
+    # The cache is only an optimization, so problems with it (e.g. a full disk
+    # or a read-only cache directory) shouldn't fail the build. If we can't
+    # fetch the outputs, the command just runs as usual.
+    try:
+        key = action_key(command, args.inputs, args.environment)
+        if args.action == 'fetch':
+            return 0 if fetch(key, args.outputs) else 1
+        store(key, args.outputs)
+    except Exception as e:
+        sys.stderr.write('{}: warning: {}\n'.format(parser.prog, e))
+        return 1 if args.action == 'fetch' else 0
+    return 0
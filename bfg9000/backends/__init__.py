@@ -1,5 +1,6 @@
 import importlib_metadata as metadata
 
+from .. import profiler
 from ..objutils import memoize
 
 
@@ -32,7 +33,9 @@ class BuildRuleHandler:
 
     def run(self, edges, *args, **kwargs):
         for e in edges:
-            self.handlers[type(e)](e, *args, **kwargs)
+            handler = self.handlers[type(e)]
+            with profiler.span(handler.__name__, 'backend'):
+                handler(e, *args, **kwargs)
 
 
 class BuildHook:
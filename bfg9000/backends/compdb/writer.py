@@ -15,6 +15,7 @@ filepath = path.Path('compile_commands.json')
 class CompDB:
     def __init__(self, env):
         self._env = env
+        self._builddir = path.Path('', path.Root.builddir, directory=True)
 
         self._commands = []
 
@@ -25,11 +26,16 @@ class CompDB:
                 self._stringify(i, directory) for i in thing.bits
             )
         elif isinstance(thing, path.BasePath):
-            result = thing.string(self._env.base_dirs)
-            if thing.root == path.Root.builddir:
-                dir_str = directory.string(self._env.base_dirs)
-                return os.path.relpath(result, dir_str)
-            return result
+            if thing.root != path.Root.builddir or directory is None:
+                return thing.string(self._env.base_dirs)
+            # We can usually compute the relative path directly from the
+            # paths' suffixes, which saves us from realizing them first.
+            if directory == self._env.builddir:
+                directory = self._builddir
+            if directory.root == path.Root.builddir:
+                return thing.relpath(directory)
+            return os.path.relpath(thing.string(self._env.base_dirs),
+                                   directory.string(self._env.base_dirs))
         return thing
 
     def _stringify_arguments(self, arguments, directory=None):
@@ -82,5 +88,5 @@ def write(env, build_inputs):
         if type(e) in _rule_handlers:
             _rule_handlers[type(e)](e, build_inputs, buildfile, env)
 
-    with open(filepath.string(env.base_dirs), 'w') as out:
+    with path.write_if_changed(filepath.string(env.base_dirs)) as out:
         buildfile.write(out)
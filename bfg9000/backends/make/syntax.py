@@ -1,4 +1,7 @@
 import re
+import shutil
+import tempfile
+import weakref
 from collections import namedtuple
 from enum import Enum
 from io import StringIO
@@ -8,12 +11,14 @@ from ... import safe_str
 from ... import iterutils
 from ...platforms.host import platform_info
 from ...tools.common import Command
+from ...versioning import SpecifierSet
 
 # XXX: Make currently only supports sh-style shells.
 from ...shell import posix as pshell
 
-__all__ = ['Call', 'Entity', 'Function', 'Makefile', 'NamedEntity', 'Pattern',
-           'qvar', 'Section', 'Silent', 'Syntax', 'Variable', 'var', 'Writer']
+__all__ = ['Call', 'Entity', 'features', 'Function', 'Makefile', 'NamedEntity',
+           'Pattern', 'qvar', 'Section', 'Silent', 'Syntax', 'Variable', 'var',
+           'Writer']
 
 Rule = namedtuple('Rule', ['targets', 'deps', 'order_only', 'recipe',
                            'variables', 'phony'])
@@ -46,6 +51,8 @@ class syntax_string(safe_str.safe_string):
 
 
 class Writer:
+    max_cached_paths = 4096
+
     # For targets and deps, we want to backslash-escape glob characters,
     # whitespace, '#' (comments), and '%' (patterns), plus '~' if it's at the
     # *beginning* of a path. On non-Windows systems, also backslash-escape ':'
@@ -56,9 +63,14 @@ class Writer:
     __target_ex = re.compile(r'(\\*)(^~|[' + __escape_chars + '])')
     __dep_ex = re.compile(r'(\\*)(^~|[|' + __escape_chars + '])')
 
-    def __init__(self, stream, path_vars):
+    def __init__(self, stream, path_vars, path_cache=None):
         self.stream = stream
         self.path_vars = path_vars
+        # Paths are immutable and usually written many times, so remember how
+        # we rendered the most recent ones. Writers for the same path variables
+        # can share this cache.
+        self._paths = {} if path_cache is None else path_cache
+        self._scratch = None
 
     @classmethod
     def escape_str(cls, string, syntax):
@@ -88,6 +100,16 @@ class Writer:
     def write_literal(self, string):
         self.stream.write(string)
 
+    def scratch(self):
+        # Return a writer for rendering a nested string. We reuse the same one
+        # each time to avoid allocating a new writer for every path we write.
+        if self._scratch is None:
+            self._scratch = Writer(StringIO(), self.path_vars)
+        else:
+            self._scratch.stream.seek(0)
+            self._scratch.stream.truncate()
+        return self._scratch
+
     def write(self, thing, syntax, shell_quote=pshell.quote_info):
         thing = safe_str.safe_str(thing)
         shelly = syntax in [Syntax.function, Syntax.shell]
@@ -104,7 +126,7 @@ class Writer:
                 thing, escaped = shell_quote(thing)
             self.write_literal(self.escape_str(thing, syntax))
         elif isinstance(thing, syntax_string):
-            out = Writer(StringIO(), self.path_vars)
+            out = self.scratch()
             escaped = out.write(thing.data, thing.syntax or syntax,
                                 None if thing.quoted else shell_quote)
             result = out.stream.getvalue()
@@ -115,14 +137,22 @@ class Writer:
             for i in thing.bits:
                 escaped |= self.write(i, syntax, shell_quote)
         elif isinstance(thing, path.BasePath):
-            out = Writer(StringIO(), self.path_vars)
-            thing = thing.realize(self.path_vars, shelly)
-            escaped = out.write(thing, syntax, pshell.inner_quote_info)
-
-            thing = out.stream.getvalue()
-            if shelly and escaped:
-                thing = pshell.wrap_quotes(thing)
-            self.write_literal(thing)
+            key = (thing, syntax)
+            try:
+                result, escaped = self._paths[key]
+            except KeyError:
+                out = self.scratch()
+                real = thing.realize(self.path_vars, shelly)
+                escaped = out.write(real, syntax, pshell.inner_quote_info)
+
+                result = out.stream.getvalue()
+                if shelly and escaped:
+                    result = pshell.wrap_quotes(result)
+
+                if len(self._paths) >= self.max_cached_paths:
+                    self._paths.clear()
+                self._paths[key] = (result, escaped)
+            self.write_literal(result)
         else:
             raise TypeError(type(thing))
 
@@ -240,8 +270,28 @@ class Silent:
         self.data = data
 
 
+class _MakeFeatures:
+    _features = {
+        'file': '4.0',
+    }
+
+    def version(self, feature):
+        return self._features[feature]
+
+    def supported(self, feature, version):
+        # `version` is only set for GNU make, so this also rules out any
+        # other make implementations.
+        return version and version in SpecifierSet(
+            '>={}'.format(self.version(feature))
+        )
+
+
+features = _MakeFeatures()
+
+
 class Makefile:
     Section = Section
+    _spool_size = 1024 * 1024
 
     def __init__(self, bfgfile, destdir=False, *, gnu=False):
         self.path_vars = {
@@ -254,14 +304,23 @@ class Makefile:
 
         self._bfgfile = bfgfile
         self._gnu = gnu
+        # Each rule gets its own writer, so share the rendered path strings
+        # between them. These depend on `path_vars`, so make a new cache if
+        # that's replaced.
+        self._path_cache = (None, {})
 
         self._var_table = set()
         self._global_variables = {i: [] for i in Section}
         self._target_variables = []
         self._defines = []
 
-        self._rules = []
+        # Rules are serialized as soon as they're added so that we don't need
+        # to hold the entire build graph in memory. Small files stay in
+        # memory; larger ones spill over to disk.
+        self._rules = tempfile.SpooledTemporaryFile(self._spool_size, 'w+')
+        weakref.finalize(self, self._rules.close)
         self._targets = set()
+        self._target_writer = self.writer(StringIO())
         self._includes = []
 
     def variable(self, name, value, section=Section.other, exist_ok=False):
@@ -290,6 +349,11 @@ class Makefile:
         name = cmd.command_var.upper()
         return self.variable(name, cmd.command, Section.command, exist_ok=True)
 
+    def launcher_var(self, cmd):
+        name = cmd.command_var.upper() + '_LAUNCHER'
+        return self.variable(name, cmd.launcher, Section.command,
+                             exist_ok=True)
+
     def has_variable(self, name):
         return var(name) in self._var_table
 
@@ -305,7 +369,9 @@ class Makefile:
         self._includes.append(Include(name, optional))
 
     def _target_str(self, name):
-        out = self.writer(StringIO())
+        out = self._target_writer
+        out.stream.seek(0)
+        out.stream.truncate()
         out.write(name, Syntax.target)
         return out.stream.getvalue()
 
@@ -325,7 +391,7 @@ class Makefile:
 
         variables = {var(k): v for k, v in (variables or {}).items()}
 
-        self._rules.append(Rule(
+        self._write_rule(self.writer(self._rules), Rule(
             targets, iterutils.listify(deps), iterutils.listify(order_only),
             recipe, variables, phony
         ))
@@ -386,8 +452,15 @@ class Makefile:
                 out.write_shell(cmd)
         out.write_literal('\n\n')
 
+    def _paths(self):
+        path_vars, cache = self._path_cache
+        if path_vars is not self.path_vars:
+            cache = {}
+            self._path_cache = (self.path_vars, cache)
+        return cache
+
     def writer(self, out):
-        return Writer(out, self.path_vars)
+        return Writer(out, self.path_vars, self._paths())
 
     def write(self, out):
         out = self.writer(out)
@@ -419,8 +492,8 @@ class Makefile:
         for name, value in self._defines:
             self._write_define(out, name, value)
 
-        for r in self._rules:
-            self._write_rule(out, r)
+        self._rules.seek(0)
+        shutil.copyfileobj(self._rules, out.stream)
 
         for i in self._includes:
             out.write_literal(('-' if i.optional else '') + 'include ')
@@ -28,6 +28,7 @@ def version(env=os.environ):
 priority = 2
 filepath = path.Path('Makefile')
 dir_sentinel = '.dir'
+_force_name = '.bfg_force'
 
 rule_handler = BuildRuleHandler()
 pre_rules_hook = BuildHook()
@@ -45,7 +46,8 @@ def write(env, build_inputs):
     rule_handler.run(build_inputs.edges(), build_inputs, buildfile, env)
     post_rules_hook.run(build_inputs, buildfile, env)
 
-    with open(filepath.string(env.base_dirs), 'w') as out:
+    with path.write_if_changed(filepath.string(env.base_dirs),
+                               touch=True) as out:
         buildfile.write(out)
 
 
@@ -56,18 +58,43 @@ def flags_vars(name, value, buildfile):
     return gflags, flags
 
 
+def shared_flags_var(name, index, value, buildfile):
+    return buildfile.variable('{}_{}'.format(name.upper(), index), value,
+                              Section.flags, True)
+
+
 def _get_path(thing):
     return thing if isinstance(thing, path.Path) else thing.path
 
 
+def force_target(buildfile):
+    if not buildfile.has_rule(_force_name):
+        buildfile.rule(target=_force_name, phony=True)
+    return _force_name
+
+
 def multitarget_rule(build_inputs, buildfile, targets, deps=None,
                      order_only=None, recipe=None, variables=None, phony=None,
-                     clean_stamp=True):
+                     clean_stamp=True, restat=False):
     targets = listify(targets)
-    if len(targets) > 1:
+    if len(targets) > 1 or restat:
         first = targets[0]
         primary = _get_path(first).addext('.stamp')
-        buildfile.rule(target=targets, deps=[primary])
+        # When restatting, the recipe may leave the targets' timestamps alone
+        # if they're unchanged. Give the targets a no-op recipe so that Make
+        # checks their timestamps again instead of assuming they changed. If a
+        # target is missing, though, the stamp could still be up to date, so
+        # make the stamp depend on a phony target to force it to be rebuilt.
+        if restat:
+            target_recipe = [Silent([':'])]
+            deps = listify(deps) + [Function(
+                'if', Function('filter-out', Function('wildcard', targets),
+                               targets),
+                force_target(buildfile)
+            )]
+        else:
+            target_recipe = None
+        buildfile.rule(target=targets, deps=[primary], recipe=target_recipe)
         recipe = listify(recipe) + [Silent([ 'touch', qvar('@') ])]
         if clean_stamp:
             build_inputs.add_target(file_types.File(primary))
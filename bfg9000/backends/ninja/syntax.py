@@ -1,5 +1,9 @@
 import re
+import shutil
+import tempfile
+import weakref
 from collections import namedtuple
+from contextlib import contextmanager
 from enum import Enum
 from io import StringIO
 
@@ -14,8 +18,9 @@ from ...versioning import SpecifierSet, Version
 __all__ = ['features', 'NinjaFile', 'Section', 'Syntax', 'var', 'Variable',
            'Writer']
 
-Rule = namedtuple('Rule', ['command', 'depfile', 'deps', 'description',
-                           'generator', 'pool', 'restat'])
+Rule = namedtuple('Rule', ['command', 'depfile', 'deps', 'rspfile',
+                           'rspfile_content', 'description', 'generator',
+                           'pool', 'restat'])
 Build = namedtuple('Build', ['outputs', 'rule', 'inputs', 'implicit',
                              'order_only', 'variables'])
 
@@ -30,10 +35,17 @@ _comment_tmpl = """
 
 
 class Writer:
-    def __init__(self, stream, path_vars, shell=shell):
+    max_cached_paths = 4096
+
+    def __init__(self, stream, path_vars, shell=shell, path_cache=None):
         self.stream = stream
         self.path_vars = path_vars
+        # Paths are immutable and usually written many times, so remember how
+        # we rendered the most recent ones. Writers for the same path variables
+        # can share this cache.
+        self._paths = {} if path_cache is None else path_cache
         self.shell = shell
+        self._scratch = None
 
     @staticmethod
     def escape_str(string, syntax):
@@ -55,6 +67,16 @@ class Writer:
     def write_literal(self, string):
         self.stream.write(string)
 
+    def scratch(self):
+        # Return a writer for rendering a nested string. We reuse the same one
+        # each time to avoid allocating a new writer for every path we write.
+        if self._scratch is None:
+            self._scratch = Writer(StringIO(), self.path_vars, self.shell)
+        else:
+            self._scratch.stream.seek(0)
+            self._scratch.stream.truncate()
+        return self._scratch
+
     def write(self, thing, syntax, shell_quote=iterutils.default_sentinel):
         if shell_quote is iterutils.default_sentinel:
             shell_quote = self.shell.quote_info
@@ -76,14 +98,22 @@ class Writer:
             for i in thing.bits:
                 escaped |= self.write(i, syntax, shell_quote)
         elif isinstance(thing, path.BasePath):
-            out = Writer(StringIO(), self.path_vars, self.shell)
-            thing = thing.realize(self.path_vars, shelly)
-            escaped = out.write(thing, syntax, self.shell.inner_quote_info)
-
-            thing = out.stream.getvalue()
-            if shelly and escaped:
-                thing = self.shell.wrap_quotes(thing)
-            self.write_literal(thing)
+            key = (thing, syntax, self.shell)
+            try:
+                result, escaped = self._paths[key]
+            except KeyError:
+                out = self.scratch()
+                real = thing.realize(self.path_vars, shelly)
+                escaped = out.write(real, syntax, self.shell.inner_quote_info)
+
+                result = out.stream.getvalue()
+                if shelly and escaped:
+                    result = self.shell.wrap_quotes(result)
+
+                if len(self._paths) >= self.max_cached_paths:
+                    self._paths.clear()
+                self._paths[key] = (result, escaped)
+            self.write_literal(result)
         else:
             raise TypeError(type(thing))
 
@@ -138,6 +168,7 @@ def var(v):
 class _NinjaFeatures:
     _features = {
         'console': '1.5',
+        'pool': '1.1',
     }
 
     def version(self, feature):
@@ -154,6 +185,7 @@ features = _NinjaFeatures()
 
 class NinjaFile:
     Section = Section
+    _spool_size = 1024 * 1024
 
     def __init__(self, bfgfile, destdir=False):
         self.path_vars = {
@@ -165,17 +197,33 @@ class NinjaFile:
             self.path_vars[path.DestDir.destdir] = Variable('DESTDIR')
 
         self._bfgfile = bfgfile
+        # Each build statement gets its own writer, so share the rendered path
+        # strings between them. These depend on `path_vars`, so make a new
+        # cache if that's replaced.
+        self._path_cache = (None, {})
 
         self._min_version = None
         self._var_table = set()
         self._variables = {i: [] for i in Section}
 
+        self._pools = {}
         self._rules = {}
 
-        self._builds = []
+        # Build statements are serialized as soon as they're added so that we
+        # don't need to hold the entire build graph in memory. Small files
+        # stay in memory; larger ones spill over to disk.
+        self._builds = self._main_builds = self._spool()
         self._build_outputs = set()
+        self._fragments = {}
+        self._output_writer = self.writer(StringIO())
         self._defaults = []
 
+    def _spool(self):
+        # Close the spooled file once we're done with this object.
+        spool = tempfile.SpooledTemporaryFile(self._spool_size, 'w+')
+        weakref.finalize(self, spool.close)
+        return spool
+
     def min_version(self, version):
         version = Version(version)
         if self._min_version is None or version > self._min_version:
@@ -196,18 +244,41 @@ class NinjaFile:
         return self.variable(cmd.command_var, cmd.command, Section.command,
                              exist_ok=True)
 
+    def launcher_var(self, cmd):
+        return self.variable(cmd.command_var + '_launcher', cmd.launcher,
+                             Section.command, exist_ok=True)
+
     def has_variable(self, name):
         return var(name) in self._var_table
 
-    def rule(self, name, command, depfile=None, deps=None, description=None,
-             generator=False, pool=None, restat=False):
+    def pool(self, name, depth):
+        if re.search(r'\W', name):
+            raise ValueError('pool name contains invalid characters')
+        if name == 'console' or self.has_pool(name):
+            raise ValueError('pool {!r} already exists'.format(name))
+
+        self.min_version(features.version('pool'))
+        self._pools[name] = depth
+
+    def has_pool(self, name):
+        return name in self._pools
+
+    def _check_pool(self, pool):
+        if pool == 'console':
+            self.min_version(features.version('console'))
+        elif not self.has_pool(pool):
+            raise ValueError('unknown pool {!r}'.format(pool))
+
+    def rule(self, name, command, depfile=None, deps=None, rspfile=None,
+             rspfile_content=None, description=None, generator=False,
+             pool=None, restat=False):
         command = self._convert_args(command)
+        if (rspfile is None) != (rspfile_content is None):
+            raise ValueError('rspfile and rspfile_content must be specified ' +
+                             'together')
 
         if pool is not None:
-            if pool == 'console':
-                self.min_version(features.version('console'))
-            else:
-                raise ValueError('unknown pool {!r}'.format(pool))
+            self._check_pool(pool)
 
         if re.search(r'\W', name):
             raise ValueError('rule name contains invalid characters')
@@ -215,14 +286,17 @@ class NinjaFile:
         if self.has_rule(name):
             raise ValueError('rule {!r} already exists'.format(name))
 
-        self._rules[name] = Rule(command, depfile, deps, description,
-                                 generator, pool, restat)
+        self._rules[name] = Rule(command, depfile, deps, rspfile,
+                                 rspfile_content, description, generator,
+                                 pool, restat)
 
     def has_rule(self, name):
         return name in self._rules
 
     def _output_str(self, name):
-        out = self.writer(StringIO())
+        out = self._output_writer
+        out.stream.seek(0)
+        out.stream.truncate()
         out.write(name, Syntax.output)
         return out.stream.getvalue()
 
@@ -233,6 +307,8 @@ class NinjaFile:
 
         variables = {var(k): self._convert_args(v) for k, v in
                      (variables or {}).items()}
+        if var('pool') in variables:
+            self._check_pool(variables[var('pool')])
 
         outputs = iterutils.listify(output)
         for i in outputs:
@@ -240,15 +316,34 @@ class NinjaFile:
             if self.has_build(out):
                 raise ValueError('build for {!r} already exists'.format(out))
             self._build_outputs.add(out)
-        self._builds.append(Build(
+
+        out = self.writer(self._builds)
+        self._write_build(out, Build(
             outputs, rule, iterutils.listify(inputs),
             iterutils.listify(implicit), iterutils.listify(order_only),
             variables
         ))
+        out.write_literal('\n')
 
     def has_build(self, name):
         return name in self._build_outputs
 
+    @contextmanager
+    def fragment(self, name, bfgfile=None):
+        # Add any builds in this context to a separate file, which will be
+        # included from the main file via `subninja`. Rules and variables are
+        # still added to the main file, since they're shared by everything.
+        if name not in self._fragments:
+            self._fragments[name] = (bfgfile or self._bfgfile, self._spool())
+        old, self._builds = self._builds, self._fragments[name][1]
+        try:
+            yield
+        finally:
+            self._builds = old
+
+    def fragments(self):
+        return iter(self._fragments)
+
     def default(self, paths):
         self._defaults.extend(iterutils.iterate(paths))
 
@@ -272,6 +367,10 @@ class NinjaFile:
             self._write_variable(out, var('depfile'), rule.depfile, indent=1)
         if rule.deps:
             self._write_variable(out, var('deps'), rule.deps, indent=1)
+        if rule.rspfile:
+            self._write_variable(out, var('rspfile'), rule.rspfile, indent=1)
+            self._write_variable(out, var('rspfile_content'),
+                                 rule.rspfile_content, indent=1)
         if rule.description:
             self._write_variable(out, var('description'), rule.description,
                                  indent=1, syntax=Syntax.clean)
@@ -299,8 +398,16 @@ class NinjaFile:
                 syntax = Syntax.clean if k == desc_var else Syntax.shell
                 self._write_variable(out, k, v, indent=1, syntax=syntax)
 
+    def _paths(self):
+        path_vars, cache = self._path_cache
+        if path_vars is not self.path_vars:
+            cache = {}
+            self._path_cache = (self.path_vars, cache)
+        return cache
+
     def writer(self, out, *args, **kwargs):
-        return Writer(out, self.path_vars, *args, **kwargs)
+        return Writer(out, self.path_vars, *args, path_cache=self._paths(),
+                      **kwargs)
 
     def write(self, out):
         out = self.writer(out)
@@ -321,15 +428,32 @@ class NinjaFile:
             if self._variables[section]:
                 out.write_literal('\n')
 
+        for name, depth in self._pools.items():
+            out.write_literal('pool ' + name + '\n')
+            self._write_variable(out, var('depth'), str(depth), indent=1)
+            out.write_literal('\n')
+
         for name, rule in self._rules.items():
             self._write_rule(out, name, rule)
             out.write_literal('\n')
 
-        for build in self._builds:
-            self._write_build(out, build)
+        for name in self._fragments:
+            out.write_literal('subninja ')
+            out.write(name, Syntax.input)
+            out.write_literal('\n')
+        if self._fragments:
             out.write_literal('\n')
 
+        self._main_builds.seek(0)
+        shutil.copyfileobj(self._main_builds, out.stream)
+
         if self._defaults:
             out.write_literal('default ')
             out.write_each(self._defaults, Syntax.input)
             out.write_literal('\n')
+
+    def write_fragment(self, name, out):
+        bfgfile, builds = self._fragments[name]
+        out.write(_comment_tmpl.format(bfgfile) + '\n\n')
+        builds.seek(0)
+        shutil.copyfileobj(builds, out)
@@ -1,6 +1,9 @@
+import itertools
 import os
+import re
 
 from .. import BuildHook, BuildRuleHandler
+from ... import file_types
 from ... import iterutils
 from ... import path
 from ... import shell
@@ -38,12 +41,77 @@ def write(env, build_inputs):
                        Section.path)
 
     pre_rules_hook.run(build_inputs, buildfile, env)
-    rule_handler.run(build_inputs.edges(), build_inputs, buildfile, env)
+    if build_inputs['project']['split_submodules']:
+        for bfgpath, edges in _group_edges(build_inputs):
+            if bfgpath == build_inputs.bfgpath:
+                rule_handler.run(edges, build_inputs, buildfile, env)
+            else:
+                with buildfile.fragment(_fragment_path(bfgpath),
+                                        bfgpath.string(env.base_dirs)):
+                    rule_handler.run(edges, build_inputs, buildfile, env)
+    else:
+        rule_handler.run(build_inputs.edges(), build_inputs, buildfile, env)
+
+    # Fragments are outputs of the regenerate step too, so make sure they get
+    # regenerated if they go missing.
+    fragments = list(buildfile.fragments())
+    build_inputs['regenerate'].outputs.extend(
+        file_types.File(i) for i in fragments
+    )
     post_rules_hook.run(build_inputs, buildfile, env)
 
-    with open(filepath.string(env.base_dirs), 'w') as out:
+    # Fragments aren't touched if they're unchanged so that ninja only needs
+    # to re-read the ones for submodules that actually changed.
+    for i in fragments:
+        filename = i.string(env.base_dirs)
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with path.write_if_changed(filename) as out:
+            buildfile.write_fragment(i, out)
+
+    filename = filepath.string(env.base_dirs)
+    old_fragments = _read_fragments(filename)
+    with path.write_if_changed(filename, touch=True) as out:
         buildfile.write(out)
 
+    # Remove any fragments that we wrote last time but not this time (e.g. for
+    # a submodule that was removed) so they don't linger in the build dir.
+    stale = old_fragments - {os.path.normpath(i.string(env.base_dirs))
+                             for i in fragments}
+    for i in stale:
+        try:
+            os.remove(i)
+        except FileNotFoundError:
+            pass
+
+
+def _read_fragments(filename):
+    # Get the (absolute) paths to the fragments included by an existing main
+    # file. The `subninja` lines all come before any builds, so we can stop
+    # reading there.
+    builddir = os.path.dirname(filename)
+    result = set()
+    try:
+        with open(filename) as f:
+            for line in f:
+                if line.startswith('subninja '):
+                    name = re.sub(r'\$(.)', r'\1', line[9:].rstrip('\n'))
+                    result.add(os.path.normpath(os.path.join(builddir, name)))
+                elif line.startswith('build '):
+                    break
+    except FileNotFoundError:
+        pass
+    return result
+
+
+def _fragment_path(bfgpath):
+    return bfgpath.parent().reroot().append(filepath.basename())
+
+
+def _group_edges(build_inputs):
+    # Group consecutive edges by the build.bfg file that created them.
+    return ((k, list(v)) for k, v in
+            itertools.groupby(build_inputs.edges(), lambda e: e.bfgpath))
+
 
 def flags_vars(name, value, buildfile):
     gflags = buildfile.variable('global_' + name, value, Section.flags, True)
@@ -51,9 +119,14 @@ def flags_vars(name, value, buildfile):
     return gflags, flags
 
 
+def shared_flags_var(name, index, value, buildfile):
+    return buildfile.variable('{}_{}'.format(name, index), value,
+                              Section.flags, True)
+
+
 def command_build(buildfile, env, output, inputs=None, implicit=None,
                   order_only=None, command=[], console=False, phony=False,
-                  description=None):
+                  description=None, pool=None, restat=False):
     if phony:
         extra_implicit = ['PHONY']
         if not buildfile.has_build('PHONY'):
@@ -61,13 +134,20 @@ def command_build(buildfile, env, output, inputs=None, implicit=None,
     else:
         extra_implicit = []
 
-    if console and features.supported('console', env.backend_version):
+    # A step can only be in one pool, so an explicit pool takes priority over
+    # the console pool.
+    if ( console and not pool and
+         features.supported('console', env.backend_version) ):
         rule_name = 'console_command'
         rule_kwargs = {'pool': 'console'}
     else:
         rule_name = 'command'
         rule_kwargs = {}
 
+    if restat:
+        rule_name += '_restat'
+        rule_kwargs['restat'] = True
+
     if not buildfile.has_rule(rule_name):
         buildfile.rule(name=rule_name, command=shell.shell_list([var('cmd')]),
                        **rule_kwargs)
@@ -75,6 +155,8 @@ def command_build(buildfile, env, output, inputs=None, implicit=None,
     variables = {'cmd': command}
     if description:
         variables['description'] = description
+    if pool:
+        variables['pool'] = pool
     buildfile.build(
         output=output,
         rule=rule_name,
@@ -1,7 +1,7 @@
 import os
 from itertools import chain
 
-from . import log
+from . import log, profiler
 from .arguments.parser import ArgumentParser
 from .builtins import builtin, init as builtin_init
 from .build_inputs import BuildInputs, Regenerating
@@ -32,8 +32,10 @@ def is_srcdir(path):
 
 def _execute_script(f, context, path, *, run_hooks=True):
     filename = path.string(context.env.base_dirs)
+    profiler.add_script(filename)
 
-    with pushd(path.parent().string(context.env.base_dirs)), \
+    with profiler.span(path.suffix, 'script', path=filename), \
+         pushd(path.parent().string(context.env.base_dirs)), \
          context.push_path(path) as p:
         if run_hooks:
             context.run_hook('pre_execute_hook')
@@ -114,7 +116,8 @@ def fill_user_help(env, parent):
 
 def configure_build(env, regenerating=Regenerating.false):
     builtin_init()
-    parser, opts_paths = _execute_options(env)
+    with profiler.span('_execute_options', 'configure'):
+        parser, opts_paths = _execute_options(env)
     argv = parser.parse_args(env.extra_args)
 
     bfgpath = Path(builtin.BuildContext.filename, Root.srcdir)
@@ -28,9 +28,14 @@ def build_input(name, args=()):
 
 
 class Edge:
+    __slots__ = ('description', 'pool', 'bfgpath', 'raw_output', 'output',
+                 'public_output', 'extra_deps')
+
     def __init__(self, build, output, final_output=None, extra_deps=None,
-                 description=None):
+                 description=None, pool=None):
         self.description = description
+        self.pool = pool
+        self.bfgpath = build.current_bfgpath
         self.raw_output = output
         self.output = listify(output)
         for i in self.output:
@@ -60,7 +65,7 @@ class BuildInputs:
         self._extra_targets = []
         self._extra_inputs = {}
 
-        self.bfgpath = bfgpath
+        self.bfgpath = self.current_bfgpath = bfgpath
         self.add_bootstrap(bfgpath)
 
         args = {'build_inputs': self, 'env': env}
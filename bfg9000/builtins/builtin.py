@@ -4,6 +4,7 @@ import inspect
 from contextlib import contextmanager
 from itertools import chain
 
+from .. import profiler
 from ..build_inputs import Regenerating
 from ..iterutils import iterate, listify
 from ..platforms.basepath import BasePath
@@ -114,6 +115,17 @@ class BuildContext(StackContext):
         self.regenerating = regenerating
         super().__init__(env)
 
+    @contextmanager
+    def push_path(self, path):
+        # Keep track of the build.bfg file currently being executed so that
+        # edges can remember which submodule created them.
+        old, self.build.current_bfgpath = self.build.current_bfgpath, path
+        try:
+            with super().push_path(path) as p:
+                yield p
+        finally:
+            self.build.current_bfgpath = old
+
 
 class OptionsContext(StackContext):
     kind = 'options'
@@ -159,9 +171,17 @@ class _PartialFunctionBinder(_Binder):
     builtin_bound = 1
 
     def bind(self, context):
-        @functools.wraps(self._fn)
-        def wrapper(*args, **kwargs):
-            return self._fn(context, *args, **kwargs)
+        if profiler.enabled():
+            name = getattr(self._fn, '_builtin_name', self._fn.__name__)
+
+            @functools.wraps(self._fn)
+            def wrapper(*args, **kwargs):
+                with profiler.span(name, 'builtin'):
+                    return self._fn(context, *args, **kwargs)
+        else:
+            @functools.wraps(self._fn)
+            def wrapper(*args, **kwargs):
+                return self._fn(context, *args, **kwargs)
 
         sig = inspect.signature(wrapper)
         params = list(sig.parameters.values())[self.builtin_bound:]
@@ -1,16 +1,18 @@
 from itertools import chain, repeat
 
 from . import builtin
+from .pool import get_pool, make_pool_command, ninja_pool
 from .. import shell
 from ..backends.compdb import writer as compdb
 from ..backends.make import writer as make
 from ..backends.ninja import writer as ninja
 from ..build_inputs import Edge
 from ..file_types import FileOrDirectory, Node, Phony
-from ..iterutils import first, isiterable, iterate, listify
+from ..iterutils import first, isiterable, iterate, listify, uniques
 from ..objutils import convert_each
 from ..path import Path, Root
-from ..safe_str import jbos, safe_str, safe_string
+from ..platforms.host import platform_info
+from ..safe_str import jbos, safe_str, safe_string, shell_literal
 from ..shell import posix as pshell
 
 
@@ -56,7 +58,7 @@ Output = Placeholder('output')
 class BaseCommand(Edge):
     def __init__(self, context, name, outputs, *, cmds, files,
                  environment=None, phony=False, extra_deps=None,
-                 description=None):
+                 description=None, pool=None):
         self.name = name
         self.files = files
         self.phony = phony
@@ -66,7 +68,8 @@ class BaseCommand(Edge):
         implicit.extend(iterate(extra_deps))
 
         super().__init__(context.build, outputs, extra_deps=implicit,
-                         description=description)
+                         description=description,
+                         pool=get_pool(context, pool))
 
         # Do this after Edge.__init__ so that self.output is set for our
         # placeholders.
@@ -100,6 +103,8 @@ class BaseCommand(Edge):
 
 class Command(BaseCommand):
     console = True
+    restat = False
+    hermetic = False
 
     def __init__(self, context, name, **kwargs):
         super().__init__(context, name, Phony(name), phony=True, **kwargs)
@@ -119,7 +124,7 @@ class BuildStep(BaseCommand):
     msbuild_output = True
 
     def __init__(self, context, name, type=None, always_outdated=False,
-                 **kwargs):
+                 restat=False, hermetic=False, **kwargs):
         name = listify(name)
         project_name = name[0]
 
@@ -127,6 +132,8 @@ class BuildStep(BaseCommand):
             type = repeat(type, len(name))
 
         outputs = [self._make_outputs(*i) for i in zip(name, type)]
+        self.restat = restat
+        self.hermetic = hermetic
 
         desc = kwargs.pop('description', 'build => ' + ' '.join(name))
         super().__init__(context, project_name, outputs, phony=always_outdated,
@@ -147,9 +154,44 @@ class BuildStep(BaseCommand):
         return result
 
 
+def _batch_files(files, batch):
+    if batch == 'directory':
+        groups = {}
+        for i in files:
+            groups.setdefault(i.path.parent(), []).append(i)
+        return list(groups.values())
+
+    batch = int(batch)
+    if batch < 1:
+        raise ValueError('batch size must be at least 1')
+    return [files[i:i + batch] for i in range(0, len(files), batch)]
+
+
+def _batch_build_step(context, name, batch, *, files, type, **kwargs):
+    if not callable(name):
+        raise TypeError('name must be a function when batching')
+    if not files:
+        raise ValueError('files must be specified when batching')
+
+    # Each batch becomes one step producing the outputs for all of its input
+    # files, so the command is run once per batch instead of once per file.
+    result = []
+    for i in _batch_files(files, batch):
+        names, types = [], []
+        for f in i:
+            n = listify(name(f.path.suffix))
+            names.extend(n)
+            types.extend(type if isiterable(type) else repeat(type, len(n)))
+        step = BuildStep(context, names, type=types, files=i, **kwargs)
+        result.extend(listify(step.public_output))
+    return result
+
+
 @builtin.function()
-def build_step(context, name, **kwargs):
+def build_step(context, name, *, batch=None, **kwargs):
     kwargs = BuildStep.convert_args(context, kwargs)
+    if batch is not None:
+        return _batch_build_step(context, name, batch, **kwargs)
     return BuildStep(context, name, **kwargs).public_output
 
 
@@ -157,8 +199,52 @@ build_step.input = Input
 build_step.output = Output
 
 
+def _cache_commands(env, rule, cmds, join_lines=shell.join_lines):
+    if not rule.hermetic:
+        return cmds
+
+    # Try to restore the outputs from the action cache, and only if that
+    # fails, run the commands and add their outputs to the cache.
+    inputs = uniques(rule.files + [i for i in rule.extra_deps
+                                   if not isinstance(i, Phony)])
+    actioncache = env.tool('actioncache')
+    args = dict(inputs=inputs, outputs=rule.output, environment=rule.env,
+                cmds=rule.cmds)
+    return [shell.shell_list(
+        actioncache('fetch', **args) +
+        [shell_literal('||'), shell_literal('(')] +
+        join_lines(cmds + [actioncache('store', **args)]) +
+        [shell_literal(')')]
+    )]
+
+
+def restat_commands(env, outputs, cmds, posix=None):
+    # Keep the old timestamps of any outputs that `cmds` rewrite with the same
+    # contents. Sh-style shells can do this themselves, so we only need to run
+    # `bfg9000-keepmtime` for Windows shells.
+    if posix is None:
+        posix = platform_info().family != 'windows'
+    if posix:
+        return [pshell.keep_mtime(outputs, cmds)]
+    keepmtime = env.tool('keepmtime')
+    return ([keepmtime('save', outputs)] + cmds +
+            [keepmtime('restore', outputs)])
+
+
+def _restat_commands(env, rule, cmds, posix=None):
+    if not rule.restat:
+        return cmds
+    return restat_commands(env, rule.output, cmds, posix)
+
+
 @make.rule_handler(Command, BuildStep)
 def make_command(rule, build_inputs, buildfile, env):
+    cmds = rule.cmds
+    if rule.pool:
+        cmds = [make_pool_command(env, rule.pool, pshell.join_lines(cmds))]
+    cmds = _cache_commands(env, rule, cmds, pshell.join_lines)
+    cmds = _restat_commands(env, rule, cmds, posix=True)
+
     # Join all the commands onto one line so that users can use 'cd' and such.
     make.multitarget_rule(
         build_inputs, buildfile,
@@ -166,8 +252,9 @@ def make_command(rule, build_inputs, buildfile, env):
         deps=rule.files + rule.extra_deps,
         order_only=(make.directory_deps(rule.output) if
                     isinstance(rule, BuildStep) else []),
-        recipe=[pshell.global_env(rule.env, rule.cmds)],
-        phony=rule.phony
+        recipe=[pshell.global_env(rule.env, cmds)],
+        phony=rule.phony,
+        restat=rule.restat
     )
 
 
@@ -178,10 +265,14 @@ def ninja_command(rule, build_inputs, buildfile, env):
         output=rule.output,
         inputs=rule.files,
         implicit=rule.extra_deps,
-        command=shell.global_env(rule.env, rule.cmds),
+        command=shell.global_env(rule.env, _restat_commands(
+            env, rule, _cache_commands(env, rule, rule.cmds)
+        )),
         console=rule.console,
         phony=rule.phony,
-        description=rule.description
+        description=rule.description,
+        pool=ninja_pool(buildfile, rule.pool),
+        restat=rule.restat
     )
 
 
@@ -1,9 +1,12 @@
+import hashlib
 from collections import defaultdict
 
 from . import builtin
-from .. import options as opts
+from .. import options as opts, shell
+from .command import restat_commands
 from .path import buildpath, relname, within_directory
-from .file_types import FileList, make_file_list, static_file
+from .file_types import (FileList, make_file_list, make_immediate_file,
+                         static_file)
 from ..backends.compdb import writer as compdb
 from ..backends.make import writer as make
 from ..backends.ninja import writer as ninja
@@ -11,13 +14,15 @@ from ..build_inputs import build_input, Edge
 from ..file_types import *
 from ..iterutils import first, flatten, iterate, unlistify
 from ..objutils import convert_each, convert_one
-from ..path import Path
+from ..path import Path, Root
 from ..shell import posix as pshell
 
 build_input('compile_options')(lambda: defaultdict(list))
+build_input('compile_flags')(lambda: {})
 
 
 class BaseCompile(Edge):
+    __slots__ = ('compiler', 'file', 'user_options', '_internal_options')
     desc_verb = 'compile'
 
     def __init__(self, context, name, internal_options, directory=None,
@@ -60,6 +65,8 @@ class BaseCompile(Edge):
 
 
 class Compile(BaseCompile):
+    __slots__ = ('includes', 'include_deps', 'packages', 'libs', 'pch')
+
     def __init__(self, context, name, *, includes, include_deps, pch, libs,
                  packages, options, lang=None, directory=None, extra_deps=None,
                  description=None):
@@ -125,6 +132,8 @@ class Compile(BaseCompile):
 
 
 class CompileSource(Compile):
+    __slots__ = ()
+
     def __init__(self, context, name, file, *, lang=None, **kwargs):
         builder_lang = lang or getattr(file, 'lang', None)
         if builder_lang is None:
@@ -167,6 +176,7 @@ class CompileSource(Compile):
 
 
 class CompileHeader(Compile):
+    __slots__ = ('pch_source',)
     desc_verb = 'compile-header'
 
     def __init__(self, context, name, file, *, source, lang=None, **kwargs):
@@ -190,10 +200,12 @@ class CompileHeader(Compile):
 
 
 class GenerateSource(BaseCompile):
+    __slots__ = ('restat',)
     desc_verb = 'generate'
 
     def __init__(self, context, name, file, *, options, lang=None,
-                 directory=None, extra_deps=None, description=None):
+                 directory=None, extra_deps=None, description=None,
+                 restat=False):
         builder_lang = lang or getattr(file, 'lang', None)
         if builder_lang is None:
             raise ValueError('unable to determine language for file {!r}'
@@ -201,6 +213,7 @@ class GenerateSource(BaseCompile):
 
         self.file = file
         self.user_options = options
+        self.restat = restat
         self.compiler = context.env.builder(builder_lang).transpiler
         super().__init__(context, name, None, directory, extra_deps,
                          description)
@@ -229,15 +242,115 @@ def object_file(context, name=None, file=None, **kwargs):
     return CompileSource(context, name, file, **kwargs).public_output
 
 
+_unity_langs = {'c', 'c++', 'objc', 'objc++'}
+
+
+def _unity_hash(path):
+    digest = hashlib.sha256(path.suffix.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+def _unity_batches(sources, size):
+    # Split the (sorted) sources into batches of about `size` files. Batch
+    # boundaries are chosen by hashing each file's name: once a batch has at
+    # least `min_size` files, it ends before any file whose hash is a multiple
+    # of `divisor`, which makes batches `size` files long on average. Since a
+    # boundary depends only on the files around it, adding or removing a file
+    # only changes the batches near it instead of shifting every later batch
+    # over by one. The cap of `max_size` files is rarely reached.
+    min_size = max(size // 4, 1)
+    max_size = size * 4
+    divisor = size - min_size + 1
+
+    batch = []
+    for i in sources:
+        if ( len(batch) == max_size or
+             (len(batch) >= min_size and _unity_hash(i.path) % divisor == 0) ):
+            yield batch
+            batch = []
+        batch.append(i)
+    if batch:
+        yield batch
+
+
+def _make_unity_file(context, batch, directory):
+    first = batch[0]
+    path = Path(first.path.stripext('.unity' + first.path.ext()).suffix)
+    if directory:
+        path = within_directory(path, directory)
+    unity = SourceFile(path, first.lang)
+
+    # The unity file is an output of the regenerate step, so if it goes
+    # missing, the build files will be regenerated to restore it.
+    with make_immediate_file(context, unity) as out:
+        for i in batch:
+            out.write('#include "{}"\n'.format(
+                i.path.string(context.env.base_dirs)
+            ))
+    return unity
+
+
+def _unity_sources(context, files, size, exclude, lang):
+    exclude = {context['auto_file'](i, lang=lang).path
+               for i in iterate(exclude)}
+
+    result = []
+    groups = {}
+    for i in iterate(files):
+        file = i
+        if not isinstance(i, File):
+            file = (context['source_file'](i, lang=lang) if lang else
+                    context['auto_file'](i))
+        if ( isinstance(file, SourceFile) and file.creator is None and
+             file.path.root == Root.srcdir and file.lang in _unity_langs and
+             file.path not in exclude ):
+            if file.lang not in groups:
+                groups[file.lang] = []
+                result.append(groups[file.lang])
+            groups[file.lang].append(file)
+        else:
+            result.append(i)
+
+    for i in groups.values():
+        i[:] = _unity_batches(sorted(i, key=lambda x: x.path.suffix), size)
+    return result
+
+
 @builtin.function()
 @builtin.type(FileList, in_type=object)
-def object_files(context, files, **kwargs):
+def object_files(context, files, *, unity=None, unity_exclude=None, **kwargs):
     @builtin.type(ObjectFile, extra_in_type=CodeFile)
     def make_object_file(file, **kwargs):
         file, kwargs = CompileSource.convert_args(context, file, kwargs)
         return CompileSource(context, None, file, **kwargs).public_output
 
-    return make_file_list(context, make_object_file, files, **kwargs)
+    if unity is None:
+        unity = context.build['project']['unity']
+    if not unity:
+        return make_file_list(context, make_object_file, files, **kwargs)
+
+    # Like with `generated_source`, the unity files go in `directory`, so the
+    # object files built from them will automatically go there as well.
+    directory = kwargs.get('directory')
+    if directory:
+        directory = buildpath(context, directory, True)
+    unity_kwargs = dict(kwargs, directory=None)
+
+    objects = []
+    for i in _unity_sources(context, files, unity, unity_exclude,
+                            kwargs.get('lang')):
+        if not isinstance(i, list):
+            objects.append(make_object_file(i, **kwargs))
+            continue
+        for batch in i:
+            if len(batch) == 1:
+                objects.append(make_object_file(batch[0], **kwargs))
+            else:
+                objects.append(make_object_file(
+                    _make_unity_file(context, batch, directory),
+                    **unity_kwargs
+                ))
+    return FileList(context['relpath'], objects)
 
 
 @builtin.function()
@@ -276,6 +389,26 @@ def global_options(context, options, lang):
         ))
 
 
+def _render_flags(rule, global_options, build_inputs):
+    # Most of the objects in a target share the same options, so cache the
+    # rendered flags by compiler and option set. Neither the output file nor
+    # the global options (which are fixed by the time we generate the build
+    # files) vary per compiler, so they're not part of the key. Returns the
+    # index of the cached flag set (or None if the options couldn't be keyed)
+    # along with the flags themselves.
+    options_key = rule.options.flags_key()
+    if options_key is None:
+        return None, rule.flags(global_options)
+
+    cache = build_inputs['compile_flags']
+    key = (id(rule.compiler), options_key)
+    try:
+        return cache[key]
+    except KeyError:
+        result = cache[key] = (len(cache) + 1, rule.flags(global_options))
+        return result
+
+
 def _get_flags(backend, rule, build_inputs, buildfile):
     variables = {}
     cmd_kwargs = {}
@@ -289,10 +422,21 @@ def _get_flags(backend, rule, build_inputs, buildfile):
             buildfile
         )
         cmd_kwargs['flags'] = cflags
-        flags = rule.flags(gopts)
-        if flags:
+        index, flags = _render_flags(rule, gopts, build_inputs)
+        if flags and index is not None:
+            # Define each distinct set of flags once and refer to it from
+            # every edge that uses it.
+            variables[cflags] = backend.shared_flags_var(
+                compiler.flags_var, index, [global_cflags] + flags, buildfile
+            )
+        elif flags:
             variables[cflags] = [global_cflags] + flags
 
+    # Compiler launchers (e.g. ccache) are only used when actually building,
+    # so they're added here and not in `compdb_compile`.
+    if getattr(compiler, 'launcher', None):
+        cmd_kwargs['launcher'] = buildfile.launcher_var(compiler)
+
     return variables, cmd_kwargs
 
 
@@ -301,9 +445,18 @@ def make_compile(rule, build_inputs, buildfile, env):
     compiler = rule.compiler
     variables, cmd_kwargs = _get_flags(make, rule, build_inputs, buildfile)
 
+    # The depfile's rules would name the outputs instead of the stamp file
+    # that actually runs the recipe, so only restat when there's no depfile.
+    restat = getattr(rule, 'restat', False) and compiler.deps_flavor is None
+
     output_params = []
     if compiler.num_outputs == 'all':
-        output_vars = make.qvar('@')
+        # When restatting, `$@` is the stamp file, so pass the outputs in.
+        if restat:
+            output_vars = make.var('1')
+            output_params.append(rule.output)
+        else:
+            output_vars = make.qvar('@')
     else:
         output_vars = []
         for i in range(compiler.num_outputs):
@@ -311,15 +464,21 @@ def make_compile(rule, build_inputs, buildfile, env):
             output_vars.append(v)
             output_params.append(rule.output[i])
 
-    recipename = make.var('RULE_{}'.format(compiler.rule_name.upper()))
+    recipename = make.var('RULE_{}{}'.format(compiler.rule_name.upper(),
+                                             '_RESTAT' if restat else ''))
     if not buildfile.has_variable(recipename):
         recipe_extra = []
 
-        # Only GCC-style depfiles are supported by Make.
+        # Only GCC-style depfiles are supported by Make. If the compiler can
+        # generate phony targets for each dependency itself, use that;
+        # otherwise, fall back to post-processing the depfile with depfixer.
         if compiler.deps_flavor == 'gcc':
-            depfixer = env.tool('depfixer')
             cmd_kwargs['deps'] = deps = first(output_vars) + '.d'
-            recipe_extra = [make.Silent(depfixer(deps))]
+            if getattr(compiler, 'phony_deps', False):
+                cmd_kwargs['phony_deps'] = True
+            else:
+                depfixer = env.tool('depfixer')
+                recipe_extra = [make.Silent(depfixer(deps))]
 
         buildfile.define(recipename, [compiler(
             make.qvar('<'), output_vars, **cmd_kwargs
@@ -341,13 +500,18 @@ def make_compile(rule, build_inputs, buildfile, env):
         build_inputs.add_target(File(depfile))
         buildfile.include(depfile, optional=True)
 
+    recipe = make.Call(recipename, *output_params)
+    if restat:
+        recipe = restat_commands(env, rule.output, [recipe], posix=True)
+
     make.multitarget_rule(
         build_inputs, buildfile,
         targets=rule.output,
         deps=deps + rule.extra_deps,
         order_only=make.directory_deps(rule.output),
-        recipe=make.Call(recipename, *output_params),
-        variables=variables
+        recipe=recipe,
+        variables=variables,
+        restat=restat
     )
 
 
@@ -370,7 +534,9 @@ def ninja_compile(rule, build_inputs, buildfile, env):
             output_vars.append(v)
             variables[v] = rule.output[i]
 
-    if not buildfile.has_rule(compiler.rule_name):
+    restat = getattr(rule, 'restat', False)
+    rule_name = compiler.rule_name + ('_restat' if restat else '')
+    if not buildfile.has_rule(rule_name):
         depfile = None
         deps = None
 
@@ -381,10 +547,15 @@ def ninja_compile(rule, build_inputs, buildfile, env):
             deps = 'msvc'
             cmd_kwargs['deps'] = True
 
+        command = compiler(ninja.var('in'), output_vars, **cmd_kwargs)
+        if restat:
+            command = shell.join_lines(restat_commands(
+                env, ninja.var('out'), [command]
+            ))
+
         desc = rule.desc_verb + ' => ' + first(output_vars)
-        buildfile.rule(name=compiler.rule_name, command=compiler(
-            ninja.var('in'), output_vars, **cmd_kwargs
-        ), depfile=depfile, deps=deps, description=desc)
+        buildfile.rule(name=rule_name, command=command, depfile=depfile,
+                       deps=deps, description=desc, restat=restat)
 
     inputs = [rule.file]
     implicit_deps = []
@@ -416,7 +587,7 @@ def ninja_compile(rule, build_inputs, buildfile, env):
 
     buildfile.build(
         output=output,
-        rule=compiler.rule_name,
+        rule=rule_name,
         inputs=inputs,
         implicit=implicit_deps + rule.extra_deps,
         variables=variables
@@ -432,7 +603,7 @@ def compdb_compile(rule, build_inputs, buildfile, env):
         gopts = build_inputs['compile_options'][compiler.lang]
         cmd_kwargs['flags'] = (compiler.global_flags +
                                compiler.flags(gopts, mode='global') +
-                               rule.flags(gopts))
+                               _render_flags(rule, gopts, build_inputs)[1])
 
     if compiler.deps_flavor == 'gcc':
         cmd_kwargs['deps'] = (first(rule.output).path.addext('.d')
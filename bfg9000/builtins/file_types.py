@@ -4,6 +4,7 @@ from contextlib import contextmanager
 from itertools import chain
 
 from . import builtin
+from .. import path as _path
 from ..file_types import *
 from ..iterutils import iterate, listify, uniques
 from ..languages import known_langs
@@ -72,12 +73,15 @@ def make_file_list(context, fn, files, **kwargs):
 
 
 @contextmanager
-def make_immediate_file(context, file, mode='w', makedirs=True):
+def make_immediate_file(context, file, makedirs=True):
     if makedirs:
         os.makedirs(file.path.parent().string(context.env.base_dirs),
                     exist_ok=True)
 
-    with open(file.path.string(context.env.base_dirs), mode) as f:
+    # This file is an output of the regenerate step, but the build only needs
+    # to regenerate it if it's missing, so leave it alone if it's unchanged.
+    # That way, anything depending on it won't be rebuilt needlessly.
+    with _path.write_if_changed(file.path.string(context.env.base_dirs)) as f:
         yield f
     context.build['regenerate'].outputs.append(file)
 
@@ -4,13 +4,12 @@ import re
 from collections import namedtuple
 from collections.abc import Mapping
 from enum import Enum
-from functools import reduce
 
 from . import builtin, regenerate
 from .. import path as _path
 from ..exceptions import SerializationError
-from ..glob import NameGlob, PathGlob
-from ..iterutils import iterate, listify
+from ..glob import NameGlob, NameGlobSet, PathGlob, PathGlobSet
+from ..iterutils import iterate, listify, uniques
 from ..backends.make import writer as make
 from ..backends.ninja import writer as ninja
 from ..backends.make.syntax import Writer, Syntax
@@ -29,29 +28,46 @@ class FindCache(Mapping):
 
     def __init__(self):
         self._cache = {}
+        self._dirs = {}
+        # The contents of each directory walked by `find_files` calls, shared
+        # between them so that overlapping walks only list each directory once.
+        self.walk_cache = {}
 
     def to_json(self):
         return [
             [file_filter.to_json(),
-             *[[i.to_json() for i in matches] for matches in cache]]
+             *[[i.to_json() for i in matches] for matches in cache],
+             [[k.to_json(), v] for k, v in self._dirs[file_filter].items()]]
             for file_filter, cache in self._cache.items()
         ]
 
     @classmethod
     def from_json(cls, data, context):
         cache = cls.__new__(cls)
-        cache._cache = {
-            FileFilter.from_json(k, context):
-            cls.FindCacheEntry._make([Path.from_json(i) for i in matches]
-                                     for matches in v)
-            for k, *v in data
-        }
+        cache._cache, cache._dirs, cache.walk_cache = {}, {}, {}
+        # Older cache files don't have directory snapshots; in that case, we
+        # just treat the snapshot as empty.
+        for k, found, extra, *dirs in data:
+            file_filter = FileFilter.from_json(k, context)
+            cache._cache[file_filter] = cls.FindCacheEntry(
+                [Path.from_json(i) for i in found],
+                [Path.from_json(i) for i in extra]
+            )
+            cache._dirs[file_filter] = {
+                Path.from_json(k): v for k, v in (dirs[0] if dirs else [])
+            }
         return cache
 
-    def add(self, file_filter, found, extra):
+    def add(self, file_filter, found, extra, dirs=None):
         assert file_filter not in self._cache
 
         self._cache[file_filter] = self.FindCacheEntry(found, extra)
+        self._dirs[file_filter] = dirs or {}
+
+    def dirs(self, file_filter):
+        # Return the modification times of all the directories we walked to
+        # get the results for `file_filter`.
+        return self._dirs[file_filter]
 
     def __getitem__(self, file_filter):
         return self._cache[file_filter]
@@ -92,6 +108,12 @@ class FileFilter:
         self.extra = tuple(NameGlob(i, type) for i in iterate(extra))
         self.exclude = tuple(NameGlob(i, type) for i in iterate(exclude))
         self.filter_fn = filter_fn
+        self._compile()
+
+    def _compile(self):
+        self._include_set = PathGlobSet(self.include)
+        self._extra_set = NameGlobSet(self.extra)
+        self._exclude_set = NameGlobSet(self.exclude)
 
     def to_json(self):
         # We can only serialize built-in filter functions. Arbitrary functions
@@ -111,6 +133,7 @@ class FileFilter:
         f.include = tuple(PathGlob.from_json(i) for i in data['include'])
         f.extra = tuple(NameGlob.from_json(i) for i in data['extra'])
         f.exclude = tuple(NameGlob.from_json(i) for i in data['exclude'])
+        f._compile()
         try:
             f.filter_fn = (context[data['filter_fn']] if data['filter_fn']
                            else None)
@@ -122,16 +145,14 @@ class FileFilter:
         return _path.uniquetrees([i.base for i in self.include])
 
     def _match_globs(self, path):
-        if any(i.match(path) for i in self.exclude):
+        if self._exclude_set.match(path):
             return FindResult.exclude_recursive
 
-        skip_base = len(self.include) == 1
-        result = reduce(lambda a, b: a | b,
-                        (i.match(path, skip_base) for i in self.include))
+        result = self._include_set.match(path)
         if result:
             return FindResult.include
 
-        if any(i.match(path) for i in self.extra):
+        if self._extra_set.match(path):
             return FindResult.not_now
 
         if result == PathGlob.Result.never:
@@ -167,7 +188,7 @@ class CacheVersionError(RuntimeError):
 
 
 class FindCacheFile(namedtuple('FindCacheFile', ['regen_files', 'cache'])):
-    version = 1
+    version = 2
     cachefile = '.bfg_find_cache'
 
     def save(self, path):
@@ -204,7 +225,7 @@ class FindCacheFile(namedtuple('FindCacheFile', ['regen_files', 'cache'])):
 
 
 def write_depfile(env, path, output, seen_dirs, makeify=False):
-    with open(path.string(env.base_dirs), 'w') as f:
+    with _path.write_if_changed(path.string(env.base_dirs)) as f:
         # Since this file is in the build dir, we can use relative dirs for
         # deps also in the build dir.
         roots = env.base_dirs.copy()
@@ -238,15 +259,38 @@ def filter_by_platform(context, path):
             else FindResult.include)
 
 
-def _find_files(env, filter, seen_dirs=None):
+def _dirs_changed(env, file_filter, dirs, mtimes=None):
+    # If any of the bases for this filter weren't walked (e.g. because they
+    # didn't exist), we can't tell if anything changed.
+    if any(i not in dirs for i in file_filter.bases()):
+        return True
+
+    # If `mtimes` is a dict, use it to avoid statting directories shared by
+    # multiple filters more than once.
+    def getmtime(path):
+        if mtimes is None:
+            return _path.getmtime_ns(path, env.base_dirs, strict=False)
+        if path not in mtimes:
+            mtimes[path] = _path.getmtime_ns(path, env.base_dirs,
+                                             strict=False)
+        return mtimes[path]
+
+    # Adding, removing, or renaming an entry in a directory updates its
+    # modification time, so if none of the directories we walked have changed,
+    # the results of the walk must be the same.
+    return any(getmtime(k) != v for k, v in dirs.items())
+
+
+def _find_files(env, filter, seen_dirs=None, walk_cache=None):
+    # If `seen_dirs` is a dict, fill it with the modification times of all the
+    # directories we walk.
     paths = filter.bases()
 
     for p in paths:
         yield p, filter.match(p)
     for p in paths:
-        for base, dirs, files in _path.walk(p, env.base_dirs):
-            if seen_dirs is not None:
-                seen_dirs.append(base)
+        for base, dirs, files in _path.walk(p, env.base_dirs, walk_cache,
+                                            seen_dirs):
             to_remove = []
 
             for i, p in enumerate(dirs):
@@ -285,8 +329,10 @@ def find_from_filter(context, file_filter, *, file_type=None, dir_type=None,
         except KeyError:
             pass
 
-    results, found, extra, seen_dirs = [], [], [], []
-    for path, matched in _find_files(context.env, file_filter, seen_dirs):
+    results, found, extra, seen_dirs = [], [], [], {}
+    walk_cache = context.build['find_cache'].walk_cache if cache else None
+    for path, matched in _find_files(context.env, file_filter, seen_dirs,
+                                     walk_cache):
         if matched == FindResult.include:
             if cache:
                 found.append(path)
@@ -297,7 +343,8 @@ def find_from_filter(context, file_filter, *, file_type=None, dir_type=None,
             extra_types[_path_type(path)](path, dist=dist)
 
     if cache:
-        context.build['find_cache'].add(file_filter, found, extra)
+        context.build['find_cache'].add(file_filter, found, extra,
+                                        seen_dirs)
         context.build['find_dirs'].update(seen_dirs)
     return results
 
@@ -317,7 +364,9 @@ def find_files(context, pattern, *, type=None, extra=None, exclude=None,
         # contents of `build.bfg` had some.
         context.build['regenerate'].depfile = depfile_name
 
-    return find_from_filter(context, file_filter, cache=cache, **kwargs)
+    results = find_from_filter(context, file_filter, cache=cache, **kwargs)
+    context.env.prefetch(uniques(getattr(i, 'lang', None) for i in results))
+    return results
 
 
 @builtin.function()
@@ -341,38 +390,50 @@ def find_check_cache(context):
     except FileNotFoundError:
         return
 
-    # Check if any of the explicit inputs are newer than any of the explicit
-    # outputs. If so, we definitely want to regenerate the build files.
+    # Check if any of the explicit inputs are newer than the build file or if
+    # any of the other explicit outputs are missing. If so, we definitely want
+    # to regenerate the build files. (The other outputs are only rewritten when
+    # their contents change, so they can be older than the inputs.)
+    out_mtimes = [_path.getmtime_ns(i, context.env.base_dirs, strict=False)
+                  for i in regen_files.outputs]
     if ( max(_path.getmtime_ns(i, context.env.base_dirs, strict=False)
-             for i in regen_files.inputs) >
-         min(_path.getmtime_ns(i, context.env.base_dirs, strict=False)
-             for i in regen_files.outputs) ):
+             for i in regen_files.inputs) > out_mtimes[0] or
+         0 in out_mtimes ):
         return
 
     # Otherwise, check to see if any of the `find_files` calls have different
     # results. If not, we can avoid regenerating.
     regenerate = False
+    walk_cache = context.build['find_cache'].walk_cache
+    mtimes = {}
 
     for file_filter, results in old_cache.items():
-        found, extra, seen_dirs = [], [], []
-        for path, matched in _find_files(context.env, file_filter, seen_dirs):
-            if matched == FindResult.include:
-                found.append(path)
-            elif matched == FindResult.not_now:
-                extra.append(path)
+        dirs = old_cache.dirs(file_filter)
+        if _dirs_changed(context.env, file_filter, dirs, mtimes):
+            found, extra, dirs = [], [], {}
+            for path, matched in _find_files(context.env, file_filter, dirs,
+                                             walk_cache):
+                if matched == FindResult.include:
+                    found.append(path)
+                elif matched == FindResult.not_now:
+                    extra.append(path)
+
+            regenerate = (regenerate or results.found != found or
+                          results.extra != extra)
+        else:
+            found, extra = results
 
-        regenerate = regenerate or results[0] != found or results[1] != extra
         # Fill in the find cache with our results so that if/when we actually
         # regenerate our build files, we can just reuse the cached values.
-        context.build['find_cache'].add(file_filter, found, extra)
-        context.build['find_dirs'].update(seen_dirs)
+        context.build['find_cache'].add(file_filter, found, extra, dirs)
+        context.build['find_dirs'].update(dirs)
 
     if not regenerate:
         # We don't want to regenerate. To make sure the build backend is happy,
-        # update the modification time of all the output files.
-        for i in regen_files.outputs:
-            if _path.exists(i, context.env.base_dirs):
-                _path.touch(i, context.env.base_dirs)
+        # update the modification time of the build file. The other outputs
+        # are only regenerated if they're missing, so leave them alone;
+        # touching them would just make everything built from them stale.
+        _path.touch(regen_files.outputs[0], context.env.base_dirs)
         raise AbortConfigure()
 
 
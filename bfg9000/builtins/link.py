@@ -7,6 +7,7 @@ from . import builtin
 from .. import options as opts
 from .file_types import static_file
 from .path import relname
+from .pool import get_pool, link_pool, make_pool_command, ninja_pool
 from ..backends.compdb import writer as compdb
 from ..backends.make import writer as make
 from ..backends.ninja import writer as ninja
@@ -18,6 +19,7 @@ from ..iterutils import (first, flatten, iterate, listify, slice_dict, uniques,
 from ..languages import known_formats
 from ..objutils import convert_each, convert_one
 from ..platforms import known_native_object_formats
+from ..safe_str import literal
 from ..shell import posix as pshell
 
 build_input('link_options')(lambda: {
@@ -28,9 +30,16 @@ build_input('link_options')(lambda: {
 class Link(Edge):
     msbuild_output = True
     extra_kwargs = ()
+    # Whether to put this step in the `link` pool when no pool is specified.
+    default_link_pool = True
+
+    # Pass the input files via a response file once there are more than this
+    # many of them, so that very large links don't exceed the OS's limit on
+    # the length of a command line.
+    rspfile_threshold = 100
 
     def __init__(self, context, name, files, libs, packages, link_options,
-                 lang=None, extra_deps=None, description=None):
+                 lang=None, extra_deps=None, description=None, pool=None):
         build = context.build
         name = relname(context, name)
         self.name = self.__name(name)
@@ -92,7 +101,12 @@ class Link(Edge):
         public_output = self.linker.post_output(context, options, output, self)
         primary.post_install = self.linker.post_install(options, output, self)
 
-        super().__init__(build, output, public_output, extra_deps, description)
+        if pool is None:
+            pool = link_pool(context) if self.default_link_pool else None
+        else:
+            pool = get_pool(context, pool)
+        super().__init__(build, output, public_output, extra_deps, description,
+                         pool)
         build['defaults'].add(self.public_output)
 
     @classmethod
@@ -106,21 +120,35 @@ class Link(Edge):
         kwargs['link_options'] = pshell.listify(kwargs.get('link_options'),
                                                 type=opts.option_list)
 
-        intdir = ('{}.int/'.format(cls.__name(name))
-                  if context.build['project']['intermediate_dirs'] else None)
-        intdir = kwargs.pop('intermediate_dir', intdir)
-
+        intdir = cls._intermediate_dir(context, name, kwargs)
         files = context['object_files'](
             files, includes=kwargs.pop('includes', None),
             pch=kwargs.pop('pch', None),
             options=kwargs.pop('compile_options', None),
             libs=kwargs['libs'], packages=kwargs['packages'], lang=lang,
             directory=intdir,
-            extra_deps=kwargs.pop('extra_compile_deps', None)
+            extra_deps=kwargs.pop('extra_compile_deps', None),
+            unity=kwargs.pop('unity', None),
+            unity_exclude=kwargs.pop('unity_exclude', None)
         )
 
         return files, kwargs
 
+    @classmethod
+    def _intermediate_dir(cls, context, name, kwargs):
+        intdir = ('{}.int/'.format(cls.__name(name))
+                  if context.build['project']['intermediate_dirs'] else None)
+        return kwargs.pop('intermediate_dir', intdir)
+
+    @classmethod
+    def _variant_intermediate_dir(cls, name, kwargs, variant):
+        # Put this variant's objects in a sibling of the usual intermediate
+        # directory so they don't collide with the objects for the others.
+        intdir = kwargs.get('intermediate_dir')
+        if isinstance(intdir, str) and intdir:
+            return '{}.{}/'.format(intdir.rstrip('/'), variant)
+        return '{}.{}.int/'.format(cls.__name(name), variant)
+
     def _get_linkers(self, env, langs):
         yielded = False
         for i in langs:
@@ -228,6 +256,8 @@ class StaticLink(Link):
     msbuild_mode = 'StaticLibrary'
     _preferred_lib = 'static'
     _prefix = 'lib'
+    # Archiving is cheap, so there's no need to throttle it with the link pool.
+    default_link_pool = False
 
     extra_kwargs = ('static_link_options',)
 
@@ -320,7 +350,8 @@ def static_library(context, name, files=None, **kwargs):
 
 @builtin.function()
 @builtin.type(Library, extra_in_type=DualUseLibrary)
-def library(context, name, files=None, *, kind=None, **kwargs):
+def library(context, name, files=None, *, kind=None, share_objects=None,
+            **kwargs):
     explicit_kind = False
 
     if kind is not None:
@@ -368,13 +399,35 @@ def library(context, name, files=None, *, kind=None, **kwargs):
             context, name, files, shared_kwargs
         )
         shared = SharedLink(context, name, shared_files, **shared_kwargs)
-        if not shared.linker.builder.can_dual_link:
+        builder = shared.linker.builder
+        if not builder.can_dual_link:
             warnings.warn('dual linking not supported with {}'
                           .format(shared.linker.brand))
             return shared.public_output
 
+        if share_objects is None:
+            share_objects = context.build['project']['share_objects']
+        if share_objects is None:
+            share_objects = builder.can_share_objects
+        elif share_objects and not builder.can_share_objects:
+            warnings.warn('sharing object files between shared and static ' +
+                          'libraries not supported with {}'
+                          .format(shared.linker.brand))
+            share_objects = False
+
+        if share_objects:
+            # Reuse the (PIC) object files from the shared library so that
+            # each source file is only compiled once.
+            static_files = shared_files
+        else:
+            static_files = files
+            static_kwargs['intermediate_dir'] = (
+                StaticLink._variant_intermediate_dir(name, static_kwargs,
+                                                     'static')
+            )
+
         static_files, static_kwargs = StaticLink.convert_args(
-            context, name, shared_files, static_kwargs
+            context, name, static_files, static_kwargs
         )
         static = StaticLink(context, name, static_files, **static_kwargs)
         return DualUseLibrary(shared.public_output, static.public_output)
@@ -443,6 +496,13 @@ def _get_flags(backend, rule, build_inputs, buildfile):
     return variables, cmd_kwargs
 
 
+def _use_rspfile(rule):
+    linker = rule.linker
+    return (len(rule.files) > rule.rspfile_threshold and
+            getattr(linker, 'accepts_rspfile', False) and
+            not hasattr(linker, 'transform_input'))
+
+
 @make.rule_handler(StaticLink, DynamicLink, SharedLink)
 def make_link(rule, build_inputs, buildfile, env):
     linker = rule.linker
@@ -458,26 +518,45 @@ def make_link(rule, build_inputs, buildfile, env):
             output_vars.append(v)
             output_params.append(rule.output[i])
 
-    recipename = make.var('RULE_{}'.format(linker.rule_name.upper()))
-    if not buildfile.has_variable(recipename):
-        buildfile.define(recipename, [linker(
-            make.var('1'), output_vars, **cmd_kwargs
-        )])
-
     files = rule.files
     if hasattr(linker, 'transform_input'):
         files = linker.transform_input(files)
 
+    # Writing the response file requires GNU make's `$(file ...)` function;
+    # without it, we just have to hope the command line is short enough.
+    use_rspfile = (_use_rspfile(rule) and
+                   make.features.supported('file', env.backend_version))
+    recipename = make.var('RULE_{}{}'.format(linker.rule_name.upper(),
+                                             '_RSP' if use_rspfile else ''))
+    if not buildfile.has_variable(recipename):
+        input_var = make.var('1')
+        if use_rspfile:
+            input_var = '@' + input_var
+        buildfile.define(recipename, [linker(
+            input_var, output_vars, **cmd_kwargs
+        )])
+
     package_build_deps = flatten(i.deps for i in rule.packages)
     module_defs = listify(getattr(rule, 'module_defs', None))
     manifest = listify(getattr(rule, 'manifest', None))
+    inputs = files
+    if use_rspfile:
+        inputs = rule.output[0].path.addext('.rsp')
+        build_inputs.add_target(File(inputs))
+    recipe = make.Call(recipename, inputs, *output_params)
+    if rule.pool:
+        recipe = [make_pool_command(env, rule.pool, recipe)]
+    if use_rspfile:
+        recipe = ([make.Function('file', literal('>') + inputs, files)] +
+                  listify(recipe))
+
     make.multitarget_rule(
         build_inputs, buildfile,
         targets=rule.output,
         deps=(rule.files + rule.libs + package_build_deps + module_defs +
               manifest + rule.extra_deps),
         order_only=make.directory_deps(rule.output),
-        recipe=make.Call(recipename, files, *output_params),
+        recipe=recipe,
         variables=variables
     )
 
@@ -488,6 +567,8 @@ def ninja_link(rule, build_inputs, buildfile, env):
     variables, cmd_kwargs = _get_flags(ninja, rule, build_inputs, buildfile)
     if rule.description:
         variables['description'] = rule.description
+    if rule.pool:
+        variables['pool'] = ninja_pool(buildfile, rule.pool)
 
     if linker.num_outputs == 'all':
         output_vars = ninja.var('out')
@@ -507,17 +588,29 @@ def ninja_link(rule, build_inputs, buildfile, env):
     else:
         input_var = ninja.var('in')
 
-    if not buildfile.has_rule(linker.rule_name):
-        buildfile.rule(name=linker.rule_name, command=linker(
-            input_var, output_vars, **cmd_kwargs
-        ), description=rule.desc_verb + ' => ' + first(output_vars))
+    description = rule.desc_verb + ' => ' + first(output_vars)
+    if _use_rspfile(rule):
+        rspfile = ninja.var('rspfile')
+        variables[rspfile] = rule.output[0].path.addext('.rsp')
+        rule_name = linker.rule_name + '_rsp'
+        if not buildfile.has_rule(rule_name):
+            buildfile.rule(name=rule_name, command=linker(
+                '@' + rspfile, output_vars, **cmd_kwargs
+            ), rspfile=rspfile, rspfile_content=input_var,
+                description=description)
+    else:
+        rule_name = linker.rule_name
+        if not buildfile.has_rule(rule_name):
+            buildfile.rule(name=rule_name, command=linker(
+                input_var, output_vars, **cmd_kwargs
+            ), description=description)
 
     package_build_deps = flatten(i.deps for i in rule.packages)
     module_defs = listify(getattr(rule, 'module_defs', None))
     manifest = listify(getattr(rule, 'manifest', None))
     buildfile.build(
         output=rule.output,
-        rule=linker.rule_name,
+        rule=rule_name,
         inputs=rule.files,
         implicit=(rule.libs + package_build_deps + module_defs + manifest +
                   rule.extra_deps),
@@ -0,0 +1,80 @@
+import re
+
+from . import builtin
+from ..backends.make import writer as make
+from ..build_inputs import build_input
+from ..path import Path, Root
+from ..safe_str import literal
+
+build_input('pools')(lambda: {})
+
+
+class Pool:
+    def __init__(self, name, depth):
+        self.name = name
+        self.depth = depth
+
+    def __repr__(self):
+        return '<Pool {!r}, depth={}>'.format(self.name, self.depth)
+
+
+@builtin.function()
+def pool(context, name, depth):
+    if re.search(r'\W', name):
+        raise ValueError('pool name contains invalid characters')
+    if name == 'console':
+        raise ValueError("'console' is a reserved pool name")
+    depth = int(depth)
+    if depth < 1:
+        raise ValueError('pool depth must be at least 1')
+
+    pools = context.build['pools']
+    if name in pools:
+        if pools[name].depth != depth:
+            raise ValueError('pool {!r} already exists with depth {}'
+                             .format(name, pools[name].depth))
+        return pools[name]
+    pools[name] = Pool(name, depth)
+    return pools[name]
+
+
+def get_pool(context, pool):
+    if pool is None or isinstance(pool, Pool):
+        return pool
+    try:
+        return context.build['pools'][pool]
+    except KeyError:
+        raise ValueError('unknown pool {!r}'.format(pool))
+
+
+def link_pool(context):
+    # Link steps go in the `link` pool by default; its depth is set when
+    # configuring the build, unless the project has defined it itself.
+    pools = context.build['pools']
+    if 'link' in pools:
+        return pools['link']
+    if context.env.link_jobs:
+        return context['pool']('link', context.env.link_jobs)
+    return None
+
+
+def make_pool_command(env, pool, command):
+    # Make has no notion of pools, so throttle the command with a semaphore
+    # shared by every step in the pool instead. The semaphore gets the whole
+    # command line as a single shell string so that all of it (including any
+    # `cd`s or `&&`s) runs while holding a slot. The line can contain Make
+    # variables and functions, so quote it once Make has expanded them.
+    lockfile = Path('.bfg_pools/' + pool.name, Root.builddir)
+    quote = literal("'")
+    shell_command = quote + make.Function(
+        'subst', quote, literal("'\\''"), command
+    ) + quote
+    return env.tool('semaphore')(lockfile, pool.depth, shell_command)
+
+
+def ninja_pool(buildfile, pool):
+    if pool is None:
+        return None
+    if not buildfile.has_pool(pool.name):
+        buildfile.pool(pool.name, pool.depth)
+    return pool.name
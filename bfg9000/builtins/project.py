@@ -12,6 +12,9 @@ class ProjectInfo:
             'intermediate_dirs': True,
             'lang': 'c',
             'find_exclude': ['.*#', '*~', '#*#'],
+            'share_objects': None,
+            'split_submodules': False,
+            'unity': None,
         }
 
     def __getitem__(self, key):
@@ -34,3 +37,6 @@ def project(context, name=default_sentinel, version=default_sentinel,
 
     for k, v in kwargs.items():
         info[k] = v
+
+    if 'lang' in kwargs:
+        context.env.prefetch(info['lang'])
@@ -72,13 +72,18 @@ def make_regenerate_rule(build_inputs, buildfile, env):
             ))]
         )
 
-    make.multitarget_rule(
-        build_inputs, buildfile,
-        targets=_outputs(build_inputs, env),
+    outputs = _outputs(build_inputs, env)
+    regenerate = bfg9000('regenerate', lazy=True)
+    buildfile.rule(
+        target=outputs[0],
         deps=_inputs(build_inputs, env),
-        recipe=[bfg9000('regenerate', lazy=True)],
-        clean_stamp=False
+        recipe=[regenerate]
     )
+    if len(outputs) > 1:
+        # The other outputs are only rewritten when their contents change, so
+        # they may be older than the inputs. Just regenerate if one of them
+        # goes missing (e.g. a deleted unity source).
+        buildfile.rule(target=outputs[1:], recipe=[regenerate])
 
 
 @ninja.post_rules_hook
@@ -106,6 +111,7 @@ def ninja_regenerate_rule(build_inputs, buildfile, env):
             implicit=listify(env.toolchain.path)
         )
 
+    outputs = _outputs(build_inputs, env)
     buildfile.rule(
         name='regenerate',
         command=bfg9000('regenerate', lazy=True),
@@ -115,7 +121,23 @@ def ninja_regenerate_rule(build_inputs, buildfile, env):
         **rule_kwargs
     )
     buildfile.build(
-        output=_outputs(build_inputs, env),
+        output=outputs[0],
         rule='regenerate',
         implicit=_inputs(build_inputs, env)
     )
+
+    if len(outputs) > 1:
+        # As with Make, the other outputs may be older than the inputs, so
+        # only regenerate if one of them goes missing. This build has no
+        # inputs, so (being a generator) it's never considered dirty otherwise.
+        buildfile.rule(
+            name='regenerate_missing',
+            command=bfg9000('regenerate', lazy=True),
+            generator=True,
+            description='regenerate',
+            **rule_kwargs
+        )
+        buildfile.build(
+            output=outputs[1:],
+            rule='regenerate_missing'
+        )
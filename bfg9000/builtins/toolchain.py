@@ -13,8 +13,8 @@ def environ(context):
 
 @builtin.getter(context='toolchain')
 def srcdir(context):
-    # Make a copy of the srcdir object, since it should be read-only.
-    return context.env.srcdir.reroot(context.env.srcdir.root)
+    # Paths are immutable, so it's safe to hand out the srcdir object itself.
+    return context.env.srcdir
 
 
 @builtin.function(context='toolchain')
@@ -41,6 +41,14 @@ def compiler(context, names, lang, strict=False):
     context.env.variables[var] = compiler
 
 
+@builtin.function(context='toolchain')
+def compiler_launcher(context, names, lang, strict=False):
+    var = known_langs[lang].var('launcher')
+    launcher = context['which'](names, strict=strict,
+                                kind='compiler launcher')
+    context.env.variables[var] = launcher
+
+
 @builtin.function(context='toolchain')
 def compile_options(context, options, lang):
     # This only supports strings (and lists of strings) for options, *not*
@@ -1,4 +1,7 @@
+import os
+import re
 import sys
+import time
 
 from enum import Enum
 
@@ -10,9 +13,29 @@ from .arguments import parser as argparse
 # don't get an error if a dep is removed. For a more-detailed discussion of why
 # this is necessary, see <http://scottmcpeak.com/autodepend/autodepend.html>.
 
-Token = Enum('Token', ['char', 'colon', 'space', 'newline'])
+Token = Enum('Token', ['word', 'colon', 'space', 'newline'])
 State = Enum('State', ['target', 'between_targets', 'dep', 'between_deps'])
 
+# The depfile syntax is a bit weird, since it seems no one quite understands
+# the correct ways to escape characters for Make in all cases (made worse by
+# the fact that even GNU Make's behavior varies across versions). For our
+# purposes though, we only need to recognize when unescaped colons (always
+# followed by whitespace in the depfile generators) and unescaped spaces are
+# emitted. Escaped newlines are swallowed entirely.
+_token_re = re.compile(r"""
+    (?P<word> (?: \\[\s\S] | \\\Z | [^ \t\n:\\] | :(?![ \t\n]|\Z) )+ )
+  | (?P<colon> : )
+  | (?P<space> [ \t]+ )
+  | (?P<newline> \n )
+""", re.VERBOSE)
+
+_token_kinds = {
+    'word': Token.word,
+    'colon': Token.colon,
+    'space': Token.space,
+    'newline': Token.newline,
+}
+
 
 class ParseError(ValueError):
     pass
@@ -23,97 +46,140 @@ class UnexpectedTokenError(ParseError):
         super().__init__("unexpected token '{}'".format(tok))
 
 
-def tokenize(s):
-    # The depfile syntax is a bit weird, since it seems no one quite
-    # understands the correct ways to escape characters for Make in all cases
-    # (made worse by the fact that even GNU Make's behavior varies across
-    # versions). For our purposes though, we only need to recognize when
-    # unescaped colons (always followed by whitespace in the depfile
-    # generators) and unescaped spaces are emitted.
-
-    s = iter(s)
-    while True:
-        c = next(s, None)
-        if c is None:
-            return
-
-        if c == ':':
-            c = next(s, None)
-            if c is None or c in ' \t\n':
-                yield (Token.colon, None)
-                if c is None:
-                    return
-            else:
-                yield (Token.char, ':')
-
-        if c == '\\':
-            c = next(s, None)
-            if c != '\n':  # Swallow escaped newlines.
-                yield (Token.char, '\\')
-                if c is None:
-                    return
-                yield (Token.char, c)
-        elif c in ' \t':
-            yield (Token.space, None)
-        elif c == '\n':
-            yield (Token.newline, None)
+def _scan(s):
+    # Scan the whole buffer at once, yielding entire words rather than
+    # individual characters. Token kinds are the names of the groups in
+    # `_token_re`, which are cheaper to compare than enums.
+    for m in _token_re.finditer(s):
+        kind = m.lastgroup
+        if kind == 'word':
+            value = m.group()
+            if '\n' in value:
+                # The only newlines in a word are escaped ones; drop them
+                # along with their backslash.
+                value = value.replace('\\\n', '')
+                if not value:
+                    continue
+            yield kind, value
         else:
-            yield (Token.char, c)
+            yield kind, None
 
 
-def emit_deps(instream, outstream):
+def tokenize(s):
+    for kind, value in _scan(s):
+        yield (_token_kinds[kind], value)
+
+
+def fix_deps(s):
     state = State.target
+    deps = []
 
-    for tok, value in tokenize(instream.read()):
-        if state == State.target:
-            if tok == Token.space:
+    for kind, value in _scan(s):
+        if state is State.target:
+            if kind == 'space':
                 state = State.between_targets
-            elif tok == Token.colon:
+            elif kind == 'colon':
                 state = State.between_deps
-            elif tok != Token.char:
-                raise UnexpectedTokenError(tok)
-        elif state == State.between_targets:
-            if tok == Token.char:
+            elif kind != 'word':
+                raise UnexpectedTokenError(_token_kinds[kind])
+        elif state is State.between_targets:
+            if kind == 'word':
                 state = State.target
-            elif tok == Token.colon:
+            elif kind == 'colon':
                 state = State.between_deps
-            elif tok != Token.space:
-                raise UnexpectedTokenError(tok)
-        elif state == State.dep:
-            if tok == Token.char:
-                outstream.write(value)
-            elif tok == Token.space:
-                outstream.write(':\n')
+            elif kind != 'space':
+                raise UnexpectedTokenError(_token_kinds[kind])
+        elif state is State.dep:
+            if kind == 'space':
                 state = State.between_deps
-            elif tok == Token.newline:
-                outstream.write(':\n')
+            elif kind == 'newline':
                 state = State.target
             else:
-                raise UnexpectedTokenError(tok)
-        else:  # state == State.between_deps
-            if tok == Token.char:
+                raise UnexpectedTokenError(_token_kinds[kind])
+        else:  # state is State.between_deps
+            if kind == 'word':
                 state = State.dep
-                outstream.write(value)
-            elif tok == Token.newline:
+                deps.append(value)
+            elif kind == 'newline':
                 state = State.target
-            elif tok != Token.space:
-                raise UnexpectedTokenError(tok)
+            elif kind != 'space':
+                raise UnexpectedTokenError(_token_kinds[kind])
 
-    if state != State.target:
+    if state is not State.target:
         raise ParseError('unexpected end of file')
+    return ''.join(i + ':\n' for i in deps)
+
+
+def emit_deps(instream, outstream):
+    outstream.write(fix_deps(instream.read()))
+
+
+# A comment appended to depfiles once they've been fixed so that we don't fix
+# them again (which would duplicate all the targets we added).
+_fixed_marker = '# fixed by bfg9000-depfixer\n'
+
+
+def fix_depfiles(depfiles, stamp=None):
+    # Fix many depfiles in place with a single process. If `stamp` is
+    # specified, only fix the depfiles that have changed since the stamp was
+    # last updated (e.g. the previous time we ran), and then update it.
+    try:
+        since = os.stat(stamp).st_mtime_ns if stamp else None
+    except FileNotFoundError:
+        since = None
+    # Set the stamp to when we started rather than when we finished, so that
+    # depfiles written while we're running get fixed next time. Likewise,
+    # depfiles with the same mtime as the stamp may have been written after
+    # we looked at them, so check them again (the marker keeps us from fixing
+    # them twice).
+    start = time.time_ns()
+
+    for i in depfiles:
+        try:
+            if since is not None and os.stat(i).st_mtime_ns < since:
+                continue
+            with open(i) as f:
+                data = f.read()
+        except FileNotFoundError:
+            # Not every compilation produces a depfile, so just skip it.
+            continue
+        if data.endswith(_fixed_marker):
+            continue
+
+        try:
+            fixed = fix_deps(data)
+        except ParseError as e:
+            raise ParseError('{}: {}'.format(i, e))
+        with open(i, 'a') as f:
+            f.write(fixed + _fixed_marker)
+
+    if stamp:
+        with open(stamp, 'a'):
+            pass
+        os.utime(stamp, ns=(start, start))
 
 
 def main():
     parser = argparse.ArgumentParser(
         prog='bfg9000-depfixer',
         description='Read in a depfile (in Makefile syntax) on stdin and ' +
-                    'output all the dependencies as targets on stdout.'
+                    'output all the dependencies as targets on stdout. If ' +
+                    'any depfiles are specified, append the targets to ' +
+                    'each of them instead.'
     )
     parser.add_argument('--version', action='version',
                         version='%(prog)s ' + version)
-    parser.parse_args()
+    parser.add_argument('--stamp', metavar='FILE',
+                        help=('only fix depfiles newer than FILE, and ' +
+                              'update FILE afterwards'))
+    parser.add_argument('depfiles', nargs='*', metavar='DEPFILE',
+                        help='the depfiles to fix in place')
+    args = parser.parse_args()
 
     try:
-        emit_deps(sys.stdin, sys.stdout)
+        if args.depfiles:
+            fix_depfiles(args.depfiles, args.stamp)
+        else:
+            emit_deps(sys.stdin, sys.stdout)
     except Exception as e:
         parser.error(e)
@@ -1,8 +1,9 @@
 import os
 import subprocess
 import sys
+from contextlib import contextmanager
 
-from . import build, log, path
+from . import build, log, path, profiler
 from .app_version import version
 from .arguments import parser as argparse
 from .backends import list_backends
@@ -11,6 +12,7 @@ from .build_inputs import Regenerating
 from .environment import Environment, EnvVersionError
 from .exceptions import AbortConfigure
 from .platforms.target import platform_info
+from .probe_cache import ProbeCache
 
 logger = log.getLogger(__name__)
 
@@ -84,15 +86,44 @@ def environment_from_args(args):
     return env, backend
 
 
+def init_probing(env):
+    env.probe_cache = ProbeCache.load(env.builddir.string(),
+                                      env.getvar('BFG9000_CACHE_DIR'))
+    env.prefetch_enabled = True
+
+
+@contextmanager
+def profiling(filename):
+    if not filename:
+        yield
+        return
+
+    profiler.start()
+    try:
+        yield
+    finally:
+        profiler.stop().save(filename.string())
+
+
 def finalize_environment(env, args, extra_args=None):
     env.finalize(
         install_dirs={i: getattr(args, i.name) for i in path.InstallRoot},
         library_mode=(args.shared, args.static),
         compdb=args.compdb,
         extra_args=extra_args,
+        link_jobs=args.link_jobs,
     )
 
 
+def write_build_files(env, backend, build_inputs):
+    with profiler.span('write', 'backend', backend=env.backend):
+        backend.write(env, build_inputs)
+    if env.compdb:
+        with profiler.span('compdb.write', 'backend'):
+            compdb.write(env, build_inputs)
+    env.probe_cache.save(env.builddir.string())
+
+
 def directory_pair(srcname, buildname):
     class DirectoryPair(argparse.Action):
         def __call__(self, parser, namespace, values, option_string=None):
@@ -171,6 +202,12 @@ def add_configure_args(parser):
     build.add_argument('--compdb', action='enable', default=True,
                        help=('generate compile_commands.json ' +
                              '(default: enabled)'))
+    build.add_argument('--link-jobs', metavar='N', type=int,
+                       help=('run at most N link steps at once ' +
+                             '(default: unlimited)'))
+    build.add_argument('--profile', metavar='FILE', type=argparse.File(),
+                       help=('write a Chrome trace of the configuration ' +
+                             'process to FILE'))
 
     pkg = parser.add_argument_group('packaging arguments')
     pkg.add_argument('-p', '--package-file', action='append', metavar='FILE',
@@ -230,23 +267,25 @@ def configure(parser, subparser, args, extra):
     os.makedirs(args.builddir.string(), exist_ok=True)
 
     try:
-        env, backend = environment_from_args(args)
-        if args.toolchain:
-            build.load_toolchain(env, args.toolchain)
-        finalize_environment(env, args, extra)
-
-        if not args.no_resolve_packages:
-            env.mopack = build.resolve_packages(
-                env, args.package_files, args.package_flags,
-                verbose=args.verbose
-            )
-
-        env.save(args.builddir.string())
-
-        build_inputs = build.configure_build(env)
-        backend.write(env, build_inputs)
-        if env.compdb:
-            compdb.write(env, build_inputs)
+        with profiling(args.profile):
+            env, backend = environment_from_args(args)
+            init_probing(env)
+            if args.toolchain:
+                with profiler.span('load_toolchain', 'configure'):
+                    build.load_toolchain(env, args.toolchain)
+            finalize_environment(env, args, extra)
+
+            if not args.no_resolve_packages:
+                with profiler.span('resolve_packages', 'configure'):
+                    env.mopack = build.resolve_packages(
+                        env, args.package_files, args.package_flags,
+                        verbose=args.verbose
+                    )
+
+            env.save(args.builddir.string())
+
+            build_inputs = build.configure_build(env)
+            write_build_files(env, backend, build_inputs)
     except AbortConfigure:
         pass
     except Exception as e:
@@ -263,17 +302,19 @@ def regenerate(parser, subparser, args, extra):
                         .format(build.bfgfile))
 
     try:
-        env = Environment.load(args.builddir.string())
-        if env.toolchain.path:
-            build.load_toolchain(env, env.toolchain.path, args.regenerating)
-
-        env.save(args.builddir.string())
-
-        backend = list_backends()[env.backend]
-        build_inputs = build.configure_build(env, args.regenerating)
-        backend.write(env, build_inputs)
-        if env.compdb:
-            compdb.write(env, build_inputs)
+        with profiling(args.profile):
+            env = Environment.load(args.builddir.string())
+            init_probing(env)
+            if env.toolchain.path:
+                with profiler.span('load_toolchain', 'configure'):
+                    build.load_toolchain(env, env.toolchain.path,
+                                         args.regenerating)
+
+            env.save(args.builddir.string())
+
+            backend = list_backends()[env.backend]
+            build_inputs = build.configure_build(env, args.regenerating)
+            write_build_files(env, backend, build_inputs)
     except AbortConfigure:
         pass
     except Exception as e:
@@ -385,6 +426,10 @@ def main():
                               const=Regenerating.lazy,
                               default=Regenerating.true, dest='regenerating',
                               help='only regenerate if something changed')
+    regenerate_p.add_argument('--profile', metavar='FILE',
+                              type=argparse.File(),
+                              help=('write a Chrome trace of the ' +
+                                    'regeneration process to FILE'))
     regenerate_p.add_argument('builddir',
                               type=argparse.Directory(must_exist=True),
                               metavar='BUILDDIR', nargs='?', default='.',
@@ -1,15 +1,19 @@
 import json
 import os
 import platform
+import threading
 from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
 
+from . import log
 from . import platforms
+from . import profiler
 from . import tools
 from . import shell
 from .backends import list_backends
 from .file_types import Executable, Node
-from .iterutils import first, isiterable, listify
-from .path import abspath, InstallRoot, Path, Root
+from .iterutils import first, isiterable, iterate, listify
+from .path import abspath, InstallRoot, Path, PathVariables, Root
 from .tools.common import Command
 from .versioning import Version
 
@@ -125,7 +129,7 @@ class Toolchain:
 
 
 class Environment:
-    version = 17
+    version = 18
     envfile = '.bfg_environ'
 
     Mode = shell.Mode
@@ -135,6 +139,10 @@ class Environment:
         tools.init()
         env.__builders = {}
         env.__tools = {}
+        env.__lock = threading.Lock()
+        env.prefetch_enabled = False
+        env.probe_cache = None
+        env.__base_dirs = None
         return env
 
     def __init__(self, bfgdir, backend, backend_version, srcdir, builddir):
@@ -153,7 +161,8 @@ class Environment:
 
         self.variables = EnvVarDict(dict(os.environ))
 
-    def finalize(self, install_dirs, library_mode, compdb, extra_args=None):
+    def finalize(self, install_dirs, library_mode, compdb, extra_args=None,
+                 link_jobs=None):
         # Fill in any install dirs that aren't already set (e.g. by a
         # toolchain file) with defaults from the target platform, but skip
         # absolute paths if this is a cross-compilation build.
@@ -172,6 +181,7 @@ class Environment:
         self.library_mode = LibraryMode(*library_mode)
         self.compdb = compdb
         self.extra_args = extra_args
+        self.link_jobs = link_jobs
 
     def reload(self):
         self.variables.reset()
@@ -187,7 +197,11 @@ class Environment:
             Root.builddir: self.builddir
         }
         dirs.update(self.install_dirs)
-        return dirs
+        # Hand out the same mapping as long as the directories don't change so
+        # that callers share its cache of realized path strings.
+        if dirs != self.__base_dirs:
+            self.__base_dirs = PathVariables(dirs)
+        return self.__base_dirs
 
     @property
     def supports_destdir(self):
@@ -197,15 +211,82 @@ class Environment:
     def getvar(self, key, default=None):
         return self.variables.get(key, default)
 
+    def __claim(self, cache, key):
+        # Return the future for `key`, creating it if necessary. The second
+        # element of the result is True if the caller is responsible for
+        # filling in the future.
+        with self.__lock:
+            if key in cache:
+                return cache[key], False
+            future = cache[key] = Future()
+            return future, True
+
+    def __fill(self, cache, key, future, fn, defer=False):
+        try:
+            if defer:
+                # Hold onto any messages until someone asks for the result;
+                # otherwise, we'd warn about things the build never uses.
+                with log.deferred() as records:
+                    result = fn(self, key)
+                future.deferred_logs = records
+            else:
+                result = fn(self, key)
+            future.set_result(result)
+        except BaseException as e:
+            # Don't keep failures around; the next request for this key should
+            # try again.
+            with self.__lock:
+                del cache[key]
+            future.set_exception(e)
+
+    def __get(self, cache, key, fn):
+        while True:
+            future, owner = self.__claim(cache, key)
+            if owner:
+                self.__fill(cache, key, future, fn)
+            elif future.exception() is not None:
+                # Another thread (e.g. a prefetch) failed; try again here so
+                # that the error is reported from the caller's context.
+                continue
+
+            with self.__lock:
+                records = future.__dict__.pop('deferred_logs', None)
+            if records:
+                log.replay(records, stacklevel=2)
+            return future.result()
+
     def builder(self, lang):
-        if lang not in self.__builders:
-            self.__builders[lang] = tools.get_builder(self, lang)
-        return self.__builders[lang]
+        return self.__get(self.__builders, lang, tools.get_builder)
 
     def tool(self, name):
-        if name not in self.__tools:
-            self.__tools[name] = tools.get_tool(self, name)
-        return self.__tools[name]
+        return self.__get(self.__tools, name, tools.get_tool)
+
+    def prefetch(self, langs=(), tool_names=()):
+        # Start creating the builders for `langs` and the tools in `tool_names`
+        # in the background. Creating these usually involves running several
+        # subprocesses to probe the toolchain, so it's much faster to do them
+        # all at once.
+        if not self.prefetch_enabled:
+            return
+
+        jobs = []
+        langs = [i for i in iterate(langs) if tools.has_builder(i)]
+        for cache, keys, fn in ((self.__builders, langs, tools.get_builder),
+                                (self.__tools, tool_names, tools.get_tool)):
+            for i in iterate(keys):
+                future, owner = self.__claim(cache, i)
+                if owner:
+                    jobs.append((cache, i, future, fn))
+        if not jobs:
+            return
+
+        # Each job gets its own thread so that a job waiting on another
+        # (e.g. a builder that needs the C compiler) can't starve the pool.
+        executor = ThreadPoolExecutor(max_workers=len(jobs),
+                                      thread_name_prefix='bfg9000-prefetch')
+        for cache, key, future, fn in jobs:
+            executor.submit(self.__fill, cache, key, future, fn, True)
+        executor.shutdown(wait=False)
 
     def _runner(self, lang):
         try:
@@ -245,11 +326,22 @@ class Environment:
             env = env.copy()
             env.update(extra_env)
 
+        command = args
         if not kwargs.get('shell', False):
             args = Command.convert_args(args, lambda x: x.command)
+            if profiler.enabled():
+                command = shell.convert_args(args, self.base_dirs)
+
+        with profiler.span('execute', 'subprocess', command=command):
+            return shell.execute(args, env=env, base_dirs=self.base_dirs,
+                                 **kwargs)
 
-        return shell.execute(args, env=env, base_dirs=self.base_dirs,
-                             **kwargs)
+    def probe(self, args, *, env=None, **kwargs):
+        # Like `execute`, but for commands used to inspect the toolchain. If
+        # we have a probe cache, reuse the previous result when possible.
+        if self.probe_cache is None:
+            return self.execute(args, env=env, **kwargs)
+        return self.probe_cache.probe(self, args, env_vars=env, **kwargs)
 
     def run(self, args, lang=None, *posargs, **kwargs):
         return self.execute(self.run_arguments(args, lang), *posargs, **kwargs)
@@ -278,6 +370,7 @@ class Environment:
                     'library_mode': self.library_mode,
                     'compdb': self.compdb,
                     'extra_args': self.extra_args,
+                    'link_jobs': self.link_jobs,
 
                     'variables': self.variables.to_json(),
                 }
@@ -381,6 +474,10 @@ class Environment:
 
         # ----- bfg v0.7.0 -----
 
+        # v18 adds a limit on the number of concurrent link steps.
+        if version < 18:
+            data['link_jobs'] = None
+
         # Now that we've upgraded, initialize the Environment object.
         env = cls.__new__(cls)
 
@@ -389,7 +486,7 @@ class Environment:
             data['target_platform']
         )
 
-        for i in ('backend', 'extra_args'):
+        for i in ('backend', 'extra_args', 'link_jobs'):
             setattr(env, i, data[i])
 
         for i in ('bfgdir', 'srcdir', 'builddir'):
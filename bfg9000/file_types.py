@@ -7,24 +7,61 @@ class DefaultHandler(RuntimeError):
     pass
 
 
+_slot_names = {}
+
+
+def _attrs(obj):
+    # Get all the attributes set on an object, whether they're stored in slots
+    # or in the object's `__dict__`. This looks at the object's own storage,
+    # bypassing any `__getattr__` (e.g. for lazily-allocated attributes) or
+    # proxying `__getattribute__`.
+    cls = type(obj)
+    try:
+        names = _slot_names[cls]
+    except KeyError:
+        names = _slot_names[cls] = [
+            name for i in reversed(cls.__mro__)
+            for name in _iterutils.iterate(vars(i).get('__slots__'))
+            if name not in ('__dict__', '__weakref__')
+        ]
+
+    getattribute = object.__getattribute__
+    for i in names:
+        try:
+            yield i, getattribute(obj, i)
+        except AttributeError:
+            pass
+    try:
+        yield from getattribute(obj, '__dict__').items()
+    except AttributeError:
+        pass
+
+
 class Cloneable:
+    __slots__ = ()
     _clone_handlers = {}
 
     class handler:
-        def __init__(self, fn):
+        # Since file types store their attributes in slots, handlers are
+        # registered for an attribute name instead of shadowing the attribute.
+        def __init__(self, attr):
+            self.attr = attr
+
+        def __call__(self, fn):
             self.fn = fn
+            return self
 
         def __set_name__(self, owner, name):
             # Ensure each class setting a handler has its own set of handlers.
             if '_clone_handlers' not in vars(owner):
                 owner._clone_handlers = owner._clone_handlers.copy()
-            owner._clone_handlers[name] = self.fn
+            owner._clone_handlers[self.attr] = self.fn
 
     def __init__(self, *, parent=None):
         self.parent = parent
 
-    @handler
-    def parent(old, new, pathfn, recursive, *args):
+    @handler('parent')
+    def _clone_parent(old, new, pathfn, recursive, *args):
         if not recursive:
             return None
         raise DefaultHandler()
@@ -34,9 +71,9 @@ class Cloneable:
             # Clone the parent...
             pclone = self.parent.clone(pathfn, recursive)
             # ... and then find ourself in the parent.
-            for k, v in vars(self.parent).items():
+            for k, v in _attrs(self.parent):
                 if self is v:
-                    return vars(pclone)[k]
+                    return getattr(pclone, k)
             raise TypeError('unable to find self in parent')
         else:
             return self.do_clone(pathfn, recursive)
@@ -70,12 +107,17 @@ class Cloneable:
 
         clone = type(self).__new__(type(self))
         seen[id(self)] = clone
-        for k, v in vars(self).items():
+        for k, v in list(_attrs(self)):
             setattr(clone, k, clone_attr(v, attr_name=k))
         return clone
 
 
 class Node(_safe_str.safe_string_ops):
+    # Common attributes are stored in slots to save memory, but keep a
+    # `__dict__` so that build scripts and plugins can still attach their own
+    # attributes to files. It's only allocated when something's put in it.
+    __slots__ = ('creator', 'path', 'private', '__dict__')
+
     def __init__(self, path, *, private=False, **kwargs):
         super().__init__(**kwargs)
         self.creator = None
@@ -105,14 +147,16 @@ class Node(_safe_str.safe_string_ops):
 
 
 class Phony(Node):
-    pass
+    __slots__ = ()
 
 
 class BaseFile(Cloneable):
-    pass
+    __slots__ = ()
 
 
 class FileOrDirectory(Node, BaseFile):
+    __slots__ = ('parent', 'post_install')
+
     install_kind = 'data'
     install_root = None
 
@@ -124,12 +168,14 @@ class FileOrDirectory(Node, BaseFile):
     def install_deps(self):
         return []
 
-    @Cloneable.handler
-    def creator(old, new, pathfn, *args):
+    @Cloneable.handler('creator')
+    def _clone_creator(old, new, pathfn, *args):
         return None
 
 
 class File(FileOrDirectory):
+    __slots__ = ()
+
     def __init__(self, path, **kwargs):
         if path.directory:
             raise ValueError('expected a non-directory')
@@ -143,6 +189,8 @@ class File(FileOrDirectory):
 
 
 class Directory(FileOrDirectory):
+    __slots__ = ('files',)
+
     def __init__(self, path, files=None, **kwargs):
         super().__init__(path.as_directory(), **kwargs)
         self.files = files
@@ -153,24 +201,30 @@ class Directory(FileOrDirectory):
 
 
 class CodeFile(File):
+    __slots__ = ('lang',)
+
     def __init__(self, path, lang, **kwargs):
         super().__init__(path, **kwargs)
         self.lang = lang
 
 
 class SourceFile(CodeFile):
-    pass
+    __slots__ = ()
 
 
 class HeaderFile(CodeFile):
+    __slots__ = ()
     install_root = _path.InstallRoot.includedir
 
 
 class PrecompiledHeader(HeaderFile):
+    __slots__ = ()
     install_root = None
 
 
 class MsvcPrecompiledHeader(PrecompiledHeader):
+    __slots__ = ('object_file', 'header_name')
+
     def __init__(self, path, object_path, header_name, format, lang, **kwargs):
         super().__init__(path, lang, **kwargs)
         self.object_file = ObjectFile(object_path, format, self.lang,
@@ -179,6 +233,7 @@ class MsvcPrecompiledHeader(PrecompiledHeader):
 
 
 class HeaderDirectory(Directory):
+    __slots__ = ('system', 'langs')
     install_root = _path.InstallRoot.includedir
 
     def __init__(self, path, files=None, system=False, langs=None, **kwargs):
@@ -188,10 +243,11 @@ class HeaderDirectory(Directory):
 
 
 class ModuleDefFile(File):
-    pass
+    __slots__ = ()
 
 
 class ManPage(File):
+    __slots__ = ('level',)
     install_root = _path.InstallRoot.mandir
 
     def __init__(self, path, level, **kwargs):
@@ -204,6 +260,7 @@ class ManPage(File):
 
 
 class Binary(File):
+    __slots__ = ('format', 'lang')
     install_root = _path.InstallRoot.libdir
 
     def __init__(self, path, format, lang=None, **kwargs):
@@ -213,12 +270,15 @@ class Binary(File):
 
 
 class ObjectFile(Binary):
-    pass
+    # `extra_objects` is only set for objects that need other objects linked
+    # alongside them (e.g. MSVC's precompiled headers).
+    __slots__ = ('extra_objects',)
 
 
 # This is used by JVM languages to hold a list of all the object files
 # generated by a particular source file's compilation.
 class ObjectFileList(ObjectFile):
+    __slots__ = ('object_file',)
     install_root = None
 
     def __init__(self, path, object_name, format, lang=None, **kwargs):
@@ -230,11 +290,18 @@ class ObjectFileList(ObjectFile):
 # similar process applied to it) so that it can be used by a linker/loader,
 # installed to the system, etc.
 class LinkedBinary(Binary):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.runtime_deps = []
-        self.linktime_deps = []
-        self.package_deps = []
+    __slots__ = ('runtime_deps', 'linktime_deps', 'package_deps')
+    _lazy_lists = frozenset(__slots__)
+
+    def __getattr__(self, name):
+        # Most binaries never have any of these dependencies, so only allocate
+        # the lists once they're first used.
+        if name not in self._lazy_lists:
+            raise AttributeError('{!r} object has no attribute {!r}'
+                                 .format(type(self).__name__, name))
+        value = []
+        setattr(self, name, value)
+        return value
 
     @property
     def install_deps(self):
@@ -242,11 +309,14 @@ class LinkedBinary(Binary):
 
 
 class Executable(LinkedBinary):
+    __slots__ = ()
     install_kind = 'program'
     install_root = _path.InstallRoot.bindir
 
 
 class Library(LinkedBinary):
+    __slots__ = ()
+
     @property
     def runtime_file(self):
         return None
@@ -256,11 +326,13 @@ class Library(LinkedBinary):
 # Multiple inheritance is a sign that we should perhaps switch to a trait-based
 # system though...
 class ExecutableLibrary(Executable, Library):
+    __slots__ = ()
     install_kind = 'program'
     install_root = _path.InstallRoot.libdir
 
 
 class SharedLibrary(Library):
+    __slots__ = ()
     install_kind = 'program'
 
     @property
@@ -269,6 +341,8 @@ class SharedLibrary(Library):
 
 
 class LinkLibrary(SharedLibrary):
+    __slots__ = ('library',)
+
     def __init__(self, path, library, **kwargs):
         super().__init__(path, library.format, library.lang, **kwargs)
         self.library = library
@@ -280,6 +354,8 @@ class LinkLibrary(SharedLibrary):
 
 
 class LoadLibrary(LinkLibrary):
+    __slots__ = ()
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.runtime_deps = [self.library]
@@ -290,6 +366,8 @@ class LoadLibrary(LinkLibrary):
 
 
 class VersionedSharedLibrary(SharedLibrary):
+    __slots__ = ('soname', 'link')
+
     def __init__(self, path, format, lang, soname_path, linkname_path,
                  **kwargs):
         super().__init__(path, format, lang, **kwargs)
@@ -304,12 +382,16 @@ class VersionedSharedLibrary(SharedLibrary):
 
 
 class StaticLibrary(Library):
+    __slots__ = ('forward_opts',)
+
     def __init__(self, path, format, lang=None, forward_opts=None, **kwargs):
         super().__init__(path, format, lang, **kwargs)
         self.forward_opts = forward_opts
 
 
 class WholeArchive(StaticLibrary):
+    __slots__ = ('library',)
+
     def __init__(self, library):
         self.library = library
 
@@ -320,6 +402,8 @@ class WholeArchive(StaticLibrary):
 
 
 class ExportFile(File):
+    __slots__ = ()
+
     def __init__(self, path, *, private=True, **kwargs):
         super().__init__(path, private=private, **kwargs)
 
@@ -329,6 +413,7 @@ class ExportFile(File):
 # shared libraries). While this is a "library" in some senses, since you can't
 # link to it during building, we just consider it a LinkedBinary.
 class DllBinary(LinkedBinary):
+    __slots__ = ('import_lib', 'export_file')
     install_root = _path.InstallRoot.bindir
 
     def __init__(self, path, format, lang, import_path, export_path=None, *,
@@ -344,6 +429,8 @@ class DllBinary(LinkedBinary):
 
 
 class DualUseLibrary(BaseFile):
+    __slots__ = ('parent', 'shared', 'static', '__dict__')
+
     def __init__(self, shared, static):
         super().__init__()
         self.shared = shared
@@ -354,15 +441,15 @@ class DualUseLibrary(BaseFile):
     def all(self):
         return [self.shared, self.static]
 
-    @Cloneable.handler
-    def shared(old, new, pathfn, *args):
+    @Cloneable.handler('shared')
+    def _clone_shared(old, new, pathfn, *args):
         # Always clone the shared library, even when cloning non-recursively.
         shared = old.shared.do_clone(pathfn, *args)
         shared.parent = new
         return shared
 
-    @Cloneable.handler
-    def static(old, new, pathfn, *args):
+    @Cloneable.handler('static')
+    def _clone_static(old, new, pathfn, *args):
         # Ditto for cloning the static library.
         static = old.static.do_clone(pathfn, *args)
         static.parent = new
@@ -395,4 +482,5 @@ class DualUseLibrary(BaseFile):
 
 
 class PkgConfigPcFile(File):
+    __slots__ = ()
     install_root = _path.InstallRoot.libdir
@@ -232,3 +232,121 @@ class NameGlob(Glob):
             found_type = self.Type.dir if path.directory else self.Type.file
             return bool(self.type & found_type)
         return False
+
+
+class PathGlobSet:
+    # A set of `PathGlob`s compiled into a single matcher. `match` returns the
+    # same result as OR-ing together the results of each glob's `match`
+    # (skipping the base check if there's only one glob), but splits the path
+    # once and checks each distinct base only once.
+    _entry = namedtuple('_entry', ['first', 'rest', 'type'])
+
+    def __init__(self, globs):
+        self.globs = tuple(globs)
+        self._skip_base = len(self.globs) == 1
+
+        groups = {}
+        for i in self.globs:
+            key = (i.base.root, tuple(i.base.split()))
+            groups.setdefault(key, []).append(self._entry(
+                i.glob[0].matchers,
+                i.glob[1:] if len(i.glob) > 1 else None,
+                i.type
+            ))
+        self._groups = [(root, base, entries)
+                        for (root, base), entries in groups.items()]
+
+    @staticmethod
+    def _match_runs(runs, bits, start):
+        # Each run but the last can start anywhere, so long as there's room
+        # for the remaining runs. Taking the earliest match for each is always
+        # safe, since that leaves the most room for the rest.
+        for run in runs[:-1]:
+            n = len(run.matchers)
+            for offset in range(start, len(bits) - run.length + 1):
+                if all(m(b) for m, b in zip(run.matchers,
+                                            bits[offset:offset + n])):
+                    start = offset + n
+                    break
+            else:
+                return False
+
+        # The last run must match the end of the path.
+        last = runs[-1].matchers
+        end = max(start, len(bits) - len(last))
+        if len(bits) - end < len(last):
+            return False
+        return all(m(b) for m, b in zip(last, bits[end:]))
+
+    def _match_entry(self, entry, bits, start, found_type):
+        for m in entry.first:
+            if start >= len(bits):
+                # `path` is a parent of our pattern.
+                return PathGlob.Result.no
+            if not m(bits[start]):
+                # `path` diverges from our pattern, so no children of `path`
+                # could ever match.
+                return PathGlob.Result.never
+            start += 1
+
+        if entry.rest is None:
+            if start < len(bits):
+                # `path` is a child of our pattern, and we're not looking for
+                # children.
+                return PathGlob.Result.never
+        elif not self._match_runs(entry.rest, bits, start):
+            return PathGlob.Result.no
+
+        if entry.type & found_type:
+            return PathGlob.Result.yes
+        return PathGlob.Result.no
+
+    def _match_base(self, path, root, base, bits):
+        if self._skip_base:
+            return PathGlob.Result.yes
+        if path.root != root:
+            return PathGlob.Result.no
+        for i, expected in enumerate(base):
+            if i >= len(bits):
+                return PathGlob.Result.no
+            if bits[i] != expected:
+                return PathGlob.Result.never
+        return PathGlob.Result.yes
+
+    def match(self, path):
+        bits = path.split()
+        found_type = Glob.Type.dir if path.directory else Glob.Type.file
+
+        result = PathGlob.Result.never
+        for root, base, entries in self._groups:
+            base_result = self._match_base(path, root, base, bits)
+            if not base_result:
+                result |= base_result
+                continue
+
+            start = min(len(base), len(bits))
+            for i in entries:
+                entry_result = self._match_entry(i, bits, start, found_type)
+                if entry_result:
+                    return entry_result
+                result |= entry_result
+        return result
+
+
+class NameGlobSet:
+    # A set of `NameGlob`s compiled into a single regex for each file type.
+    # `match` returns True if any of the globs match.
+
+    def __init__(self, globs):
+        self.globs = tuple(globs)
+        self._matchers = {}
+        for t in (Glob.Type.file, Glob.Type.dir):
+            patterns = [i.regex.pattern for i in self.globs if i.type & t]
+            self._matchers[t] = (re.compile('|'.join(
+                '(?:{})'.format(i) for i in patterns
+            )).match if patterns else None)
+
+    def match(self, path):
+        found_type = Glob.Type.dir if path.directory else Glob.Type.file
+        matcher = self._matchers[found_type]
+        return bool(matcher and matcher(path.basename()))
@@ -0,0 +1,53 @@
+import filecmp
+import os
+import shutil
+
+from .app_version import version
+from .arguments import parser as argparse
+
+_backup_ext = '.keepmtime'
+
+
+def save(outputs):
+    # Keep a copy of each output that already exists so that we can tell
+    # afterwards whether the command actually changed it.
+    for i in outputs:
+        if os.path.isfile(i):
+            shutil.copy2(i, i + _backup_ext)
+
+
+def restore(outputs):
+    # If an output was rewritten with the same contents, put its old
+    # timestamps back so that anything depending on it isn't rebuilt.
+    for i in outputs:
+        backup = i + _backup_ext
+        if not os.path.exists(backup):
+            continue
+        if os.path.isfile(i) and filecmp.cmp(i, backup, shallow=False):
+            stat = os.stat(backup)
+            os.utime(i, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        os.remove(backup)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='bfg9000-keepmtime',
+        description=("Save copies of a command's outputs before running it " +
+                     'and afterwards restore the timestamps of any outputs ' +
+                     'whose contents are unchanged.')
+    )
+    parser.add_argument('--version', action='version',
+                        version='%(prog)s ' + version)
+    parser.add_argument('action', choices=['save', 'restore'],
+                        help='the action to perform')
+    parser.add_argument('outputs', nargs='+', metavar='OUTPUT',
+                        help='the outputs of the command')
+    args = parser.parse_args()
+
+    try:
+        if args.action == 'save':
+            save(args.outputs)
+        else:
+            restore(args.outputs)
+    except Exception as e:
+        parser.error(e)
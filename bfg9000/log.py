@@ -2,8 +2,10 @@ import colorama
 import logging
 import os
 import sys
+import threading
 import traceback
 import warnings
+from contextlib import contextmanager
 from logging import (getLogger, CRITICAL, ERROR, WARNING, INFO,  # noqa: F401
                      DEBUG)
 from traceback import FrameSummary
@@ -220,8 +222,40 @@ def init(color='auto', debug=False, warn_once=False, environ=os.environ):
     _init_logging(logging.root, debug)
 
 
+_local = threading.local()
+
+
+@contextmanager
+def deferred():
+    # Collect the messages logged by this thread instead of emitting them. The
+    # caller can then pass them to `replay` once it knows they're relevant.
+    # This lets work started speculatively in the background stay quiet until
+    # something actually needs its result.
+    records = []
+    old = getattr(_local, 'deferred', None)
+    _local.deferred = records
+    try:
+        yield records
+    finally:
+        _local.deferred = old
+
+
+def replay(records, stacklevel=0):
+    # Log the deferred messages as though they came from the caller so that
+    # they point to the relevant part of the user's build script.
+    for level, message, args, kwargs in records:
+        log_stack(level, message, *args, stacklevel=stacklevel + 1, **kwargs)
+
+
 def log_stack(level, message, *args, logger=logging, stacklevel=0,
               show_stack=True, **kwargs):
+    records = getattr(_local, 'deferred', None)
+    if records is not None:
+        records.append((level, message, args, dict(
+            kwargs, logger=logger, show_stack=show_stack
+        )))
+        return
+
     extra = {
         'full_stack': traceback.extract_stack()[1:-1 - stacklevel],
         'show_stack': show_stack
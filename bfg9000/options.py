@@ -1,22 +1,56 @@
 import enum
 import sys
 from collections import namedtuple
+from itertools import chain
 from inspect import Signature, Parameter
 
 from . import path, safe_str
-from .iterutils import isiterable
+from .iterutils import isiterable, uniques
 from .file_types import *
 from .packages import Framework
 
 
+def _match_key(option):
+    return option.match_key() if isinstance(option, Option) else None
+
+
 class option_list:
+    __slots__ = ('_options', '_keys', '_unkeyed')
+
     def __init__(self, *args):
         self._options = []
+        # To check for duplicate options quickly, we index them by their match
+        # keys. Options without a key (e.g. because one of their fields is
+        # unhashable) are kept aside and compared one at a time. Most option
+        # lists are empty, so the index is only allocated once it's needed.
+        self._keys = frozenset()
+        self._unkeyed = ()
         self.collect(*args)
 
+    def _is_duplicate(self, option, key):
+        if key is None:
+            return any(option.matches(i) for i in self._options)
+        return key in self._keys or any(option.matches(i)
+                                        for i in self._unkeyed)
+
+    def _index(self, option, key):
+        if key is None:
+            if not self._unkeyed:
+                self._unkeyed = []
+            self._unkeyed.append(option)
+        else:
+            if not self._keys:
+                self._keys = set()
+            self._keys.add(key)
+
     def append(self, option):
-        if ( isinstance(option, safe_str.stringy_types) or
-             not any(option.matches(i) for i in self._options) ):
+        if isinstance(option, safe_str.stringy_types):
+            self._options.append(option)
+            return
+
+        key = _match_key(option)
+        if not self._is_duplicate(option, key):
+            self._index(option, key)
             self._options.append(option)
 
     def extend(self, options):
@@ -50,6 +84,27 @@ class option_list:
 
     def __setitem__(self, key, value):
         self._options[key] = value
+        self._keys = frozenset()
+        self._unkeyed = ()
+        for i in self._options:
+            if not isinstance(i, safe_str.stringy_types):
+                self._index(i, _match_key(i))
+
+    def flags_key(self):
+        # Return a hashable key for the flags of the whole list, or None if any
+        # of its options has no key of its own.
+        result = []
+        for i in self._options:
+            if isinstance(i, str):
+                key = i
+            elif isinstance(i, Option):
+                key = i.flags_key()
+            else:
+                key = None
+            if key is None:
+                return None
+            result.append(key)
+        return tuple(result)
 
     def __eq__(self, rhs):
         return type(self) is type(rhs) and self._options == rhs._options
@@ -76,8 +131,22 @@ class option_list:
         return self
 
 
+def _uniques_last(iterable):
+    # Like `uniques`, but keep the *last* occurrence of each item. When
+    # linking static libraries, this ensures each library still comes after
+    # everything that depends on it.
+    return uniques(reversed(iterable))[::-1]
+
+
+def _unique_objects(iterable):
+    # ForwardOptions aren't hashable, so compare them by identity.
+    return list({id(i): i for i in iterable}.values())
+
+
 class ForwardOptions:
-    __slots__ = ['compile_options', 'link_options', 'libs', 'packages']
+    __slots__ = ['compile_options', 'link_options', 'libs', 'packages',
+                 '_closure']
+    _fields = ('compile_options', 'link_options', 'libs', 'packages')
 
     def __init__(self, *, compile_options=None, link_options=None, libs=None,
                  packages=None):
@@ -85,28 +154,54 @@ class ForwardOptions:
         self.link_options = link_options or option_list()
         self.libs = libs or []
         self.packages = packages or []
+        self._closure = None
 
     def update(self, rhs):
-        for i in self.__slots__:
+        for i in self._fields:
             getattr(self, i).extend(getattr(rhs, i))
+        self._closure = None
 
     def __eq__(self, rhs):
-        return all(getattr(self, i) == getattr(rhs, i) for i in self.__slots__)
+        return all(getattr(self, i) == getattr(rhs, i) for i in self._fields)
 
     def __repr__(self):
-        return repr({i: getattr(self, i) for i in self.__slots__})
+        return repr({i: getattr(self, i) for i in self._fields})
+
+    @staticmethod
+    def _walk(libs):
+        visited, all_libs, packages = [], [], []
+        for i in libs:
+            forward_opts = getattr(i, 'forward_opts', None)
+            if forward_opts:
+                closure = forward_opts._transitive()
+                visited.extend(closure[0])
+                all_libs.extend(closure[1])
+                packages.extend(closure[2])
+        return visited, all_libs, packages
+
+    def _transitive(self):
+        # Compute the transitive closure of the libraries we forward to once
+        # and remember it, since the same static library is usually reachable
+        # along many paths through the dependency graph. This holds the
+        # ForwardOptions for every library in the closure (in the order they
+        # were first reached), plus all the libraries and packages to link to.
+        if self._closure is None:
+            visited, libs, packages = self._walk(self.libs)
+            self._closure = (
+                _unique_objects(chain([self], visited)),
+                _uniques_last(self.libs + libs),
+                _uniques_last(self.packages + packages),
+            )
+        return self._closure
 
     @classmethod
     def recurse(cls, libs):
-        def do_recurse(result, libs):
-            for i in libs:
-                forward_opts = getattr(i, 'forward_opts', None)
-                if forward_opts:
-                    result.update(forward_opts)
-                    do_recurse(result, forward_opts.libs)
-
-        result = cls()
-        do_recurse(result, libs)
+        visited, libs, packages = cls._walk(libs)
+        result = cls(libs=_uniques_last(libs),
+                     packages=_uniques_last(packages))
+        for i in _unique_objects(visited):
+            result.compile_options.extend(i.compile_options)
+            result.link_options.extend(i.link_options)
         return result
 
 
@@ -135,6 +230,32 @@ def _get_annotations(thing):
     return typ.__dict__.get('__annotations__', {})
 
 
+def _freeze(value):
+    return tuple(value) if isinstance(value, list) else value
+
+
+class _identity:
+    # Wrap an object so that it compares equal only to itself.
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __hash__(self):
+        return id(self.value)
+
+    def __eq__(self, rhs):
+        return type(rhs) is _identity and self.value is rhs.value
+
+
+def _freeze_flags(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze_flags(i) for i in value)
+    elif isinstance(value, Node):
+        return _identity(value)
+    return value
+
+
 class OptionMeta(type):
     @staticmethod
     def __make_parameters(fields, defaults):
@@ -212,6 +333,34 @@ class Option(metaclass=OptionMeta):
     def matches(self, rhs):
         return self == rhs
 
+    def match_key(self):
+        # Return a hashable key such that two options have equal keys if and
+        # only if they match, or None if there's no such key. Subclasses that
+        # override `matches` should override this too.
+        if type(self).matches is not Option.matches:
+            return None
+        try:
+            key = (type(self),) + tuple(_freeze(getattr(self, i))
+                                        for i in self.__slots__)
+            hash(key)
+            return key
+        except TypeError:
+            return None
+
+    def flags_key(self):
+        # Return a hashable key such that two options with equal keys always
+        # produce the same flags, or None if there's no such key. This differs
+        # from `match_key` in that file objects are compared by identity, since
+        # tools can read more from them than their paths (e.g. whether a
+        # header directory is a system directory).
+        try:
+            key = (type(self),) + tuple(_freeze_flags(getattr(self, i))
+                                        for i in self.__slots__)
+            hash(key)
+            return key
+        except TypeError:
+            return None
+
     def __eq__(self, rhs):
         return type(self) is type(rhs) and all(
             getattr(self, i) == getattr(rhs, i) for i in self.__slots__
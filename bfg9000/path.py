@@ -4,7 +4,7 @@ import os
 from contextlib import contextmanager
 
 from .platforms.basepath import (BasePath, Root, InstallRoot,  # noqa: F401
-                                 DestDir)
+                                 DestDir, PathVariables)
 from .platforms.host import platform_info
 
 Path = platform_info().Path
@@ -95,30 +95,72 @@ def touch(path, variables=None):
     os.utime(path.string(variables), None)
 
 
-def listdir(path, variables=None):
-    dirs, nondirs = [], []
+def _scandir(path, variables=None):
+    # Use the type information from `os.scandir` so that we don't need to stat
+    # each entry separately. Like `os.path.isdir`, `is_dir()` follows symlinks;
+    # we also report which directories are symlinks so `walk` can skip them.
+    dirs, nondirs, links = [], [], set()
     try:
-        names = os.listdir(path.string(variables))
-        for name in names:
-            curpath = path.append(name)
-            if isdir(curpath, variables):
-                dirs.append(curpath.as_directory())
-            else:
-                nondirs.append(curpath)
+        with os.scandir(path.string(variables)) as it:
+            for entry in it:
+                curpath = path.append(entry.name)
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+
+                if is_dir:
+                    curpath = curpath.as_directory()
+                    dirs.append(curpath)
+                    if entry.is_symlink():
+                        links.add(curpath)
+                else:
+                    nondirs.append(curpath)
     except OSError:
         pass
+    return dirs, nondirs, links
+
+
+def listdir(path, variables=None):
+    dirs, nondirs, _ = _scandir(path, variables)
     return dirs, nondirs
 
 
-def walk(top, variables=None):
-    if not exists(top, variables):
+def walk(top, variables=None, cache=None, mtimes=None):
+    # If `cache` is a dict, use it to store the contents of each directory we
+    # list so that multiple walks over the same tree only list it once. If
+    # `mtimes` is a dict, fill it with the modification time of each directory
+    # we walk.
+    if (cache is None or top not in cache) and not exists(top, variables):
         return
-    dirs, nondirs = listdir(top, variables)
-    yield top, dirs, nondirs
-    for d in dirs:
-        if not islink(d, variables):
-            for i in walk(d, variables):
-                yield i
+
+    # Walk the tree iteratively (in the same order as a recursive, top-down
+    # walk). Callers may remove items from `dirs` to avoid descending into
+    # them.
+    stack = [top]
+    while stack:
+        base = stack.pop()
+        if cache is not None and base in cache:
+            mtime, (dirs, nondirs, links) = cache[base]
+        else:
+            # Get the modification time *before* listing the directory. That
+            # way, if an entry is added or removed while we're listing it, the
+            # time we recorded is already out of date, and anyone checking it
+            # later will see that the directory changed.
+            mtime = None
+            if cache is not None or mtimes is not None:
+                mtime = getmtime_ns(base, variables, strict=False)
+            dirs, nondirs, links = _scandir(base, variables)
+            if cache is not None:
+                cache[base] = (mtime, (dirs, nondirs, links))
+
+        if cache is not None:
+            dirs, nondirs = list(dirs), list(nondirs)
+        if mtimes is not None:
+            mtimes[base] = mtime
+
+        yield base, dirs, nondirs
+        stack.extend(i for i in reversed(dirs) if i not in links)
 
 
 @contextmanager
@@ -132,3 +174,43 @@ def pushd(dirname, makedirs=False, mode=0o777, exist_ok=False):
         yield
     finally:
         os.chdir(old)
+
+
+def _same_contents(a, b, bufsize=65536):
+    try:
+        if os.path.getsize(a) != os.path.getsize(b):
+            return False
+        with open(a, 'rb') as fa, open(b, 'rb') as fb:
+            while True:
+                chunk = fa.read(bufsize)
+                if chunk != fb.read(bufsize):
+                    return False
+                if not chunk:
+                    return True
+    except OSError:
+        return False
+
+
+@contextmanager
+def write_if_changed(filename, *, touch=False):
+    # Write to a temporary file first and only replace `filename` if its
+    # contents would change. This avoids needlessly updating the file's
+    # modification time (which would make build systems, IDEs, etc think it's
+    # changed). If `touch` is true, update the modification time anyway; this
+    # is useful for outputs of the regeneration step. The comparison is done
+    # in chunks so that very large files never need to be held in memory.
+    tmpname = '{}.{}.tmp'.format(filename, os.getpid())
+    try:
+        with open(tmpname, 'w') as out:
+            yield out
+
+        if _same_contents(tmpname, filename):
+            os.remove(tmpname)
+            if touch:
+                os.utime(filename, None)
+        else:
+            os.replace(tmpname, filename)
+    except BaseException:
+        if os.path.exists(tmpname):
+            os.remove(tmpname)
+        raise
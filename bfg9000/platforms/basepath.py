@@ -1,6 +1,9 @@
 import ntpath
 import os
 import posixpath
+import threading
+import weakref
+from collections import deque
 from enum import Enum
 from itertools import chain
 
@@ -13,8 +16,42 @@ InstallRoot = Enum('InstallRoot', ['prefix', 'exec_prefix', 'bindir', 'libdir',
 DestDir = Enum('DestDir', ['destdir'])
 
 
+class PathVariables(dict):
+    # A mapping of path roots to their values that also remembers the strings
+    # of the paths realized with it. Since paths are immutable, this is safe as
+    # long as the mapping itself is never modified. The cache is cleared once
+    # it gets too large so that we don't hold onto every path's string.
+    __slots__ = ('strings',)
+    max_strings = 4096
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.strings = {}
+
+
+class _InternTable(dict):
+    # A mapping of suffixes to weak references to paths. Rather than removing
+    # each entry as soon as its path is freed (which can happen on any thread
+    # at any time), we just count the dead entries and let the owner sweep them
+    # out in bulk once they make up half of the table.
+    __slots__ = ('dead', 'release')
+
+    def __init__(self):
+        self.dead = 0
+        self.release = self._release
+
+    def _release(self, ref):
+        self.dead += 1
+
+    def sweep(self):
+        if self.dead * 2 > len(self):
+            for k in [k for k, v in self.items() if v() is None]:
+                del self[k]
+            self.dead = 0
+
+
 class BasePath(safe_str.safe_string):
-    __slots__ = ['destdir', 'root', 'suffix']
+    __slots__ = ['destdir', 'directory', 'root', 'suffix', '__weakref__']
 
     curdir = posixpath.curdir
     pardir = posixpath.pardir
@@ -25,11 +62,36 @@ class BasePath(safe_str.safe_string):
         [(DestDir.destdir, '$(DESTDIR)')]
     )
 
-    def __init__(self, path, root=Root.builddir, destdir=None, directory=None):
+    # Paths are immutable, so equal paths are interned and share a single
+    # object. The table is keyed by the path's type, root, and flags, and then
+    # by its normalized suffix; this way, creating a path from an
+    # already-normalized string (e.g. when deriving one path from another)
+    # can skip normalization entirely. The tables only hold weak references,
+    # so paths that are no longer used anywhere else can still be freed.
+    __interned = {}
+    # Keep the most recently-created paths alive too, since short-lived paths
+    # (e.g. the parent directory of each file) tend to be recreated soon after.
+    _recent = deque(maxlen=1024)
+    # Paths may be created from several threads at once (e.g. while prefetching
+    # builders), so guard any changes to the tables above. Looking up existing
+    # paths doesn't need the lock.
+    __lock = threading.Lock()
+
+    def __new__(cls, path, root=Root.builddir, destdir=None, directory=None):
+        if ( isinstance(path, str) and isinstance(root, (Root, InstallRoot))
+             and not path.startswith('~') ):
+            table = cls.__interned.get((cls, root, bool(destdir),
+                                        bool(directory)))
+            ref = None if table is None else table.get(path)
+            if ref is not None:
+                result = ref()
+                if result is not None:
+                    return result
+
         if destdir and isinstance(root, Root) and root != Root.absolute:
             raise ValueError('destdir only applies to absolute or install ' +
                              'paths')
-        drive, normpath, isdir = self.__normalize(path, expand_user=True)
+        drive, normpath, isdir = cls.__normalize(path, expand_user=True)
         if directory is False and isdir:
             raise ValueError('expected a non-directory path')
 
@@ -38,7 +100,7 @@ class BasePath(safe_str.safe_string):
         elif root == Root.absolute:
             raise ValueError("'{}' is not absolute".format(path))
         elif isinstance(root, BasePath):
-            normpath, isdir = self.__join(root.suffix, path)
+            normpath, isdir = cls.__join(root.suffix, path)
             if destdir is None:
                 destdir = root.destdir
             root = root.root
@@ -49,10 +111,36 @@ class BasePath(safe_str.safe_string):
              normpath.startswith(posixpath.pardir + posixpath.sep) ):
             raise ValueError("too many '..': path cannot escape root")
 
-        self.suffix = drive + normpath
-        self.root = root
-        self.directory = directory or isdir or normpath == ''
-        self.destdir = bool(destdir)
+        return cls.__intern(drive + normpath, root, bool(destdir),
+                            bool(directory or isdir or normpath == ''))
+
+    @classmethod
+    def __intern(cls, suffix, root, destdir, directory):
+        key = (cls, root, destdir, directory)
+        with cls.__lock:
+            table = cls.__interned.get(key)
+            if table is None:
+                table = cls.__interned[key] = _InternTable()
+            else:
+                ref = table.get(suffix)
+                result = None if ref is None else ref()
+                if result is not None:
+                    return result
+                table.sweep()
+
+            self = super().__new__(cls)
+            self.suffix = suffix
+            self.root = root
+            self.directory = directory
+            self.destdir = destdir
+            table[suffix] = weakref.ref(self, table.release)
+            cls._recent.append(self)
+            return self
+
+    def __reduce__(self):
+        # Go through `__new__` so that copied or unpickled paths are interned.
+        return (type(self), (self.suffix, self.root, self.destdir,
+                             self.directory))
 
     @classmethod
     def abspath(cls, path, directory=None, absdrive=True):
@@ -115,7 +203,7 @@ class BasePath(safe_str.safe_string):
     def as_directory(self):
         if self.directory:
             return self
-        return type(self)(self.suffix, self.root, self.destdir, True)
+        return self.__intern(self.suffix, self.root, self.destdir, True)
 
     def has_drive(self):
         return (self.root == Root.absolute and
@@ -162,8 +250,11 @@ class BasePath(safe_str.safe_string):
         if self.root != start.root:
             raise ValueError('source mismatch')
 
-        rel = posixpath.relpath(self.suffix or posixpath.curdir,
-                                start.suffix or posixpath.curdir)
+        if start.suffix:
+            rel = posixpath.relpath(self.suffix or posixpath.curdir,
+                                    start.suffix)
+        else:
+            rel = self.suffix or posixpath.curdir
         if prefix and rel == posixpath.curdir:
             return prefix
         result = posixpath.join(prefix, rel)
@@ -219,6 +310,13 @@ class BasePath(safe_str.safe_string):
                 self.__localize(suffix, localize))
 
     def string(self, variables=None):
+        strings = getattr(variables, 'strings', None)
+        if strings is not None:
+            try:
+                return strings[self]
+            except KeyError:
+                pass
+
         path = self
         result = ''
 
@@ -233,6 +331,10 @@ class BasePath(safe_str.safe_string):
                 result = real + result
                 break
 
+        if strings is not None:
+            if len(strings) >= variables.max_strings:
+                strings.clear()
+            strings[self] = result
         return result
 
     def __repr__(self):
@@ -245,6 +347,8 @@ class BasePath(safe_str.safe_string):
         return hash(self.suffix)
 
     def __eq__(self, rhs):
+        if self is rhs:
+            return True
         if type(self) is not type(rhs):
             return NotImplemented
         return (self.root == rhs.root and self.suffix == rhs.suffix and
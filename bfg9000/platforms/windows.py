@@ -5,6 +5,7 @@ from .target import TargetPlatform
 
 
 class WindowsPath(BasePath):
+    __slots__ = ()
     _localized_sep = '\\'
 
     def _localize_path(self, path):
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+
+from . import shell
+from .tools.common import Command
+
+# Environment variables that can change the output of a toolchain probe without
+# changing its command line.
+_key_variables = (
+    'PATH', 'CPATH', 'C_INCLUDE_PATH', 'CPLUS_INCLUDE_PATH',
+    'OBJC_INCLUDE_PATH', 'LIBRARY_PATH', 'COMPILER_PATH', 'GCC_EXEC_PREFIX',
+    'SDKROOT', 'INCLUDE', 'LIB',
+    'CC', 'CXX', 'OBJC', 'OBJCXX', 'FC', 'LD', 'AR',
+    'CPPFLAGS', 'CFLAGS', 'CXXFLAGS', 'OBJCFLAGS', 'OBJCXXFLAGS', 'FFLAGS',
+    'LDFLAGS', 'LDLIBS', 'ARFLAGS', 'JAVA_OPTS',
+    'JAVA_HOME', 'JAVA_TOOL_OPTIONS', '_JAVA_OPTIONS', 'JDK_JAVA_OPTIONS',
+)
+
+
+class CacheVersionError(RuntimeError):
+    pass
+
+
+class ProbeCache:
+    version = 1
+    cachefile = '.bfg_probe_cache'
+    user_cachefile = 'probe_cache.json'
+    max_user_entries = 2048
+
+    def __init__(self, entries=None, user_dir=None):
+        self._entries = entries or {}
+        self._used = set()
+        self._fingerprints = {}
+        self.user_dir = user_dir
+
+    @classmethod
+    def _read(cls, filename):
+        try:
+            with open(filename) as inp:
+                state = json.load(inp)
+                version, data = state['version'], state['data']
+            if version > cls.version:
+                raise CacheVersionError('saved version exceeds expected ' +
+                                        'version')
+            return data
+        except (OSError, ValueError, KeyError, TypeError, CacheVersionError):
+            return {}
+
+    @classmethod
+    def _write(cls, filename, entries):
+        tmpname = '{}.{}.tmp'.format(filename, os.getpid())
+        with open(tmpname, 'w') as out:
+            json.dump({'version': cls.version, 'data': entries}, out)
+        os.replace(tmpname, filename)
+
+    @classmethod
+    def load(cls, path, user_dir=None):
+        entries = {}
+        if user_dir:
+            entries.update(cls._read(os.path.join(user_dir,
+                                                  cls.user_cachefile)))
+        entries.update(cls._read(os.path.join(path, cls.cachefile)))
+        return cls(entries, user_dir)
+
+    def save(self, path):
+        # Only keep the probes used by this build in the build directory so
+        # that stale entries don't accumulate over time. (Prefetched probes may
+        # still be running, so work from a snapshot of the entries.)
+        entries = dict(self._entries)
+        used = {k: v for k, v in entries.items() if k in self._used}
+        try:
+            self._write(os.path.join(path, self.cachefile), used)
+        except OSError:  # pragma: no cover
+            pass
+
+        if self.user_dir:
+            filename = os.path.join(self.user_dir, self.user_cachefile)
+            entries = self._read(filename)
+            # Move the entries we used to the end so that the shared cache is
+            # kept in least-recently-used order, and drop the least recently
+            # used ones if it's getting too big.
+            for k, v in used.items():
+                entries.pop(k, None)
+                entries[k] = v
+            keys = list(entries.keys())[-self.max_user_entries:]
+            try:
+                os.makedirs(self.user_dir, exist_ok=True)
+                self._write(filename, {k: entries[k] for k in keys})
+            except OSError:  # pragma: no cover
+                pass
+
+    def _fingerprint(self, command, variables):
+        key = (command, variables.get('PATH'))
+        if key not in self._fingerprints:
+            try:
+                exe = shell.which(command, variables, resolve=True)[0]
+                stat = os.stat(exe)
+                self._fingerprints[key] = [os.path.realpath(exe),
+                                           stat.st_mtime_ns, stat.st_size]
+            except OSError:
+                self._fingerprints[key] = None
+        return self._fingerprints[key]
+
+    def _key(self, env, args, variables, kwargs):
+        args = shell.convert_args(
+            Command.convert_args(args, lambda x: x.command), env.base_dirs
+        )
+        fingerprint = self._fingerprint(args[0], variables)
+        if fingerprint is None:
+            return None
+
+        modes = {k: getattr(v, 'name', v) for k, v in kwargs.items()}
+        data = json.dumps([
+            args, fingerprint, sorted(modes.items()),
+            [[i, variables.get(i)] for i in _key_variables],
+        ])
+        return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+    def probe(self, env, args, *, env_vars=None, extra_env=None, **kwargs):
+        variables = env.variables if env_vars is None else env_vars
+        if extra_env:
+            variables = dict(variables)
+            variables.update(extra_env)
+
+        key = None
+        if not kwargs.get('shell', False):
+            key = self._key(env, args, variables, kwargs)
+        if key is None:
+            return env.execute(args, env=env_vars, extra_env=extra_env,
+                               **kwargs)
+
+        self._used.add(key)
+        if key in self._entries:
+            entry = self._entries[key]
+            if 'returncode' in entry:
+                raise shell.CalledProcessError(entry['returncode'], args,
+                                               entry['output'])
+            output = entry['output']
+            return tuple(output) if isinstance(output, list) else output
+
+        try:
+            output = env.execute(args, env=env_vars, extra_env=extra_env,
+                                 **kwargs)
+        except shell.CalledProcessError as e:
+            output = e.output
+            self._entries[key] = {'returncode': e.returncode,
+                                  'output': output}
+            raise
+        self._entries[key] = {'output': output}
+        return output
@@ -0,0 +1,103 @@
+import json
+import os
+import sys
+import threading
+import time
+
+_profiler = None
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+_null_span = _NullSpan()
+
+
+class _Span:
+    def __init__(self, profiler, name, category, args):
+        self.profiler = profiler
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.add_event(self.name, self.category, self.start,
+                                time.perf_counter(), self.args)
+
+
+class Profiler:
+    def __init__(self):
+        self.events = []
+        self.scripts = set()
+        self.origin = time.perf_counter()
+
+    def _script_location(self):
+        # Find the innermost frame that's executing a bfg script so that we
+        # can attribute this span to the user's code.
+        frame = sys._getframe(1)
+        while frame:
+            if frame.f_code.co_filename in self.scripts:
+                return frame.f_code.co_filename, frame.f_lineno
+            frame = frame.f_back
+        return None
+
+    def span(self, name, category, args):
+        args = dict(args)
+        location = self._script_location()
+        if location:
+            args['file'], args['line'] = location
+        return _Span(self, name, category, args)
+
+    def add_event(self, name, category, start, end, args):
+        # Timestamps in the Chrome trace-event format are in microseconds.
+        self.events.append({
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': (start - self.origin) * 1e6,
+            'dur': (end - start) * 1e6,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'args': args,
+        })
+
+    def save(self, filename):
+        with open(filename, 'w') as out:
+            json.dump({'traceEvents': self.events,
+                       'displayTimeUnit': 'ms'}, out)
+
+
+def start():
+    global _profiler
+    _profiler = Profiler()
+    return _profiler
+
+
+def stop():
+    global _profiler
+    profiler, _profiler = _profiler, None
+    return profiler
+
+
+def enabled():
+    return _profiler is not None
+
+
+def add_script(filename):
+    if _profiler:
+        _profiler.scripts.add(filename)
+
+
+def span(name, category, **args):
+    if _profiler is None:
+        return _null_span
+    return _profiler.span(name, category, args)
@@ -4,6 +4,8 @@ from . import iterutils
 
 
 class safe_string:
+    __slots__ = ()
+
     def _safe_format(self, format_spec):
         return self
 
@@ -19,6 +21,8 @@ class safe_string:
 
 
 class safe_string_ops:
+    __slots__ = ()
+
     def __add__(self, rhs):
         return jbos(safe_str(self), safe_str(rhs))
 
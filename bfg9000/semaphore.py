@@ -0,0 +1,86 @@
+import os
+import subprocess
+import time
+from contextlib import contextmanager
+
+from .app_version import version
+from .arguments import parser as argparse
+
+try:
+    import fcntl
+
+    def _try_lock(fd):
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+except ImportError:  # pragma: no cover
+    import msvcrt
+
+    def _try_lock(fd):
+        try:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+
+@contextmanager
+def acquire(lockfile, depth, interval=0.05):
+    # Each of the `depth` slots in the semaphore is a lock file; holding the
+    # lock on any one of them lets us run. The locks are released
+    # automatically when the files are closed, even if we crash.
+    dirname = os.path.dirname(lockfile)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+
+    fds = [os.open('{}.{}'.format(lockfile, i), os.O_RDWR | os.O_CREAT)
+           for i in range(depth)]
+    try:
+        # Start at a different slot in each process to reduce contention.
+        start = os.getpid() % depth
+        while True:
+            for i in range(depth):
+                if _try_lock(fds[(start + i) % depth]):
+                    yield
+                    return
+            time.sleep(interval)
+    finally:
+        for i in fds:
+            os.close(i)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='bfg9000-semaphore',
+        usage='%(prog)s [-j DEPTH] LOCKFILE (-c COMMAND | -- COMMAND...)',
+        description=('Run a command once one of the DEPTH slots in the ' +
+                     'semaphore named by LOCKFILE is available.')
+    )
+    parser.add_argument('--version', action='version',
+                        version='%(prog)s ' + version)
+    parser.add_argument('-j', '--depth', type=int, default=1, metavar='DEPTH',
+                        help='the number of commands that may run at once ' +
+                        '(default: %(default)s)')
+    parser.add_argument('-c', metavar='COMMAND', dest='shell_command',
+                        help='a command to run via the shell')
+    parser.add_argument('lockfile', metavar='LOCKFILE',
+                        help='the base name of the lock files to use')
+    parser.add_argument('command', metavar='COMMAND', nargs='*',
+                        help='the command to run')
+    args = parser.parse_args()
+
+    if args.depth < 1:
+        parser.error('DEPTH must be at least 1')
+    if (args.shell_command is None) == (not args.command):
+        parser.error('exactly one of -c or COMMAND must be specified')
+
+    try:
+        with acquire(args.lockfile, args.depth):
+            if args.shell_command is not None:
+                return subprocess.run(args.shell_command,
+                                      shell=True).returncode
+            return subprocess.run(args.command).returncode
+    except Exception as e:
+        parser.error(e)
@@ -9,7 +9,7 @@ from ..safe_str import jbos, safe_str, shell_literal
 
 __all__ = ['split', 'join', 'listify', 'inner_quote', 'inner_quote_info',
            'wrap_quotes', 'quote_info', 'quote', 'force_quote', 'escape_line',
-           'join_lines', 'local_env', 'global_env']
+           'join_lines', 'local_env', 'global_env', 'keep_mtime']
 
 _bad_chars = re.compile(r'[^\w@%+=:,./-]')
 
@@ -134,3 +134,22 @@ def global_env(env, lines=None):
         'export', jbos(safe_str(name), eq, safe_str(value))
     ]) for name, value in env.items())
     return join_lines(itertools.chain(env_vars, lines or []))
+
+
+def keep_mtime(outputs, lines, backup_ext='.keepmtime'):
+    # Back up each existing output (preserving its timestamps) before running
+    # `lines`. Afterwards, if an output's contents are unchanged, move the
+    # backup back into place so that the output keeps its old timestamps.
+    def for_each(body):
+        return shell_list(
+            [shell_literal('for'), shell_literal('f'), shell_literal('in')] +
+            iterutils.listify(outputs) +
+            [shell_literal('; do ' + body.format(ext=backup_ext) + '; done')]
+        )
+
+    return join_lines(itertools.chain(
+        [for_each('test ! -f "$f" || cp -p "$f" "$f{ext}"')],
+        lines,
+        [for_each('if cmp -s "$f{ext}" "$f"; then mv -f "$f{ext}" "$f"; ' +
+                  'else rm -f "$f{ext}"; fi')],
+    ))
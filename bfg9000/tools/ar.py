@@ -14,7 +14,7 @@ class ArLinker(SimpleBuildCommand):
     @memoize_method
     def _check_version(self):
         try:
-            output = self.env.execute(
+            output = self.env.probe(
                 self.command + ['--version'], stdout=shell.Mode.pipe,
                 stderr=shell.Mode.devnull
             )
@@ -36,6 +36,10 @@ class ArLinker(SimpleBuildCommand):
     def flavor(self):
         return 'ar'
 
+    @property
+    def accepts_rspfile(self):
+        return self.brand == 'gnu'
+
     def can_link(self, format, langs):
         return format == self.builder.object_format
 
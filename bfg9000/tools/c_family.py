@@ -8,22 +8,22 @@ from ..languages import known_formats, known_langs
 _guessed_info = namedtuple('_guessed_info', ['lang', 'cmd', 'guessed_cmd'])
 
 with known_langs.make('c') as x:
-    x.vars(compiler='CC', flags='CFLAGS')
+    x.vars(compiler='CC', flags='CFLAGS', launcher='CC_LAUNCHER')
     x.exts(source=['.c'], header=['.h'])
 
 with known_langs.make('c++') as x:
-    x.vars(compiler='CXX', flags='CXXFLAGS')
+    x.vars(compiler='CXX', flags='CXXFLAGS', launcher='CXX_LAUNCHER')
     x.exts(source=['.cpp', '.cc', '.cp', '.cxx', '.CPP', '.c++', '.C'],
            header=['.hpp', '.hh', '.hp', '.hxx', '.HPP', '.h++', '.H'])
     x.auxexts(header=['.h'])
 
 with known_langs.make('objc') as x:
-    x.vars(compiler='OBJC', flags='OBJCFLAGS')
+    x.vars(compiler='OBJC', flags='OBJCFLAGS', launcher='OBJC_LAUNCHER')
     x.exts(source=['.m'])
     x.auxexts(header=['.h'])
 
 with known_langs.make('objc++') as x:
-    x.vars(compiler='OBJCXX', flags='OBJCXXFLAGS')
+    x.vars(compiler='OBJCXX', flags='OBJCXXFLAGS', launcher='OBJCXX_LAUNCHER')
     x.exts(source=['.mm', '.M'])
     x.auxexts(header=['.h'])
 
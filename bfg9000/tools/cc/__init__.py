@@ -25,6 +25,9 @@ class CcBuilder(Builder):
                                                          version_output)
         super().__init__(langinfo.name, brand, version)
         self.object_format = env.target_platform.object_format
+        # Shared and static libraries can use the same (PIC) object files,
+        # unless they need to be compiled with different import/export macros.
+        self.can_share_objects = not env.target_platform.has_import_library
 
         name = langinfo.var('compiler').lower()
         ldinfo = known_formats['native']['dynamic']
@@ -62,7 +65,7 @@ class CcBuilder(Builder):
         try:
             # Pass a sentinel flag to the linker so we can examine the verbose
             # compiler output and try to determine which linker we're using.
-            output = env.execute(
+            output = env.probe(
                 command + ldflags + ['-v', '-Wl,-v', '-Wl,--not-a-real-flag'],
                 stdout=shell.Mode.pipe, stderr=shell.Mode.stdout,
                 returncode='any'
@@ -82,7 +85,8 @@ class CcBuilder(Builder):
             pass
 
         compile_kwargs = {'command': (name, command, found),
-                          'flags': (cflags_name, cflags)}
+                          'flags': (cflags_name, cflags),
+                          'launcher': self._launcher(env, langinfo)}
         self.compiler = CcCompiler(self, env, **compile_kwargs)
         try:
             self.pch_compiler = CcPchCompiler(self, env, **compile_kwargs)
@@ -107,6 +111,23 @@ class CcBuilder(Builder):
         self.packages = CcPackageResolver(self, env, command, ldflags)
         self.runner = None
 
+    @staticmethod
+    def _launcher(env, langinfo):
+        # Compiler launchers (e.g. ccache) are kept separate from the compiler
+        # command itself so that they don't interfere with detecting the
+        # compiler or linker, and so they can be left out of
+        # compile_commands.json.
+        try:
+            var = langinfo.var('launcher')
+        except ValueError:
+            return []
+
+        launcher = shell.split(env.getvar(var, ''))
+        if launcher:
+            launcher = check_which([launcher], env.variables,
+                                   kind='compiler launcher')[0]
+        return launcher
+
     @classmethod
     def _parse_brand(cls, env, command, version_output):
         target_flags = []
@@ -114,7 +135,7 @@ class CcBuilder(Builder):
             brand = 'gcc'
             version = detect_version(version_output)
             if env.is_cross:
-                triplet = parse_triplet(env.execute(
+                triplet = parse_triplet(env.probe(
                     command + ['-dumpmachine'],
                     stdout=shell.Mode.pipe, stderr=shell.Mode.devnull
                 ).rstrip())
@@ -144,8 +165,8 @@ class CcBuilder(Builder):
 
     @staticmethod
     def check_command(env, command):
-        return env.execute(command + ['--version'], stdout=shell.Mode.pipe,
-                           stderr=shell.Mode.devnull)
+        return env.probe(command + ['--version'], stdout=shell.Mode.pipe,
+                         stderr=shell.Mode.devnull)
 
     @property
     def flavor(self):
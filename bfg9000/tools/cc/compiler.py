@@ -11,6 +11,12 @@ from ...versioning import SpecifierSet
 
 
 class CcBaseCompiler(BuildCommand):
+    def __init__(self, builder, env, rule_name=None, *, command, flags,
+                 launcher=None):
+        super().__init__(builder, env, rule_name, command=command,
+                         flags=flags)
+        self.launcher = launcher or []
+
     @property
     def deps_flavor(self):
         return None if self.lang in ('f77', 'f95') else 'gcc'
@@ -28,7 +34,7 @@ class CcBaseCompiler(BuildCommand):
         try:
             extra_env = ({'CPATH': cpath or ''}
                          if cpath is not default_sentinel else None)
-            output = self.env.execute(
+            output = self.env.probe(
                 (self.command + self._always_flags + self.global_flags +
                  ['-E', '-Wp,-v', '/dev/null']),
                 extra_env=extra_env, stdout=shell.Mode.pipe,
@@ -55,12 +61,32 @@ class CcBaseCompiler(BuildCommand):
     def search_dirs(self, strict=False):
         return self._search_dirs(strict=strict)
 
-    def _call(self, cmd, input, output, deps=None, flags=None):
+    @property
+    @memoize_method
+    def phony_deps(self):
+        # Check whether the compiler can add a phony target for each
+        # dependency in its depfile (`-MP`). If so, Make doesn't need to
+        # post-process the depfile with depfixer.
+        try:
+            self.env.probe(
+                (self.command + self._always_flags + self.global_flags +
+                 ['-E', '-MM', '-MP', '/dev/null']),
+                stdout=shell.Mode.devnull, stderr=shell.Mode.devnull
+            )
+            return True
+        except (OSError, shell.CalledProcessError):
+            return False
+
+    def _call(self, cmd, input, output, deps=None, flags=None,
+              phony_deps=False, launcher=None):
         result = list(chain(
-            cmd, self._always_flags, iterate(flags), ['-c', input]
+            iterate(launcher), cmd, self._always_flags, iterate(flags),
+            ['-c', input]
         ))
         if deps:
             result.extend(['-MMD', '-MF', deps])
+            if phony_deps:
+                result.append('-MP')
         result.extend(['-o', output])
         return result
 
@@ -143,8 +169,9 @@ class CcCompiler(CcBaseCompiler):
         'java'  : 'java',
     }
 
-    def __init__(self, builder, env, *, command, flags):
-        super().__init__(builder, env, command=command, flags=flags)
+    def __init__(self, builder, env, *, command, flags, launcher=None):
+        super().__init__(builder, env, command=command, flags=flags,
+                         launcher=launcher)
 
     @property
     def accepts_pch(self):
@@ -167,12 +194,12 @@ class CcPchCompiler(CcBaseCompiler):
         'objc++': 'objective-c++-header',
     }
 
-    def __init__(self, builder, env, *, command, flags):
+    def __init__(self, builder, env, *, command, flags, launcher=None):
         if builder.lang not in self._langs:
             raise ValueError('{} has no precompiled headers'
                              .format(builder.lang))
         super().__init__(builder, env, command[0] + '_pch', command=command,
-                         flags=flags)
+                         flags=flags, launcher=launcher)
 
     @property
     def accepts_pch(self):
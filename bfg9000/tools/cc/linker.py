@@ -64,6 +64,10 @@ class CcLinker(BuildCommand):
     def needs_package_options(self):
         return True
 
+    @property
+    def accepts_rspfile(self):
+        return self.brand in ('gcc', 'clang')
+
     @property
     def _has_link_macros(self):
         # We only need to define LIBFOO_EXPORTS/LIBFOO_STATIC macros on
@@ -76,7 +80,7 @@ class CcLinker(BuildCommand):
     def sysroot(self, strict=False):
         try:
             # XXX: clang doesn't support -print-sysroot.
-            return self.env.execute(
+            return self.env.probe(
                 self.command + self.global_flags + ['-print-sysroot'],
                 stdout=shell.Mode.pipe, stderr=shell.Mode.devnull
             ).rstrip()
@@ -88,7 +92,7 @@ class CcLinker(BuildCommand):
     @memoize_method
     def search_dirs(self, strict=False):
         try:
-            output = self.env.execute(
+            output = self.env.probe(
                 self.command + self.global_flags + ['-print-search-dirs'],
                 stdout=shell.Mode.pipe, stderr=shell.Mode.devnull
             )
@@ -3,11 +3,11 @@ from .common import choose_builder
 from ..languages import known_langs
 
 with known_langs.make('f77') as x:
-    x.vars(compiler='FC', flags='FFLAGS')
+    x.vars(compiler='FC', flags='FFLAGS', launcher='FC_LAUNCHER')
     x.exts(source=['.f', '.for', '.ftn'])
 
 with known_langs.make('f95') as x:
-    x.vars(compiler='FC', flags='FFLAGS')
+    x.vars(compiler='FC', flags='FFLAGS', launcher='FC_LAUNCHER')
     x.exts(source=['.f90', '.f95', '.f03', '.f08'])
 
 
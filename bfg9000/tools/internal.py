@@ -1,9 +1,49 @@
 from . import tool
 from .common import SimpleCommand
-from ..safe_str import shell_literal
+from ..safe_str import jbos, safe_str, shell_literal
+from ..iterutils import isiterable, listify
 from ..shell import shell_list
 
 
+def _data_words(line):
+    # Convert a command line into plain words so that the shell passes it
+    # along verbatim instead of interpreting any redirections or the like.
+    if isinstance(line, shell_literal):
+        return [line.string]
+    elif isinstance(line, jbos):
+        return [jbos(*(i.string if isinstance(i, shell_literal) else i
+                       for i in line.bits))]
+    elif isiterable(line):
+        return [j for i in line for j in _data_words(i)]
+    string = safe_str(line)
+    if isinstance(string, (shell_literal, jbos)):
+        return _data_words(string)
+    return [line]
+
+
+@tool('actioncache')
+class ActionCache(SimpleCommand):
+    def __init__(self, env):
+        super().__init__(env, name='actioncache', env_var='ACTIONCACHE',
+                         default=env.bfgdir.append('bfg9000-actioncache'))
+
+    def _call(self, cmd, action, *, inputs, outputs, environment=None,
+              cmds):
+        result = cmd + [action]
+        if inputs:
+            result += ['-i'] + listify(inputs)
+        result += ['-o'] + listify(outputs)
+        if environment:
+            result += ['-e'] + [jbos(safe_str(k), '=', safe_str(v))
+                                for k, v in environment.items()]
+        result.append('--')
+        for i, line in enumerate(cmds):
+            if i:
+                result.append('&&')
+            result += _data_words(line)
+        return result
+
+
 @tool('bfg9000')
 class Bfg9000(SimpleCommand):
     def __init__(self, env):
@@ -52,6 +92,16 @@ class JvmOutput(SimpleCommand):
         return cmd + ['-o', output, '--'] + subcmd
 
 
+@tool('keepmtime')
+class KeepMtime(SimpleCommand):
+    def __init__(self, env):
+        super().__init__(env, name='keepmtime', env_var='KEEPMTIME',
+                         default=env.bfgdir.append('bfg9000-keepmtime'))
+
+    def _call(self, cmd, action, outputs):
+        return cmd + [action] + listify(outputs)
+
+
 @tool('rccdep')
 class RccDep(SimpleCommand):
     def __init__(self, env):
@@ -60,3 +110,16 @@ class RccDep(SimpleCommand):
 
     def _call(self, cmd, subcmd, depfile):
         return cmd + subcmd + ['-d', depfile]
+
+
+@tool('semaphore')
+class Semaphore(SimpleCommand):
+    def __init__(self, env):
+        super().__init__(env, name='semaphore', env_var='SEMAPHORE',
+                         default=env.bfgdir.append('bfg9000-semaphore'))
+
+    def _call(self, cmd, lockfile, depth, command):
+        result = cmd + ['-j', str(depth), lockfile]
+        if isiterable(command):
+            return result + ['--'] + listify(command)
+        return result + ['-c', command]
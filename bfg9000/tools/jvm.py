@@ -77,7 +77,7 @@ class JvmBuilder(Builder):
             try:
                 # Get the brand from the run command (rather than the compile
                 # command).
-                output = env.execute(
+                output = env.probe(
                     run_command + ['-version'], stdout=shell.Mode.pipe,
                     stderr=shell.Mode.stdout
                 )
@@ -99,8 +99,8 @@ class JvmBuilder(Builder):
 
     @staticmethod
     def check_command(env, command):
-        return env.execute(command + ['-version'], stdout=shell.Mode.pipe,
-                           stderr=shell.Mode.stdout)
+        return env.probe(command + ['-version'], stdout=shell.Mode.pipe,
+                         stderr=shell.Mode.stdout)
 
     @property
     def flavor(self):
@@ -114,6 +114,10 @@ class JvmBuilder(Builder):
     def can_dual_link(self):
         return False
 
+    @property
+    def can_share_objects(self):
+        return False
+
     def linker(self, mode):
         if mode == 'static_library':
             raise ValueError('static linking not supported with {}'.format(
@@ -35,8 +35,8 @@ class LdLinker:
     def call_command(env, command):
         for args in (['--version'], ['-v']):
             try:
-                return env.execute(command + args, stdout=shell.Mode.pipe,
-                                   stderr=shell.Mode.stdout)
+                return env.probe(command + args, stdout=shell.Mode.pipe,
+                                 stderr=shell.Mode.stdout)
             except shell.CalledProcessError:
                 pass
         return None
@@ -55,7 +55,7 @@ class LdLinker:
 
     def search_dirs(self, sysroot='/', strict=False):
         try:
-            output = self.env.execute(
+            output = self.env.probe(
                 self.command + ['--verbose'], stdout=shell.Mode.pipe,
                 stderr=shell.Mode.devnull
             )
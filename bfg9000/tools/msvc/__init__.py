@@ -80,7 +80,7 @@ class MsvcBuilder(Builder):
         if 'Microsoft (R)' in version_output:
             return 'msvc', detect_version(version_output)
         elif 'clang LLVM compiler' in version_output:
-            real_version = env.execute(
+            real_version = env.probe(
                 command + ['--version'], stdout=shell.Mode.pipe,
                 stderr=shell.Mode.stdout
             )
@@ -90,8 +90,8 @@ class MsvcBuilder(Builder):
 
     @staticmethod
     def check_command(env, command):
-        return env.execute(command + ['-?'], stdout=shell.Mode.pipe,
-                           stderr=shell.Mode.stdout)
+        return env.probe(command + ['-?'], stdout=shell.Mode.pipe,
+                         stderr=shell.Mode.stdout)
 
     @property
     def flavor(self):
@@ -109,6 +109,10 @@ class MsvcBuilder(Builder):
     def can_dual_link(self):
         return False
 
+    @property
+    def can_share_objects(self):
+        return False
+
     def linker(self, mode):
         return self._linkers[mode]
 
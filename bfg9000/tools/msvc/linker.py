@@ -47,6 +47,10 @@ class MsvcLinker(BuildCommand):
     def needs_package_options(self):
         return True
 
+    @property
+    def accepts_rspfile(self):
+        return True
+
     def search_dirs(self, strict=False):
         lib_path = self.env.variables.getpaths('LIBRARY_PATH')
         lib = self.env.variables.getpaths('LIB')
@@ -211,6 +215,10 @@ class MsvcStaticLinker(SimpleBuildCommand):
     def can_link(self, format, langs):
         return format == self.builder.object_format
 
+    @property
+    def accepts_rspfile(self):
+        return True
+
     def _call(self, cmd, input, output, flags=None):
         return list(chain(
             cmd, iterate(flags), iterate(input), ['/OUT:' + output]
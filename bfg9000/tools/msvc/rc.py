@@ -32,8 +32,8 @@ class MsvcRcBuilder(Builder):
 
     @staticmethod
     def check_command(env, command):
-        return env.execute(command + ['-?'], stdout=shell.Mode.pipe,
-                           stderr=shell.Mode.devnull)
+        return env.probe(command + ['-?'], stdout=shell.Mode.pipe,
+                         stderr=shell.Mode.devnull)
 
     @property
     def flavor(self):
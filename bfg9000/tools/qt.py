@@ -51,8 +51,8 @@ class MocBuilder(Builder):
 
     @staticmethod
     def check_command(env, command):
-        return env.execute(command + ['--version'], stdout=shell.Mode.pipe,
-                           stderr=shell.Mode.devnull)
+        return env.probe(command + ['--version'], stdout=shell.Mode.pipe,
+                         stderr=shell.Mode.devnull)
 
 
 class MocCompiler(SimpleBuildCommand):
@@ -127,8 +127,8 @@ class RccBuilder(Builder):
 
     @staticmethod
     def check_command(env, command):
-        return env.execute(command + ['--version'], stdout=shell.Mode.pipe,
-                           stderr=shell.Mode.devnull)
+        return env.probe(command + ['--version'], stdout=shell.Mode.pipe,
+                         stderr=shell.Mode.devnull)
 
 
 class RccCompiler(SimpleBuildCommand):
@@ -187,8 +187,8 @@ class UicBuilder(Builder):
 
     @staticmethod
     def check_command(env, command):
-        return env.execute(command + ['--version'], stdout=shell.Mode.pipe,
-                           stderr=shell.Mode.devnull)
+        return env.probe(command + ['--version'], stdout=shell.Mode.pipe,
+                         stderr=shell.Mode.devnull)
 
 
 class UicCompiler(SimpleBuildCommand):
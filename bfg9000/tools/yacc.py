@@ -46,8 +46,8 @@ class YaccBuilder(Builder):
 
     @staticmethod
     def check_command(env, command):
-        return env.execute(command + ['--version'], stdout=shell.Mode.pipe,
-                           stderr=shell.Mode.devnull)
+        return env.probe(command + ['--version'], stdout=shell.Mode.pipe,
+                         stderr=shell.Mode.devnull)
 
 
 class YaccCompiler(SimpleBuildCommand):
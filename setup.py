@@ -200,9 +200,12 @@ setup(
         'console_scripts': [
             'bfg9000=bfg9000.driver:main',
             '9k=bfg9000.driver:simple_main',
+            'bfg9000-actioncache=bfg9000.actioncache:main',
             'bfg9000-depfixer=bfg9000.depfixer:main',
             'bfg9000-jvmoutput=bfg9000.jvmoutput:main',
+            'bfg9000-keepmtime=bfg9000.keepmtime:main',
             'bfg9000-rccdep=bfg9000.rccdep:main',
+            'bfg9000-semaphore=bfg9000.semaphore:main',
         ],
         'bfg9000.backends': [
             'make=bfg9000.backends.make.writer',
@@ -0,0 +1,43 @@
+import os
+import sys
+import time
+
+from .. import *
+
+# Benchmarks are slow and their results are only meaningful when compared
+# against each other, so only run them when explicitly requested.
+enabled = bool(os.getenv('BFG_BENCHMARK'))
+
+
+def benchmark_case(cls):
+    return skip_if(not enabled, 'set BFG_BENCHMARK=1 to run benchmarks')(cls)
+
+
+class BenchmarkCase(TestCase):
+    repeat = 5
+
+    def time(self, fn, *args, **kwargs):
+        # Return the best time out of several runs to reduce noise.
+        best = None
+        for i in range(self.repeat):
+            start = time.perf_counter()
+            fn(*args, **kwargs)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def report(self, name, **timings):
+        baseline = next(iter(timings.values()))
+        sys.stderr.write('\n{}:\n'.format(name))
+        for k, v in timings.items():
+            sys.stderr.write('  {:<16} {:10.3f} ms ({:.2f}x)\n'.format(
+                k, v * 1000, baseline / v if v else float('inf')
+            ))
+
+    def report_memory(self, name, **sizes):
+        baseline = next(iter(sizes.values()))
+        sys.stderr.write('\n{}:\n'.format(name))
+        for k, v in sizes.items():
+            sys.stderr.write('  {:<16} {:10.1f} MiB ({:.2f}x)\n'.format(
+                k, v / 1024 ** 2, baseline / v if v else float('inf')
+            ))
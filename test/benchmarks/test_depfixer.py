@@ -0,0 +1,100 @@
+from io import StringIO
+
+from . import *
+
+from bfg9000 import depfixer
+
+Token = depfixer.Token
+State = depfixer.State
+
+
+# The original, character-at-a-time implementation of `emit_deps`.
+def tokenize_legacy(s):
+    s = iter(s)
+    while True:
+        c = next(s, None)
+        if c is None:
+            return
+
+        if c == ':':
+            c = next(s, None)
+            if c is None or c in ' \t\n':
+                yield (Token.colon, None)
+                if c is None:
+                    return
+            else:
+                yield (Token.word, ':')
+
+        if c == '\\':
+            c = next(s, None)
+            if c != '\n':
+                yield (Token.word, '\\')
+                if c is None:
+                    return
+                yield (Token.word, c)
+        elif c in ' \t':
+            yield (Token.space, None)
+        elif c == '\n':
+            yield (Token.newline, None)
+        else:
+            yield (Token.word, c)
+
+
+def emit_deps_legacy(instream, outstream):
+    state = State.target
+
+    for tok, value in tokenize_legacy(instream.read()):
+        if state == State.target:
+            if tok == Token.space:
+                state = State.between_targets
+            elif tok == Token.colon:
+                state = State.between_deps
+        elif state == State.between_targets:
+            if tok == Token.word:
+                state = State.target
+            elif tok == Token.colon:
+                state = State.between_deps
+        elif state == State.dep:
+            if tok == Token.word:
+                outstream.write(value)
+            elif tok == Token.space:
+                outstream.write(':\n')
+                state = State.between_deps
+            elif tok == Token.newline:
+                outstream.write(':\n')
+                state = State.target
+        else:
+            if tok == Token.word:
+                state = State.dep
+                outstream.write(value)
+            elif tok == Token.newline:
+                state = State.target
+
+
+def make_depfile(headers):
+    # Mimic the depfiles GCC generates for a large C++ source file: one very
+    # long rule with a few headers per line.
+    deps = ['/usr/include/c++/10/bits/header_with_a_long_name{}.h'.format(i)
+            for i in range(headers)]
+    lines = [' '.join(deps[i:i + 3]) for i in range(0, headers, 3)]
+    return 'obj/source.o: src/source.cpp \\\n ' + ' \\\n '.join(lines) + '\n'
+
+
+@benchmark_case
+class TestDepfixerBenchmark(BenchmarkCase):
+    def run_emit_deps(self, fn, data):
+        out = StringIO()
+        fn(StringIO(data), out)
+        return out.getvalue()
+
+    def test_emit_deps(self):
+        for headers in (100, 5000):
+            data = make_depfile(headers)
+            self.assertEqual(self.run_emit_deps(depfixer.emit_deps, data),
+                             self.run_emit_deps(emit_deps_legacy, data))
+
+            self.report(
+                'emit_deps ({} headers)'.format(headers),
+                legacy=self.time(self.run_emit_deps, emit_deps_legacy, data),
+                regex=self.time(self.run_emit_deps, depfixer.emit_deps, data),
+            )
@@ -0,0 +1,70 @@
+from functools import reduce
+
+from . import *
+
+from bfg9000.builtins.find import FileFilter, FindResult
+from bfg9000.glob import PathGlob
+from bfg9000.path import Path, Root
+
+
+# The original implementation of `FileFilter._match_globs`, which matches each
+# glob separately.
+def match_legacy(file_filter, path):
+    if any(i.match(path) for i in file_filter.exclude):
+        return FindResult.exclude_recursive
+
+    skip_base = len(file_filter.include) == 1
+    result = reduce(lambda a, b: a | b,
+                    (i.match(path, skip_base) for i in file_filter.include))
+    if result:
+        return FindResult.include
+
+    if any(i.match(path) for i in file_filter.extra):
+        return FindResult.not_now
+
+    if result == PathGlob.Result.never:
+        return FindResult.exclude_recursive
+    return FindResult.exclude
+
+
+def make_paths(depth, width):
+    paths = [Path('src', Root.srcdir, directory=True)]
+    frontier = list(paths)
+    for i in range(depth):
+        next_frontier = []
+        for p in frontier:
+            for j in range(width):
+                d = p.append('dir{}'.format(j)).as_directory()
+                next_frontier.append(d)
+                paths.append(d)
+                for ext in ('.cpp', '.hpp', '.txt', '.ui'):
+                    paths.append(p.append('file{}{}'.format(j, ext)))
+        frontier = next_frontier
+    return paths
+
+
+@benchmark_case
+class TestGlobBenchmark(BenchmarkCase):
+    filters = {
+        'single': FileFilter('src/**/*.cpp', exclude=['.*#', '*~', '#*#']),
+        'multiple': FileFilter(['src/**/*.cpp', 'src/dir0/**/*.hpp',
+                                'src/*/dir1/*.ui'],
+                               extra=['*.txt', '*.h'],
+                               exclude=['.*#', '*~', '#*#', 'dir3/']),
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        cls.paths = make_paths(depth=5, width=4)
+
+    def test_match(self):
+        for name, f in self.filters.items():
+            self.assertEqual([f.match(i) for i in self.paths],
+                             [match_legacy(f, i) for i in self.paths])
+
+            self.report(
+                'match {} ({} paths)'.format(name, len(self.paths)),
+                legacy=self.time(lambda: [match_legacy(f, i)
+                                          for i in self.paths]),
+                compiled=self.time(lambda: [f.match(i) for i in self.paths]),
+            )
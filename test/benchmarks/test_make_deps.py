@@ -0,0 +1,63 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from . import *
+
+cc = shutil.which('cc')
+depfixer = [shutil.which('bfg9000-depfixer') or sys.executable]
+if depfixer[0] == sys.executable:
+    depfixer += ['-c', 'from bfg9000.depfixer import main; main()']
+
+
+# Compare the per-object overhead of generating Make-friendly depfiles in a
+# clean build: post-processing each depfile with depfixer vs letting the
+# compiler emit the phony targets itself via `-MP`.
+@benchmark_case
+@skip_if(cc is None, 'requires a C compiler')
+class TestMakeDepsBenchmark(BenchmarkCase):
+    repeat = 3
+    objects = 20
+    headers = 50
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.mkdtemp()
+        for i in range(cls.headers):
+            with open(os.path.join(cls.tmpdir, 'h{}.h'.format(i)), 'w'):
+                pass
+        with open(os.path.join(cls.tmpdir, 'src.c'), 'w') as f:
+            for i in range(cls.headers):
+                f.write('#include "h{}.h"\n'.format(i))
+            f.write('int x;\n')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpdir)
+
+    def compile(self, extra_flags=[]):
+        src = os.path.join(self.tmpdir, 'src.c')
+        obj = os.path.join(self.tmpdir, 'src.o')
+        depfile = obj + '.d'
+        subprocess.run([cc, '-c', src, '-MMD', '-MF', depfile] + extra_flags +
+                       ['-o', obj], check=True)
+        return depfile
+
+    def build_depfixer(self):
+        for i in range(self.objects):
+            depfile = self.compile()
+            with open(depfile) as inp, open(depfile, 'a') as out:
+                subprocess.run(depfixer, stdin=inp, stdout=out, check=True)
+
+    def build_phony_deps(self):
+        for i in range(self.objects):
+            self.compile(['-MP'])
+
+    def test_clean_build(self):
+        self.report(
+            'clean build ({} objects)'.format(self.objects),
+            depfixer=self.time(self.build_depfixer),
+            phony_deps=self.time(self.build_phony_deps),
+        )
@@ -0,0 +1,81 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from . import *
+
+this_root = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)
+)))
+
+# Configure the project in a separate process and have it report its own peak
+# RSS, so that each measurement starts from a fresh interpreter.
+_configure_script = """
+import resource, sys
+from bfg9000.driver import main
+try:
+    main()
+except SystemExit as e:
+    if e.code:
+        raise
+scale = 1 if sys.platform == 'darwin' else 1024
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale)
+"""
+
+
+# Measure the peak memory use of configuring a project with a very large
+# number of source files. To compare against another version of bfg9000 (e.g.
+# a checkout of an older commit), set `BFG_BENCHMARK_BASELINE` to the root of
+# its source tree.
+@benchmark_case
+class TestMemoryBenchmark(BenchmarkCase):
+    libraries = 200
+    sources = 1000
+
+    @classmethod
+    def setUpClass(cls):
+        # The source files don't need to exist; bfg9000 only needs to know
+        # their names to generate the build files.
+        cls.tmpdir = tempfile.mkdtemp()
+        cls.srcdir = os.path.join(cls.tmpdir, 'src')
+        os.mkdir(cls.srcdir)
+        with open(os.path.join(cls.srcdir, 'build.bfg'), 'w') as f:
+            f.write(
+                'for i in range({libs}):\n'
+                '    static_library("lib{{}}".format(i), files=[\n'
+                '        "dir{{}}/src{{}}.cpp".format(i, j)\n'
+                '        for j in range({srcs})\n'
+                '    ])\n'.format(libs=cls.libraries, srcs=cls.sources)
+            )
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpdir)
+
+    def configure(self, root):
+        builddir = tempfile.mkdtemp(dir=self.tmpdir)
+        os.rmdir(builddir)
+        env = dict(os.environ, PYTHONPATH=root)
+        # Run from outside of any source tree so that `python -c` doesn't pick
+        # up bfg9000 from the current directory instead of `root`.
+        output = subprocess.run(
+            [sys.executable, '-c', _configure_script, 'configure-into',
+             self.srcdir, builddir, '--backend=make'],
+            cwd=self.tmpdir, env=env, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL, universal_newlines=True, check=True
+        ).stdout
+        shutil.rmtree(builddir)
+        return int(output.splitlines()[-1])
+
+    def test_configure(self):
+        sizes = {}
+        baseline = os.getenv('BFG_BENCHMARK_BASELINE')
+        if baseline:
+            sizes['baseline'] = self.configure(baseline)
+        sizes['current'] = self.configure(this_root)
+
+        self.report_memory('configure {} sources'.format(
+            self.libraries * self.sources
+        ), **sizes)
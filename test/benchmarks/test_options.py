@@ -0,0 +1,60 @@
+from . import *
+
+from bfg9000 import options as opts
+from bfg9000.file_types import HeaderDirectory
+from bfg9000.path import Path, Root
+from bfg9000.safe_str import stringy_types
+
+
+# The original implementation of `option_list`, which checks each new option
+# against all the existing ones.
+class option_list_legacy(opts.option_list):
+    def append(self, option):
+        if ( isinstance(option, stringy_types) or
+             not any(option.matches(i) for i in self._options) ):
+            self._options.append(option)
+
+
+def make_options(count):
+    result = []
+    for i in range(count):
+        result.append(opts.include_dir(HeaderDirectory(
+            Path('include/dir{}'.format(i), Root.srcdir)
+        )))
+        result.append(opts.define('MACRO_{}'.format(i), str(i)))
+    return result
+
+
+def build_edges(list_type, global_options, edges):
+    # Mimic creating compile edges: each one merges the global options with
+    # its own, and then gets the options forwarded from what it links to.
+    result = []
+    for i in range(edges):
+        options = list_type(opts.define('EDGE_{}'.format(i)))
+        options.extend(global_options)
+        options.extend(global_options[::2])
+        result.append(options)
+    return result
+
+
+@benchmark_case
+class TestOptionListBenchmark(BenchmarkCase):
+    repeat = 3
+
+    def test_build_edges(self):
+        for count in (100, 1000):
+            global_options = make_options(count)
+            self.assertEqual(
+                [list(i) for i in build_edges(opts.option_list,
+                                              global_options, 2)],
+                [list(i) for i in build_edges(option_list_legacy,
+                                              global_options, 2)]
+            )
+
+            self.report(
+                'build 5 edges ({} options)'.format(len(global_options)),
+                legacy=self.time(build_edges, option_list_legacy,
+                                 global_options, 5),
+                indexed=self.time(build_edges, opts.option_list,
+                                  global_options, 5),
+            )
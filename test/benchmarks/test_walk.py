@@ -0,0 +1,64 @@
+import os
+import shutil
+import tempfile
+
+from . import *
+
+from bfg9000 import path
+
+
+# The original, recursive implementation of `walk`, which stats every entry.
+def listdir_legacy(p, variables=None):
+    dirs, nondirs = [], []
+    try:
+        for name in os.listdir(p.string(variables)):
+            curpath = p.append(name)
+            if path.isdir(curpath, variables):
+                dirs.append(curpath.as_directory())
+            else:
+                nondirs.append(curpath)
+    except OSError:
+        pass
+    return dirs, nondirs
+
+
+def walk_legacy(top, variables=None):
+    if not path.exists(top, variables):
+        return
+    dirs, nondirs = listdir_legacy(top, variables)
+    yield top, dirs, nondirs
+    for d in dirs:
+        if not path.islink(d, variables):
+            yield from walk_legacy(d, variables)
+
+
+def make_tree(base, depth, width, files):
+    for i in range(files):
+        open(os.path.join(base, 'file{}.c'.format(i)), 'w').close()
+    if depth:
+        for i in range(width):
+            subdir = os.path.join(base, 'dir{}'.format(i))
+            os.mkdir(subdir)
+            make_tree(subdir, depth - 1, width, files)
+
+
+@benchmark_case
+class TestWalkBenchmark(BenchmarkCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.mkdtemp()
+        make_tree(cls.tmpdir, depth=5, width=4, files=8)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpdir)
+
+    def test_walk(self):
+        top = path.abspath(self.tmpdir, directory=True)
+        self.assertEqual(list(path.walk(top)), list(walk_legacy(top)))
+
+        self.report(
+            'walk ({})'.format(self.tmpdir),
+            legacy=self.time(lambda: list(walk_legacy(top))),
+            scandir=self.time(lambda: list(path.walk(top))),
+        )
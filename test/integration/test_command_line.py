@@ -1,3 +1,5 @@
+import tempfile
+
 from . import *
 
 
@@ -255,3 +257,27 @@ class TestRccDep(SubprocessTestCase):
     def test_invalid(self):
         self.assertPopen(['bfg9000-rccdep', '-o', 'foo', '-d', 'foo.d',
                           self.rcc, 'nonexist'], returncode=2)
+
+
+class TestSemaphore(SubprocessTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.lockfile = os.path.join(self.tmpdir, 'lock')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_command(self):
+        self.assertOutput(['bfg9000-semaphore', '-j', '2', self.lockfile,
+                           '--', 'echo', 'hi'], output='hi\n')
+
+    def test_shell_command(self):
+        self.assertOutput(['bfg9000-semaphore', self.lockfile, '-c',
+                           'echo hi && echo there'], output='hi\nthere\n')
+
+    def test_returncode(self):
+        self.assertPopen(['bfg9000-semaphore', self.lockfile, '-c', 'exit 3'],
+                         returncode=3)
+
+    def test_invalid(self):
+        self.assertPopen(['bfg9000-semaphore', self.lockfile], returncode=2)
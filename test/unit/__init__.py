@@ -2,13 +2,14 @@ import ntpath
 import os.path
 import posixpath
 import unittest.mock
+from contextlib import nullcontext
 from itertools import zip_longest
 
 from .. import *
 from ..parameterize import ParameterizedTestCase
 
 from bfg9000 import iterutils
-from bfg9000.file_types import Node
+from bfg9000.file_types import Node, _attrs as _node_attrs
 from bfg9000.path import Path
 from bfg9000.platforms.posix import PosixPath
 from bfg9000.platforms.windows import WindowsPath
@@ -23,6 +24,29 @@ def mock_open(*args, **kwargs):
     return mo
 
 
+class MockDirEntry:
+    def __init__(self, name, is_dir=False, is_symlink=False):
+        self.name = name
+        self._is_dir = is_dir
+        self._is_symlink = is_symlink
+
+    def is_dir(self):
+        return self._is_dir
+
+    def is_symlink(self):
+        return self._is_symlink
+
+
+# Create a mock for os.scandir from functions returning the names in a
+# directory and whether a name is a directory or a symlink.
+def mock_scandir(listdir, isdir, islink=lambda name: False):
+    def scandir(path):
+        return nullcontext(iter(
+            MockDirEntry(i, isdir(i), islink(i)) for i in listdir(path)
+        ))
+    return scandir
+
+
 def skip_if_platform(platform):
     return skip_pred(lambda x: x.platform_name == platform,
                      'not supported for platform "{}"'.format(platform))
@@ -84,7 +108,9 @@ class FileTestCase(TestCase):
                     return []
                 seen.add(seen_key)
 
-                for i in sorted(set(vars(a)) | set(vars(b))):
+                attrs = (set(k for k, v in _node_attrs(a)) |
+                         set(k for k, v in _node_attrs(b)))
+                for i in sorted(attrs):
                     if i in self.excluded_file_fields:
                         continue
                     curr_path = attr_path + (i,)
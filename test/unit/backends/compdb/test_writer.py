@@ -94,6 +94,20 @@ class TestCompDB(TestCase):
              'output': os.path.join('..', 'foo.o')},
         ])
 
+    def test_builddir_directory(self):
+        directory = Path('sub/dir', Root.builddir)
+        file = file_types.File(Path('sub/foo.c'))
+        output = file_types.File(Path('sub/dir/foo.o'))
+        self.compdb.append(directory=directory, file=file, output=output,
+                           command='cc foo.c')
+
+        self.assertEqual(self._db_to_json(), [
+            {'directory': directory.string(self.env.base_dirs),
+             'command': 'cc foo.c',
+             'file': os.path.join('..', 'foo.c'),
+             'output': 'foo.o'},
+        ])
+
     def test_no_output(self):
         file = file_types.File(Path('foo.c', Root.srcdir))
         self.compdb.append(file=file, command='cc foo.c')
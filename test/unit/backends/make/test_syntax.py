@@ -1,4 +1,5 @@
 from io import StringIO
+from unittest import mock
 
 from ... import *
 
@@ -209,6 +210,20 @@ class TestWritePath(PathTestCase):
         self.assertEqual(self.out.stream.getvalue(),
                          self.ospath.join('$(srcdir)', 'foo'))
 
+    def test_cached(self):
+        p = self.Path('foo', path.Root.srcdir)
+        realize = type(p).realize
+        with mock.patch.object(type(p), 'realize', autospec=True,
+                               side_effect=realize) as m:
+            self.out.write(p, Syntax.shell)
+            self.out.write(p, Syntax.shell)
+            self.out.write(p, Syntax.target)
+        self.assertEqual(m.call_count, 2)
+        self.assertEqual(self.out.stream.getvalue(), (
+            quoted(self.ospath.join('$(srcdir)', 'foo')) * 2 +
+            self.ospath.join('$(srcdir)', 'foo')
+        ))
+
 
 class TestWriteSyntaxString(PathTestCase):
     def make_writer(self):
@@ -562,6 +577,10 @@ class TestMakefile(TestCase):
     def setUp(self):
         self.makefile = Makefile('build.bfg')
 
+    def read_rules(self):
+        self.makefile._rules.seek(0)
+        return self.makefile._rules.read()
+
     def test_destdir(self):
         out = self.makefile.writer(StringIO())
         self.makefile._write_variable(
@@ -652,31 +671,22 @@ class TestMakefile(TestCase):
     def test_rule(self):
         self.makefile.rule('target', variables={'name': 'value'},
                            recipe=['cmd'])
-        out = self.makefile.writer(StringIO())
-        self.makefile._write_rule(out, self.makefile._rules[-1])
-        self.assertEqual(out.stream.getvalue(),
+        self.assertEqual(self.read_rules(),
                          'target: name := value\n'
                          'target:\n'
                          '\tcmd\n\n')
 
         self.makefile.rule('silent-target', recipe=[Silent('cmd')], phony=True)
-        out = self.makefile.writer(StringIO())
-        self.makefile._write_rule(out, self.makefile._rules[-1])
-        self.assertEqual(out.stream.getvalue(),
-                         '.PHONY: silent-target\n'
-                         'silent-target:\n'
-                         '\t@cmd\n\n')
-
         self.makefile.rule('call-target', recipe=Call('fn', '1', '2'))
-        out = self.makefile.writer(StringIO())
-        self.makefile._write_rule(out, self.makefile._rules[-1])
-        self.assertEqual(out.stream.getvalue(),
-                         'call-target: ; $(call fn,1,2)\n\n')
-
         self.makefile.rule('empty-target')
-        out = self.makefile.writer(StringIO())
-        self.makefile._write_rule(out, self.makefile._rules[-1])
-        self.assertEqual(out.stream.getvalue(),
+        self.assertEqual(self.read_rules(),
+                         'target: name := value\n'
+                         'target:\n'
+                         '\tcmd\n\n'
+                         '.PHONY: silent-target\n'
+                         'silent-target:\n'
+                         '\t@cmd\n\n'
+                         'call-target: ; $(call fn,1,2)\n\n'
                          'empty-target:\n\n')
 
         # Test duplicate targets.
@@ -689,6 +699,21 @@ class TestMakefile(TestCase):
         # Test no targets.
         self.assertRaises(ValueError, self.makefile.rule, [])
 
+    def test_rule_cached_paths(self):
+        src = path.Path('src', path.Root.srcdir)
+        hdr = path.Path('hdr', path.Root.srcdir)
+        realize = path.Path.realize
+        with mock.patch.object(path.Path, 'realize', autospec=True,
+                               side_effect=realize) as m:
+            for i in range(10):
+                self.makefile.rule('target{}'.format(i), deps=src,
+                                   order_only=hdr, recipe=[['cmd', src]])
+        # `src` is written as both a dependency and a shell argument.
+        self.assertEqual(m.call_count, 3)
+        self.assertEqual(self.read_rules().count('\tcmd {}\n'.format(
+            quoted(os.path.join('$(srcdir)', 'src'))
+        )), 10)
+
     def test_write(self):
         out = StringIO()
         self.makefile.write(out)
@@ -716,3 +741,24 @@ class TestMakefile(TestCase):
             'include inc1\n'
             '-include inc2\n'
         )
+
+    def test_write_spilled(self):
+        with mock.patch.object(Makefile, '_spool_size', 16):
+            makefile = Makefile('build.bfg')
+        for i in range(10):
+            makefile.rule('target{}'.format(i), recipe=['cmd'])
+        self.assertTrue(makefile._rules._rolled)
+
+        out = StringIO()
+        makefile.write(out)
+        self.assertTrue(out.getvalue().endswith(''.join(
+            'target{}:\n\tcmd\n\n'.format(i) for i in range(10)
+        )))
+
+        # Make sure we can keep adding rules after writing.
+        makefile.rule('target10', recipe=['cmd'])
+        out = StringIO()
+        makefile.write(out)
+        self.assertTrue(out.getvalue().endswith(
+            'target9:\n\tcmd\n\ntarget10:\n\tcmd\n\n'
+        ))
@@ -1,8 +1,11 @@
+from io import StringIO
 from unittest import mock
 
 from ... import *
 
-from bfg9000.backends.make.writer import version
+from bfg9000.backends.make.syntax import Makefile
+from bfg9000.backends.make.writer import multitarget_rule, version
+from bfg9000.path import Path
 from bfg9000.versioning import Version
 
 
@@ -31,3 +34,43 @@ class TestMakeVersion(TestCase):
         with mock.patch('bfg9000.shell.which', return_value=['command']), \
              mock.patch('bfg9000.shell.execute', mock_bad_execute):
             self.assertEqual(version({}), None)
+
+
+class TestMultitargetRule(TestCase):
+    def write(self, *args, **kwargs):
+        build_inputs = mock.Mock()
+        makefile = Makefile(None)
+        multitarget_rule(build_inputs, makefile, *args, **kwargs)
+        out = StringIO()
+        makefile.write(out)
+        return out.getvalue().split('\n\n', 2)[-1], build_inputs
+
+    def test_single(self):
+        text, build_inputs = self.write([Path('out.txt')], recipe=['gen'])
+        self.assertEqual(text, 'out.txt:\n\tgen\n\n')
+        build_inputs.add_target.assert_not_called()
+
+    def test_multiple(self):
+        text, build_inputs = self.write([Path('out.h'), Path('out.c')],
+                                        recipe=['gen'])
+        self.assertEqual(text, (
+            'out.h out.c: out.h.stamp\n\n'
+            "out.h.stamp:\n\tgen\n\t@touch '$@'\n\n"
+        ))
+        build_inputs.add_target.assert_called_once()
+
+    def test_restat(self):
+        # If the output is missing but the stamp is up to date, the stamp
+        # should depend on a phony target so that it (and hence the output)
+        # gets rebuilt.
+        text, build_inputs = self.write([Path('out.txt')], recipe=['gen'],
+                                        restat=True)
+        self.assertEqual(text, (
+            '.PHONY: .bfg_force\n'
+            '.bfg_force:\n\n'
+            'out.txt: out.txt.stamp\n'
+            '\t@:\n\n'
+            'out.txt.stamp: $(if $(filter-out $(wildcard ./out.txt),'
+            './out.txt),.bfg_force)\n'
+            "\tgen\n\t@touch '$@'\n\n"
+        ))
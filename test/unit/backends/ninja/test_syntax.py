@@ -1,4 +1,5 @@
 from io import StringIO
+from unittest import mock
 
 from ... import *
 
@@ -135,6 +136,20 @@ class TestWritePath(PathTestCase):
         self.assertEqual(self.out.stream.getvalue(),
                          self.ospath.join('${srcdir}', 'foo'))
 
+    def test_cached(self):
+        p = self.Path('foo', path.Root.srcdir)
+        realize = type(p).realize
+        with mock.patch.object(type(p), 'realize', autospec=True,
+                               side_effect=realize) as m:
+            self.out.write(p, Syntax.shell)
+            self.out.write(p, Syntax.shell)
+            self.out.write(p, Syntax.output)
+        self.assertEqual(m.call_count, 2)
+        self.assertEqual(self.out.stream.getvalue(), (
+            quoted(self.ospath.join('${srcdir}', 'foo')) * 2 +
+            self.ospath.join('${srcdir}', 'foo')
+        ))
+
 
 class TestWriteInvalid(TestCase):
     def setUp(self):
@@ -195,6 +210,10 @@ class TestNinjaFile(TestCase):
     def setUp(self):
         self.ninjafile = NinjaFile('build.bfg')
 
+    def read_builds(self):
+        self.ninjafile._builds.seek(0)
+        return self.ninjafile._builds.read()
+
     def test_min_version(self):
         self.assertIs(self.ninjafile._min_version, None)
 
@@ -268,6 +287,17 @@ class TestNinjaFile(TestCase):
                          '  depfile = out.d\n'
                          '  deps = gcc\n')
 
+        self.ninjafile.rule('rsp_rule', ['cmd', '@out.rsp'],
+                            rspfile='out.rsp', rspfile_content='in')
+        out = self.ninjafile.writer(StringIO())
+        self.ninjafile._write_rule(out, 'rsp_rule',
+                                   self.ninjafile._rules['rsp_rule'])
+        self.assertEqual(out.stream.getvalue(),
+                         'rule rsp_rule\n'
+                         '  command = cmd @out.rsp\n'
+                         '  rspfile = out.rsp\n'
+                         '  rspfile_content = in\n')
+
         self.ninjafile.rule('misc_rule', ['cmd'], description='desc',
                             generator=True, pool='console', restat=True)
         out = self.ninjafile.writer(StringIO())
@@ -288,28 +318,46 @@ class TestNinjaFile(TestCase):
         self.assertRaises(ValueError, self.ninjafile.rule, 'my_rule!', ['cmd'])
         self.assertRaises(ValueError, self.ninjafile.rule, 'pool_rule',
                           ['cmd'], pool='pool')
+        self.assertRaises(ValueError, self.ninjafile.rule, 'rsp_rule2',
+                          ['cmd'], rspfile='out.rsp')
+        self.assertRaises(ValueError, self.ninjafile.rule, 'rsp_rule2',
+                          ['cmd'], rspfile_content='in')
+
+    def test_pool(self):
+        self.ninjafile.pool('my_pool', 2)
+        self.assertTrue(self.ninjafile.has_pool('my_pool'))
+        self.assertFalse(self.ninjafile.has_pool('unknown_pool'))
+
+        self.ninjafile.rule('pool_rule', ['cmd'], pool='my_pool')
+        self.assertEqual(self.ninjafile._rules['pool_rule'].pool, 'my_pool')
+
+        # Test duplicate pools.
+        self.assertRaises(ValueError, self.ninjafile.pool, 'my_pool', 2)
+        self.assertRaises(ValueError, self.ninjafile.pool, 'console', 1)
+
+        # Test invalid args.
+        self.assertRaises(ValueError, self.ninjafile.pool, 'my_pool!', 2)
 
     def test_build(self):
         self.ninjafile.rule('my_rule', ['cmd'])
 
         self.ninjafile.build('output', 'my_rule')
-        out = self.ninjafile.writer(StringIO())
-        self.ninjafile._write_build(out, self.ninjafile._builds[-1])
-        self.assertEqual(out.stream.getvalue(), 'build output: my_rule\n')
+        self.assertEqual(self.read_builds(), 'build output: my_rule\n\n')
 
         self.ninjafile.build('doutput', 'my_rule', inputs='input',
                              implicit='implicit', order_only='order')
-        out = self.ninjafile.writer(StringIO())
-        self.ninjafile._write_build(out, self.ninjafile._builds[-1])
-        self.assertEqual(out.stream.getvalue(),
-                         'build doutput: my_rule input | implicit || order\n')
+        self.assertEqual(self.read_builds(),
+                         'build output: my_rule\n\n'
+                         'build doutput: my_rule input | implicit || order\n'
+                         '\n')
 
         self.ninjafile.build('voutput', 'my_rule', variables={'var': 'value'})
-        out = self.ninjafile.writer(StringIO())
-        self.ninjafile._write_build(out, self.ninjafile._builds[-1])
-        self.assertEqual(out.stream.getvalue(),
+        self.assertEqual(self.read_builds(),
+                         'build output: my_rule\n\n'
+                         'build doutput: my_rule input | implicit || order\n'
+                         '\n'
                          'build voutput: my_rule\n'
-                         '  var = value\n')
+                         '  var = value\n\n')
 
         # Test duplicate targets.
         self.assertRaises(ValueError, self.ninjafile.build, 'output',
@@ -324,6 +372,34 @@ class TestNinjaFile(TestCase):
         self.assertRaises(ValueError, self.ninjafile.build, 'output2',
                           'unknown_rule')
 
+    def test_build_cached_paths(self):
+        self.ninjafile.rule('my_rule', ['cmd'])
+        src = path.Path('src', path.Root.srcdir)
+        hdr = path.Path('hdr', path.Root.srcdir)
+        realize = path.Path.realize
+        with mock.patch.object(path.Path, 'realize', autospec=True,
+                               side_effect=realize) as m:
+            for i in range(10):
+                self.ninjafile.build('output{}'.format(i), 'my_rule',
+                                     inputs=src, implicit=hdr)
+        self.assertEqual(m.call_count, 2)
+        self.assertEqual(self.read_builds().count('my_rule {} | {}\n'.format(
+            os.path.join('${srcdir}', 'src'), os.path.join('${srcdir}', 'hdr')
+        )), 10)
+
+    def test_build_pool(self):
+        self.ninjafile.rule('my_rule', ['cmd'])
+        self.ninjafile.pool('my_pool', 2)
+
+        self.ninjafile.build('output', 'my_rule',
+                             variables={'pool': 'my_pool'})
+        self.assertEqual(self.read_builds(),
+                         'build output: my_rule\n'
+                         '  pool = my_pool\n\n')
+
+        self.assertRaises(ValueError, self.ninjafile.build, 'output2',
+                          'my_rule', variables={'pool': 'unknown_pool'})
+
     def test_write(self):
         out = StringIO()
         self.ninjafile.write(out)
@@ -347,3 +423,80 @@ class TestNinjaFile(TestCase):
             'build output: my_rule\n\n'
             'default output\n'
         )
+
+    def test_write_pool(self):
+        out = StringIO()
+        self.ninjafile.write(out)
+        base_ninjafile = out.getvalue()
+
+        out = StringIO()
+        self.ninjafile.pool('my_pool', 2)
+        self.ninjafile.rule('my_rule', ['cmd'], pool='my_pool')
+        self.ninjafile.write(out)
+
+        self.assertEqual(
+            out.getvalue(),
+            base_ninjafile +
+            'ninja_required_version = 1.1\n\n'
+            'pool my_pool\n'
+            '  depth = 2\n\n'
+            'rule my_rule\n'
+            '  command = cmd\n'
+            '  pool = my_pool\n\n'
+        )
+
+    def test_write_spilled(self):
+        with mock.patch.object(NinjaFile, '_spool_size', 16):
+            ninjafile = NinjaFile('build.bfg')
+        ninjafile.rule('my_rule', ['cmd'])
+        for i in range(10):
+            ninjafile.build('output{}'.format(i), 'my_rule')
+        self.assertTrue(ninjafile._builds._rolled)
+
+        out = StringIO()
+        ninjafile.write(out)
+        self.assertTrue(out.getvalue().endswith(''.join(
+            'build output{}: my_rule\n\n'.format(i) for i in range(10)
+        )))
+
+        # Make sure we can keep adding builds after writing.
+        ninjafile.build('output10', 'my_rule')
+        out = StringIO()
+        ninjafile.write(out)
+        self.assertTrue(out.getvalue().endswith(
+            'build output9: my_rule\n\nbuild output10: my_rule\n\n'
+        ))
+
+    def test_write_fragments(self):
+        self.ninjafile.rule('my_rule', ['cmd'])
+        self.ninjafile.build('output', 'my_rule')
+        fragment = path.Path('dir/build.ninja')
+        with self.ninjafile.fragment(fragment, 'dir/build.bfg'):
+            self.ninjafile.build('dir/output', 'my_rule')
+        self.ninjafile.build('output2', 'my_rule')
+        self.assertEqual(list(self.ninjafile.fragments()), [fragment])
+
+        # Builds are unique across all the fragments.
+        with self.ninjafile.fragment(fragment):
+            self.assertRaises(ValueError, self.ninjafile.build, 'output',
+                              'my_rule')
+
+        out = StringIO()
+        self.ninjafile.write(out)
+        self.assertTrue(out.getvalue().endswith(
+            'rule my_rule\n'
+            '  command = cmd\n\n'
+            'subninja dir/build.ninja\n\n'
+            'build output: my_rule\n\n'
+            'build output2: my_rule\n\n'
+        ))
+
+        out = StringIO()
+        self.ninjafile.write_fragment(fragment, out)
+        self.assertEqual(out.getvalue(),
+                         '# Do not edit this file! It was automatically '
+                         'generated by bfg9000.\n'
+                         '# Instead, you should edit the source file that '
+                         'created this:\n'
+                         '# dir/build.bfg\n\n'
+                         'build dir/output: my_rule\n\n')
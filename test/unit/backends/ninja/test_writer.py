@@ -1,8 +1,9 @@
+import os
 from unittest import mock
 
 from ... import *
 
-from bfg9000.backends.ninja.writer import version
+from bfg9000.backends.ninja.writer import _read_fragments, version
 from bfg9000.versioning import Version
 
 
@@ -25,3 +26,26 @@ class TestNinjaVersion(TestCase):
         with mock.patch('bfg9000.shell.which', return_value=['command']), \
              mock.patch('bfg9000.shell.execute', mock_bad_execute):
             self.assertEqual(version({}), None)
+
+
+class TestReadFragments(TestCase):
+    def test_read(self):
+        data = ('rule cc\n' +
+                '  command = cc $in\n' +
+                '\n' +
+                'subninja dir/build.ninja\n' +
+                'subninja sub$ dir/build.ninja\n' +
+                '\n' +
+                'build foo.o: cc foo.c\n' +
+                'subninja never/build.ninja\n')
+        builddir = os.path.abspath('build')
+        filename = os.path.join(builddir, 'build.ninja')
+        with mock.patch('builtins.open', mock_open(read_data=data)):
+            self.assertEqual(_read_fragments(filename), {
+                os.path.join(builddir, 'dir', 'build.ninja'),
+                os.path.join(builddir, 'sub dir', 'build.ninja'),
+            })
+
+    def test_missing(self):
+        with mock.patch('builtins.open', side_effect=FileNotFoundError()):
+            self.assertEqual(_read_fragments('build.ninja'), set())
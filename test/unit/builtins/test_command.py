@@ -1,11 +1,15 @@
+import os
 from unittest import mock
 
 from .common import AttrDict, BuiltinTestCase, TestCase
-from bfg9000 import file_types
+from bfg9000 import file_types, shell
+from bfg9000.backends.make import syntax as make
 from bfg9000.builtins import command as _command
 from bfg9000.builtins.command import Placeholder
 from bfg9000.path import Path, Root
-from bfg9000.safe_str import literal, jbos
+from bfg9000.safe_str import literal, jbos, shell_literal
+from bfg9000.shell import posix as pshell
+from bfg9000.versioning import Version
 
 
 class TestBaseCommand(BuiltinTestCase):
@@ -24,6 +28,20 @@ class TestCommand(TestBaseCommand):
         self.assertSameFile(result, file_types.Phony('foo'))
         self.assertCommand(result.creator, [['echo', 'foo']])
 
+    def test_pool(self):
+        pool = self.context['pool']('heavy', 2)
+        result = self.context['command']('foo', cmd=['echo', 'foo'],
+                                         pool=pool)
+        self.assertIs(result.creator.pool, pool)
+
+        result = self.context['command']('bar', cmd=['echo', 'bar'],
+                                         pool='heavy')
+        self.assertIs(result.creator.pool, pool)
+
+        with self.assertRaises(ValueError):
+            self.context['command']('baz', cmd=['echo', 'baz'],
+                                    pool='nonexist')
+
     def test_string_cmd(self):
         result = self.context['command']('foo', cmd='echo foo')
         self.assertSameFile(result, file_types.Phony('foo'))
@@ -291,6 +309,74 @@ class TestBuildStep(TestBaseCommand):
         self.assertSameFile(result, expected)
         self.assertCommand(result.creator, [['lex', 'foo.lex']], phony=True)
 
+    def test_restat(self):
+        result = self.context['build_step']('lex.yy.c', cmd=[
+            'lex', 'foo.lex'
+        ])
+        self.assertFalse(result.creator.restat)
+
+        result = self.context['build_step']('lex2.yy.c', cmd=[
+            'lex', 'foo.lex'
+        ], restat=True)
+        self.assertTrue(result.creator.restat)
+
+    def test_hermetic(self):
+        result = self.context['build_step']('lex.yy.c', cmd=[
+            'lex', 'foo.lex'
+        ])
+        self.assertFalse(result.creator.hermetic)
+
+        result = self.context['build_step']('lex2.yy.c', cmd=[
+            'lex', 'foo.lex'
+        ], hermetic=True)
+        self.assertTrue(result.creator.hermetic)
+
+    def test_batch(self):
+        build_step = self.context['build_step']
+        files = [self.context['source_file'](i)
+                 for i in ('a.proto', 'b.proto', 'c.proto')]
+        result = build_step(
+            lambda f: [f.replace('.proto', '.pb.cc'),
+                       f.replace('.proto', '.pb.h')],
+            cmd=['protoc', build_step.input], files=files, batch=2
+        )
+
+        names = ['a.pb.cc', 'a.pb.h', 'b.pb.cc', 'b.pb.h', 'c.pb.cc',
+                 'c.pb.h']
+        self.assertEqual([i.path for i in result],
+                         [Path(i, Root.builddir) for i in names])
+        self.assertIs(result[0].creator, result[3].creator)
+        self.assertIsNot(result[0].creator, result[4].creator)
+        self.assertCommand(result[0].creator, [['protoc'] + files[0:2]],
+                           files=files[0:2], phony=False)
+        self.assertCommand(result[4].creator, [['protoc'] + files[2:]],
+                           files=files[2:], phony=False)
+
+    def test_batch_directory(self):
+        files = [self.context['source_file'](i)
+                 for i in ('a/x.proto', 'b/y.proto', 'a/z.proto')]
+        result = self.context['build_step'](
+            lambda f: f.replace('.proto', '.pb.cc'), cmd=['protoc'],
+            files=files, batch='directory'
+        )
+
+        names = ['a/x.pb.cc', 'a/z.pb.cc', 'b/y.pb.cc']
+        self.assertEqual([i.path for i in result],
+                         [Path(i, Root.builddir) for i in names])
+        self.assertEqual(result[0].creator.files, [files[0], files[2]])
+        self.assertIs(result[0].creator, result[1].creator)
+        self.assertEqual(result[2].creator.files, [files[1]])
+
+    def test_batch_invalid(self):
+        build_step = self.context['build_step']
+        with self.assertRaises(TypeError):
+            build_step('foo.c', cmd=['gen'], files=['foo.in'], batch=2)
+        with self.assertRaises(ValueError):
+            build_step(lambda f: f + '.c', cmd=['gen'], batch=2)
+        with self.assertRaises(ValueError):
+            build_step(lambda f: f + '.c', cmd=['gen'], files=['foo.in'],
+                       batch=0)
+
     def test_type(self):
         result = self.context['build_step']('lex.yy.c', cmd=[
             'lex', 'foo.lex'
@@ -445,6 +531,25 @@ class TestPlaceholder(TestCase):
         self.assertRaises(TypeError, lambda: p[0:1][0:1])
 
 
+class TestRestatCommands(BuiltinTestCase):
+    def test_posix(self):
+        self.assertEqual(
+            _command.restat_commands(self.env, ['out'], [['gen', 'out']],
+                                     posix=True),
+            [pshell.keep_mtime(['out'], [['gen', 'out']])]
+        )
+
+    def test_windows(self):
+        with mock.patch('bfg9000.shell.which', return_value=['command']):
+            keepmtime = self.env.tool('keepmtime')
+            self.assertEqual(
+                _command.restat_commands(self.env, ['out'], [['gen', 'out']],
+                                         posix=False),
+                [keepmtime('save', ['out']), ['gen', 'out'],
+                 keepmtime('restore', ['out'])]
+            )
+
+
 class TestMakeBackend(BuiltinTestCase):
     def test_simple(self):
         makefile = mock.Mock()
@@ -454,6 +559,88 @@ class TestMakeBackend(BuiltinTestCase):
             result, [], [], [['echo', 'foo']], None, True
         )
 
+    def test_pool(self):
+        with mock.patch('bfg9000.shell.which', return_value=['command']):
+            semaphore = self.env.tool('semaphore')
+        makefile = mock.Mock()
+        pool = self.context['pool']('heavy', 2)
+        result = self.context['command']('foo', cmds=[
+            ['cd', 'sub dir'], 'echo bar'
+        ], pool=pool)
+        _command.make_command(result.creator, self.build, makefile, self.env)
+
+        lockfile = Path('.bfg_pools/heavy')
+        q = literal("'")
+        makefile.rule.assert_called_once_with(
+            result, [], [], [pshell.join_lines([
+                semaphore(lockfile, 2, q + make.Function(
+                    'subst', q, literal("'\\''"), pshell.join_lines([
+                        ['cd', 'sub dir'], 'echo bar'
+                    ])
+                ) + q),
+            ])], None, True
+        )
+
+    def test_pool_output(self):
+        with mock.patch('bfg9000.shell.which', return_value=['semaphore']):
+            pool = self.context['pool']('heavy', 2)
+            result = self.context['command']('foo', cmds=[
+                ['cd', 'sub dir'], 'echo bar'
+            ], pool=pool)
+            makefile = make.Makefile(None)
+            _command.make_command(result.creator, self.build, makefile,
+                                  self.env)
+
+        # The commands are run in a single shell while holding the
+        # semaphore, so the `cd` applies to the commands after it.
+        makefile._rules.seek(0)
+        self.assertEqual(makefile._rules.read(), (
+            '.PHONY: foo\n'
+            'foo:\n'
+            "\t$(SEMAPHORE) -j 2 {} -c '$(subst ','\\'',"
+            "cd 'sub dir' && echo bar)'\n\n"
+        ).format(os.path.join('.bfg_pools', 'heavy')))
+
+    def test_restat(self):
+        makefile = mock.Mock()
+        result = self.context['build_step']('foo.h', cmd=['gen', 'foo.h'],
+                                            restat=True)
+        _command.make_command(result.creator, self.build, makefile, self.env)
+
+        stamp = Path('foo.h.stamp')
+        missing = make.Function('if', make.Function(
+            'filter-out', make.Function('wildcard', [result]), [result]
+        ), '.bfg_force')
+        self.assertEqual(makefile.rule.mock_calls, [
+            mock.call(target=[result], deps=[stamp], recipe=[mock.ANY]),
+            mock.call(stamp, [missing], [], [pshell.join_lines([
+                pshell.keep_mtime([result], [['gen', 'foo.h']]),
+            ]), mock.ANY], None, False),
+        ])
+        self.assertEqual(makefile.rule.mock_calls[0][2]['recipe'][0].data,
+                         [':'])
+
+    def test_hermetic(self):
+        with mock.patch('bfg9000.shell.which', return_value=['command']):
+            actioncache = self.env.tool('actioncache')
+        makefile = mock.Mock()
+        src = self.context['source_file']('foo.in')
+        result = self.context['build_step']('foo.h', cmd=['gen', src],
+                                            files=[src], hermetic=True)
+        _command.make_command(result.creator, self.build, makefile, self.env)
+
+        args = dict(inputs=[src], outputs=[result], environment={},
+                    cmds=[['gen', src]])
+        makefile.rule.assert_called_once_with(
+            result, [src, src], [], [
+                actioncache('fetch', **args) +
+                [shell_literal('||'), shell_literal('(')] +
+                pshell.join_lines([['gen', src],
+                                   actioncache('store', **args)]) +
+                [shell_literal(')')]
+            ], None, False
+        )
+
 
 class TestNinjaBackend(BuiltinTestCase):
     def test_simple(self):
@@ -464,3 +651,93 @@ class TestNinjaBackend(BuiltinTestCase):
             output=[result], rule='command', inputs=[], implicit=['PHONY'],
             order_only=None, variables={'cmd': ['echo', 'foo']}
         )
+
+    def test_pool(self):
+        ninjafile = mock.Mock()
+        ninjafile.has_pool.return_value = False
+        self.context['pool']('heavy', 2)
+        result = self.context['command']('foo', cmd=['echo', 'foo'],
+                                         pool='heavy')
+        _command.ninja_command(result.creator, self.build, ninjafile, self.env)
+        ninjafile.pool.assert_called_once_with('heavy', 2)
+        ninjafile.build.assert_called_once_with(
+            output=[result], rule='command', inputs=[], implicit=['PHONY'],
+            order_only=None, variables={'cmd': ['echo', 'foo'],
+                                        'pool': 'heavy'}
+        )
+
+    def test_console(self):
+        self.env.backend_version = Version('1.10')
+        ninjafile = mock.Mock()
+        ninjafile.has_rule.return_value = False
+        result = self.context['command']('foo', cmd=['echo', 'foo'])
+        _command.ninja_command(result.creator, self.build, ninjafile, self.env)
+        ninjafile.rule.assert_called_once_with(
+            name='console_command', command=mock.ANY, pool='console'
+        )
+        ninjafile.build.assert_called_once_with(
+            output=[result], rule='console_command', inputs=[],
+            implicit=['PHONY'], order_only=None,
+            variables={'cmd': ['echo', 'foo']}
+        )
+
+    def test_console_pool(self):
+        # An explicit pool takes priority over the console pool.
+        self.env.backend_version = Version('1.10')
+        ninjafile = mock.Mock()
+        ninjafile.has_rule.return_value = False
+        ninjafile.has_pool.return_value = False
+        self.context['pool']('heavy', 2)
+        result = self.context['command']('foo', cmd=['echo', 'foo'],
+                                         pool='heavy')
+        _command.ninja_command(result.creator, self.build, ninjafile, self.env)
+        ninjafile.rule.assert_called_once_with(
+            name='command', command=mock.ANY
+        )
+        ninjafile.build.assert_called_once_with(
+            output=[result], rule='command', inputs=[], implicit=['PHONY'],
+            order_only=None, variables={'cmd': ['echo', 'foo'],
+                                        'pool': 'heavy'}
+        )
+
+    def test_restat(self):
+        ninjafile = mock.Mock()
+        ninjafile.has_rule.return_value = False
+        result = self.context['build_step']('foo.h', cmd=['gen', 'foo.h'],
+                                            restat=True)
+        _command.ninja_command(result.creator, self.build, ninjafile, self.env)
+        ninjafile.rule.assert_called_once_with(
+            name='command_restat', command=mock.ANY, restat=True
+        )
+        ninjafile.build.assert_called_once_with(
+            output=[result], rule='command_restat', inputs=[], implicit=[],
+            order_only=None, variables={
+                'cmd': shell.join_lines(_command.restat_commands(
+                    self.env, [result], [['gen', 'foo.h']]
+                )),
+                'description': 'build => foo.h',
+            }
+        )
+
+    def test_hermetic(self):
+        with mock.patch('bfg9000.shell.which', return_value=['command']):
+            actioncache = self.env.tool('actioncache')
+        ninjafile = mock.Mock()
+        src = self.context['source_file']('foo.in')
+        result = self.context['build_step']('foo.h', cmd=['gen', src],
+                                            files=[src], hermetic=True)
+        _command.ninja_command(result.creator, self.build, ninjafile, self.env)
+
+        args = dict(inputs=[src], outputs=[result], environment={},
+                    cmds=[['gen', src]])
+        ninjafile.build.assert_called_once_with(
+            output=[result], rule='command', inputs=[src], implicit=[src],
+            order_only=None, variables={
+                'cmd': (actioncache('fetch', **args) +
+                        [shell_literal('||'), shell_literal('(')] +
+                        shell.join_lines([['gen', src],
+                                          actioncache('store', **args)]) +
+                        [shell_literal(')')]),
+                'description': 'build => foo.h',
+            }
+        )
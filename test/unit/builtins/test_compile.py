@@ -2,16 +2,18 @@ from collections import namedtuple
 from unittest import mock
 
 from .common import AttrDict, BuiltinTestCase, MockPackage
-from .. import make_env
+from .. import make_env, mock_open
 
-from bfg9000 import file_types, options as opts
+from bfg9000 import file_types, options as opts, shell
 from bfg9000.backends.make import syntax as make
 from bfg9000.backends.ninja import syntax as ninja
 from bfg9000.builtins import (compile, link, packages, project,  # noqa: F401
                               regenerate)
+from bfg9000.builtins.command import restat_commands
 from bfg9000.environment import LibraryMode
 from bfg9000.iterutils import listify, unlistify
 from bfg9000.path import Path, Root
+from bfg9000.shell import posix as pshell
 from bfg9000.tools.msvc import MsvcBuilder
 
 MockCompile = namedtuple('MockCompile', ['file'])
@@ -550,6 +552,128 @@ class TestGeneratedSource(CompileTest):
         self.assertEqual(result.creator.extra_deps, [dep])
 
 
+class TestUnityBuild(CompileTest):
+    mode = 'compiler'
+
+    def object_files(self, *args, **kwargs):
+        with mock.patch('bfg9000.path.write_if_changed',
+                        mock_open()) as mopen, \
+             mock.patch('os.makedirs'):
+            result = self.context['object_files'](*args, **kwargs)
+        return result, [i[0][0] for i in mopen.call_args_list], [
+            i[0][0] for i in mopen.return_value.write.call_args_list
+        ]
+
+    def include(self, name):
+        return '#include "{}"\n'.format(
+            Path(name, Root.srcdir).string(self.env.base_dirs)
+        )
+
+    def test_batches(self):
+        srcs = [file_types.SourceFile(Path(i, Root.srcdir), 'c++')
+                for i in ['a.cpp', 'b.cpp', 'c.cpp', 'd.cpp', 'e.cpp',
+                          'f.cpp', 'g.cpp', 'h.cpp']]
+        self.assertEqual(list(compile._unity_batches(srcs, 10)),
+                         [srcs])
+        self.assertEqual(list(compile._unity_batches(srcs, 3)),
+                         [srcs[0:2], srcs[2:6], srcs[6:7], srcs[7:8]])
+        self.assertEqual(list(compile._unity_batches(srcs, 1)),
+                         [[i] for i in srcs])
+
+    def test_batches_size(self):
+        srcs = [file_types.SourceFile(Path('{}.cpp'.format(i), Root.srcdir),
+                                      'c++') for i in range(1000)]
+        batches = list(compile._unity_batches(srcs, 10))
+        self.assertTrue(all(2 <= len(i) <= 40 for i in batches[:-1]))
+        self.assertAlmostEqual(len(srcs) / len(batches), 10, delta=1)
+
+    def test_batches_stable(self):
+        srcs = [file_types.SourceFile(Path('{:03}.cpp'.format(i),
+                                           Root.srcdir), 'c++')
+                for i in range(0, 400, 2)]
+        batches = list(compile._unity_batches(srcs, 10))
+
+        # Adding or removing a file should only change the batches near it.
+        for i in range(len(srcs)):
+            new_srcs = srcs[:i] + srcs[i + 1:]
+            new_batches = list(compile._unity_batches(new_srcs, 10))
+            self.assertLessEqual(len([j for j in new_batches
+                                      if j not in batches]), 2)
+
+            new_srcs = srcs[:i] + [file_types.SourceFile(
+                Path('{:03}.cpp'.format(i * 2 + 1), Root.srcdir), 'c++'
+            )] + srcs[i:]
+            new_batches = list(compile._unity_batches(new_srcs, 10))
+            self.assertLessEqual(len([j for j in new_batches
+                                      if j not in batches]), 2)
+
+    def test_unity(self):
+        result, files, contents = self.object_files(
+            ['b.cpp', 'a.cpp', 'c.cpp', 'd.cpp'], unity=3
+        )
+        self.assertSameFile(result[0], self.output_file('a.unity'))
+        self.assertSameFile(result[1], self.output_file('c.unity'))
+        self.assertEqual(result[0].creator.file,
+                         file_types.SourceFile(Path('a.unity.cpp'), 'c++'))
+        self.assertEqual(files, [Path('a.unity.cpp').string(
+            self.env.base_dirs
+        ), Path('c.unity.cpp').string(self.env.base_dirs)])
+        self.assertEqual(contents, [self.include(i) for i in
+                                    ['a.cpp', 'b.cpp', 'c.cpp', 'd.cpp']])
+        self.assertEqual(self.build['regenerate'].outputs, [
+            file_types.SourceFile(Path('a.unity.cpp'), 'c++'),
+            file_types.SourceFile(Path('c.unity.cpp'), 'c++'),
+        ])
+
+    def test_single(self):
+        result, files, contents = self.object_files(['a.cpp', 'c.cpp'],
+                                                    unity=3)
+        self.assertSameFile(result[0], self.output_file('a'))
+        self.assertSameFile(result[1], self.output_file('c'))
+        self.assertEqual(files, [])
+
+    def test_exclude(self):
+        result, files, contents = self.object_files(
+            ['a.cpp', 'b.cpp', 'c.cpp', 'd.cpp'], unity=3,
+            unity_exclude=['b.cpp']
+        )
+        self.assertSameFile(result[0], self.output_file('a'))
+        self.assertSameFile(result[1], self.output_file('c.unity'))
+        self.assertSameFile(result[2], self.output_file('b'))
+        self.assertEqual(contents, [self.include(i) for i in
+                                    ['c.cpp', 'd.cpp']])
+
+    def test_mixed(self):
+        obj = file_types.ObjectFile(Path('obj.o', Root.srcdir), None)
+        result, files, contents = self.object_files(
+            ['a.cpp', 'foo.c', obj, 'b.cpp', 'bar.c'], unity=3
+        )
+        self.assertSameFile(result[0], self.output_file('a.unity'))
+        self.assertSameFile(result[1], self.output_file('bar.unity',
+                                                        lang='c'))
+        self.assertIs(result[2], obj)
+        self.assertEqual(contents, [self.include(i) for i in
+                                    ['a.cpp', 'b.cpp', 'bar.c', 'foo.c']])
+
+    def test_directory(self):
+        result, files, contents = self.object_files(['a.cpp', 'b.cpp'],
+                                                    unity=3, directory='dir')
+        self.assertSameFile(result[0], self.output_file('dir/a.unity'))
+        self.assertEqual(files, [Path('dir/a.unity.cpp').string(
+            self.env.base_dirs
+        )])
+
+    def test_project_option(self):
+        self.context['project'](unity=10)
+        result, files, contents = self.object_files(['a.cpp', 'b.cpp'])
+        self.assertSameFile(result[0], self.output_file('a.unity'))
+
+        result, files, contents = self.object_files(['a.cpp', 'b.cpp'],
+                                                    unity=0)
+        self.assertSameFile(result[0], self.output_file('a'))
+        self.assertSameFile(result[1], self.output_file('b'))
+
+
 class TestObjectFiles(BuiltinTestCase):
     def make_file_list(self, make_src=False, prefix=''):
         files = [file_types.ObjectFile(Path(i, Root.srcdir), None)
@@ -659,6 +783,44 @@ class TestMakeBackend(BuiltinTestCase):
             makefile.rule.assert_called_once_with(result, [src, dep], [],
                                                   mock.ANY, mock.ANY, None)
 
+    def test_phony_deps(self):
+        src = self.context['source_file']('main.cpp')
+        result = self.context['object_file'](file=src)
+        compiler = type(result.creator.compiler)
+
+        makefile = make.Makefile(None)
+        with mock.patch.object(compiler, 'phony_deps', True), \
+             mock.patch('logging.log'):
+            compile.make_compile(result.creator, self.build, makefile,
+                                 self.env)
+        (name, recipe), = makefile._defines
+        self.assertEqual(len(recipe), 1)
+        self.assertIn('-MP', recipe[0])
+
+        makefile = make.Makefile(None)
+        with mock.patch.object(compiler, 'phony_deps', False), \
+             mock.patch('logging.log'):
+            compile.make_compile(result.creator, self.build, makefile,
+                                 self.env)
+        (name, recipe), = makefile._defines
+        self.assertEqual(len(recipe), 2)
+        self.assertNotIn('-MP', recipe[0])
+        self.assertIsInstance(recipe[1], make.Silent)
+
+    def test_launcher(self):
+        makefile = make.Makefile(None)
+        src = self.context['source_file']('main.cpp')
+        result = self.context['object_file'](file=src)
+
+        with mock.patch.object(result.creator.compiler, 'launcher',
+                               ['ccache']), \
+             mock.patch('logging.log'):
+            compile.make_compile(result.creator, self.build, makefile,
+                                 self.env)
+        (name, recipe), = makefile._defines
+        self.assertEqual(recipe[0][0:2],
+                         [make.var('CXX_LAUNCHER'), make.var('CXX')])
+
     def test_local_options(self):
         env = make_env('winnt', clear_variables=True,
                        variables={'CXX': 'nonexist'})
@@ -676,10 +838,95 @@ class TestMakeBackend(BuiltinTestCase):
              mock.patch('logging.log'):
             compile.make_compile(result.creator, build, makefile, env)
             mrule.assert_called_once_with(result, [src], [], mock.ANY, {
-                make.var('CXXFLAGS'): [make.var('GLOBAL_CXXFLAGS'), '/MTd']
+                make.var('CXXFLAGS'): make.var('CXXFLAGS_1')
             }, None)
             mvar.assert_any_call('GLOBAL_CXXFLAGS', ['/Zi'],
                                  make.Section.flags, True)
+            mvar.assert_any_call('CXXFLAGS_1',
+                                 [make.var('GLOBAL_CXXFLAGS'), '/MTd'],
+                                 make.Section.flags, True)
+
+    def test_shared_flags(self):
+        env = make_env('winnt', clear_variables=True,
+                       variables={'CXX': 'nonexist'})
+        build, context = self._make_context(env)
+        with mock.patch('bfg9000.tools.c_family._builders', (MsvcBuilder,)), \
+             mock.patch('logging.log'):
+            results = [context['object_file'](
+                file=context['source_file'](i), options=[opts.static()]
+            ) for i in ('main.cpp', 'foo.cpp')]
+            other = context['object_file'](file='bar.cpp', options=['/W4'])
+
+        makefile = make.Makefile(None)
+        with mock.patch.object(make.Makefile, 'rule') as mrule, \
+             mock.patch('logging.log'):
+            for i in results + [other]:
+                compile.make_compile(i.creator, build, makefile, env)
+            self.assertEqual([i[0][4] for i in mrule.call_args_list], [
+                {make.var('CXXFLAGS'): make.var('CXXFLAGS_1')},
+                {make.var('CXXFLAGS'): make.var('CXXFLAGS_1')},
+                {make.var('CXXFLAGS'): make.var('CXXFLAGS_2')},
+            ])
+        self.assertEqual(makefile._global_variables[make.Section.flags][1:], [
+            (make.var('CXXFLAGS_1'), [make.var('GLOBAL_CXXFLAGS'), '/MT']),
+            (make.var('CXXFLAGS_2'), [make.var('GLOBAL_CXXFLAGS'), '/W4',
+                                      '/MD']),
+        ])
+
+    def test_shared_flags_system_include(self):
+        include = Path('include', Root.srcdir)
+        results = [self.context['object_file'](
+            file=self.context['source_file'](src),
+            options=[opts.include_dir(file_types.HeaderDirectory(
+                include, system=system
+            ))]
+        ) for src, system in (('main.cpp', True), ('foo.cpp', False))]
+
+        makefile = make.Makefile(None)
+        with mock.patch.object(make.Makefile, 'rule') as mrule, \
+             mock.patch('logging.log'):
+            for i in results:
+                compile.make_compile(i.creator, self.build, makefile,
+                                     self.env)
+            self.assertEqual([i[0][4] for i in mrule.call_args_list], [
+                {make.var('CXXFLAGS'): make.var('CXXFLAGS_1')},
+                {make.var('CXXFLAGS'): make.var('CXXFLAGS_2')},
+            ])
+        self.assertEqual(makefile._global_variables[make.Section.flags][1:], [
+            (make.var('CXXFLAGS_1'), [make.var('GLOBAL_CXXFLAGS'),
+                                      '-isystem', include]),
+            (make.var('CXXFLAGS_2'), [make.var('GLOBAL_CXXFLAGS'),
+                                      '-I' + include]),
+        ])
+
+    def test_restat(self):
+        with mock.patch('bfg9000.shell.which', mock_which), \
+             mock.patch('bfg9000.shell.execute', mock_execute):
+            result = self.context['generated_source']('file.c', 'file.l',
+                                                      restat=True)
+
+        makefile = make.Makefile(None)
+        with mock.patch.object(make.Makefile, 'rule') as mrule:
+            compile.make_compile(result.creator, self.build, makefile,
+                                 self.env)
+        (name, recipe), = makefile._defines
+        self.assertEqual(name, make.var('RULE_LEX_RESTAT'))
+        self.assertEqual(recipe, [makefile._convert_args(
+            result.creator.compiler(make.qvar('<'), make.var('1'),
+                                    flags=make.var('LFLAGS'))
+        )])
+
+        stamp = Path('file.c.stamp')
+        self.assertEqual(mrule.mock_calls, [
+            mock.call(target='.bfg_force', phony=True),
+            mock.call(target=[result], deps=[stamp], recipe=[mock.ANY]),
+            mock.call(stamp, [result.creator.file, mock.ANY], [], [
+                pshell.keep_mtime([result], [
+                    make.Call(make.var('RULE_LEX_RESTAT'), [result]),
+                ]),
+                mock.ANY,
+            ], {}, None),
+        ])
 
 
 class TestNinjaBackend(BuiltinTestCase):
@@ -696,6 +943,20 @@ class TestNinjaBackend(BuiltinTestCase):
                 variables=mock.ANY
             )
 
+    def test_launcher(self):
+        ninjafile = ninja.NinjaFile(None)
+        src = self.context['source_file']('main.cpp')
+        result = self.context['object_file'](file=src)
+
+        with mock.patch.object(result.creator.compiler, 'launcher',
+                               ['ccache']):
+            compile.ninja_compile(result.creator, self.build, ninjafile,
+                                  self.env)
+        self.assertEqual(ninjafile._rules['cxx'].command[0:2],
+                         [ninja.var('cxx_launcher'), ninja.var('cxx')])
+        self.assertIn((ninja.var('cxx_launcher'), ['ccache']),
+                      ninjafile._variables[ninja.Section.command])
+
     def test_extra_deps(self):
         ninjafile = ninja.NinjaFile(None)
         dep = self.context['generic_file']('dep.txt')
@@ -727,9 +988,33 @@ class TestNinjaBackend(BuiltinTestCase):
             compile.ninja_compile(result.creator, build, ninjafile, env)
             mbuild.assert_called_once_with(
                 output=[result], rule='cxx', inputs=[src], implicit=[],
-                variables={ninja.var('cxxflags'): [
-                    ninja.var('global_cxxflags'), '/MTd'
-                ]},
+                variables={ninja.var('cxxflags'): ninja.var('cxxflags_1')},
             )
             mvar.assert_any_call('global_cxxflags', ['/Zi'],
                                  ninja.Section.flags, True)
+            mvar.assert_any_call('cxxflags_1',
+                                 [ninja.var('global_cxxflags'), '/MTd'],
+                                 ninja.Section.flags, True)
+
+    def test_restat(self):
+        with mock.patch('bfg9000.shell.which', mock_which), \
+             mock.patch('bfg9000.shell.execute', mock_execute):
+            result = self.context['generated_source']('file.c', 'file.l',
+                                                      restat=True)
+
+        ninjafile = ninja.NinjaFile(None)
+        with mock.patch.object(ninja.NinjaFile, 'build') as mbuild:
+            compile.ninja_compile(result.creator, self.build, ninjafile,
+                                  self.env)
+        rule = ninjafile._rules['lex_restat']
+        self.assertTrue(rule.restat)
+        self.assertEqual(rule.command, ninjafile._convert_args(
+            shell.join_lines(restat_commands(self.env, ninja.var('out'), [
+                result.creator.compiler(ninja.var('in'), ninja.var('out'),
+                                        flags=ninja.var('lflags')),
+            ]))
+        ))
+        mbuild.assert_called_once_with(
+            output=[result], rule='lex_restat', inputs=[result.creator.file],
+            implicit=[], variables={}
+        )
@@ -68,6 +68,8 @@ class TestCopyFile(BuiltinTestCase):
             self.assertSameFile(result, File(Path('dir/copied.txt')))
             result = copy_file('../copied.txt', 'file.txt')
             self.assertSameFile(result, File(Path('copied.txt')))
+            self.assertEqual(result.creator.bfgpath,
+                             Path('dir/build.bfg', Root.srcdir))
 
             result = copy_file(file='file.txt', directory='sub')
             self.assertSameFile(result, File(Path('dir/sub/file.txt')))
@@ -90,6 +92,9 @@ class TestCopyFile(BuiltinTestCase):
             result = copy_file(file='../file.txt', directory=Path('dir'))
             self.assertSameFile(result, File(Path('dir/file.txt')))
 
+        result = copy_file('root.txt', 'file.txt')
+        self.assertEqual(result.creator.bfgpath, self.build.bfgpath)
+
     def test_extra_deps(self):
         dep = self.context['generic_file']('dep.txt')
         expected = file_types.File(Path('file.txt'))
@@ -1,9 +1,11 @@
 from unittest import mock
 
+from .. import mock_open
 from .common import AttrDict, BuiltinTestCase
 
 from bfg9000.builtins import find, project, regenerate, version  # noqa: F401
-from bfg9000.builtins.file_types import make_file_list, static_file
+from bfg9000.builtins.file_types import (make_file_list, make_immediate_file,
+                                         static_file)
 from bfg9000.file_types import *
 from bfg9000.path import Path, Root
 
@@ -153,6 +155,25 @@ class TestFileList(BuiltinTestCase):
         ])
 
 
+class TestMakeImmediateFile(BuiltinTestCase):
+    def test_make(self):
+        file = File(Path('dir/file.txt'))
+        with mock.patch('bfg9000.path.write_if_changed',
+                        mock_open()) as mopen, \
+             mock.patch('os.makedirs') as mmakedirs:
+            with make_immediate_file(self.context, file) as out:
+                out.write('contents')
+
+        filename = file.path.string(self.env.base_dirs)
+        mmakedirs.assert_called_once_with(
+            Path('dir').string(self.env.base_dirs), exist_ok=True
+        )
+        # Unchanged files should keep their old timestamps.
+        mopen.assert_called_once_with(filename)
+        mopen.return_value.write.assert_called_once_with('contents')
+        self.assertEqual(self.build['regenerate'].outputs, [file])
+
+
 class TestAutoFile(BuiltinTestCase):
     def test_identity(self):
         expected = File(srcpath('file.txt'))
@@ -308,7 +329,7 @@ class TestDirectory(TestGenericFile):
     filename = 'dir'
 
     def test_include(self):
-        def mock_walk(path, variables=None):
+        def mock_walk(path, variables=None, cache=None, mtimes=None):
             p = srcpath
             return [
                 (p('dir'), [p('dir/sub')], [p('dir/file.txt')]),
@@ -334,7 +355,7 @@ class TestHeaderDirectory(TestDirectory):
     filename = 'include'
 
     def test_include(self):
-        def mock_walk(path, variables=None):
+        def mock_walk(path, variables=None, cache=None, mtimes=None):
             p = srcpath
             return [
                 (p('include'), [p('include/sub')], [p('include/file.hpp')]),
@@ -2,11 +2,12 @@ import os
 from contextlib import contextmanager, ExitStack
 from unittest import mock
 
-from .. import TestCase
+from .. import mock_scandir, TestCase
 from .common import BuiltinTestCase
 
 from bfg9000.builtins import find, project, regenerate, version  # noqa: F401
-from bfg9000.exceptions import SerializationError
+from bfg9000.build_inputs import Regenerating
+from bfg9000.exceptions import AbortConfigure, SerializationError
 from bfg9000.file_types import Directory, File, HeaderDirectory, SourceFile
 from bfg9000.iterutils import uniques
 from bfg9000.path import Path, Root
@@ -42,14 +43,13 @@ def mock_filesystem():
         paths = mock_listdir(path.parent().suffix)
         return path.basename() in paths
 
-    def mock_isdir(path, variables=None):
-        return not path.basename().startswith('file')
+    def mock_isdir(name):
+        return not name.startswith('file')
 
-    with mock.patch('os.listdir', mock_listdir) as a, \
-         mock.patch('bfg9000.path.exists', mock_exists) as b, \
-         mock.patch('bfg9000.path.isdir', mock_isdir) as c, \
-         mock.patch('bfg9000.path.islink', return_value=False) as d:
-        yield a, b, c, d
+    scandir = mock_scandir(mock_listdir, mock_isdir)
+    with mock.patch('os.scandir', scandir) as a, \
+         mock.patch('bfg9000.path.exists', mock_exists) as b:
+        yield a, b
 
 
 class TestFindCache(BuiltinTestCase):
@@ -91,14 +91,25 @@ class TestFindCache(BuiltinTestCase):
         self.cache.add(find.FileFilter('*'), [Path('found')], [Path('extra')])
         self.assertEqual(len(self.cache), 1)
 
+    def test_dirs(self):
+        filter1 = find.FileFilter('*')
+        filter2 = find.FileFilter('*.txt')
+        self.cache.add(filter1, [Path('found')], [Path('extra')],
+                       {srcpath('./'): 1})
+        self.cache.add(filter2, [Path('found')], [Path('extra')])
+        self.assertEqual(self.cache.dirs(filter1), {srcpath('./'): 1})
+        self.assertEqual(self.cache.dirs(filter2), {})
+
     def test_to_json(self):
         self.assertEqual(self.cache.to_json(), [])
-        self.cache.add(find.FileFilter('*'), [Path('found')], [Path('extra')])
+        self.cache.add(find.FileFilter('*'), [Path('found')], [Path('extra')],
+                       {srcpath('./'): 1})
         self.assertEqual(self.cache.to_json(), [
             [{'include': [{'pattern': ['*', 'srcdir', False], 'type': 'f'}],
               'extra': [], 'exclude': [], 'filter_fn': None},
              [['found', 'builddir', False]],
-             [['extra', 'builddir', False]]],
+             [['extra', 'builddir', False]],
+             [[['./', 'srcdir', False], 1]]],
         ])
 
     def test_from_json(self):
@@ -107,12 +118,28 @@ class TestFindCache(BuiltinTestCase):
 
         cache = find.FindCache()
         cache.add(find.FileFilter('*'), [Path('found')], [Path('extra')])
-        self.assertEqual(find.FindCache.from_json([
+        loaded = find.FindCache.from_json([
+            [{'include': [{'pattern': ['*', 'srcdir', False], 'type': 'f'}],
+              'extra': [], 'exclude': [], 'filter_fn': None},
+             [['found', 'builddir', False]],
+             [['extra', 'builddir', False]],
+             [[['./', 'srcdir', False], 1]]]
+        ], self.context)
+        self.assertEqual(loaded, cache)
+        self.assertEqual(loaded.dirs(find.FileFilter('*')),
+                         {srcpath('./'): 1})
+
+    def test_from_json_no_dirs(self):
+        cache = find.FindCache()
+        cache.add(find.FileFilter('*'), [Path('found')], [Path('extra')])
+        loaded = find.FindCache.from_json([
             [{'include': [{'pattern': ['*', 'srcdir', False], 'type': 'f'}],
               'extra': [], 'exclude': [], 'filter_fn': None},
              [['found', 'builddir', False]],
              [['extra', 'builddir', False]]]
-        ], self.context), cache)
+        ], self.context)
+        self.assertEqual(loaded, cache)
+        self.assertEqual(loaded.dirs(find.FileFilter('*')), {})
 
 
 class TestFindResult(TestCase):
@@ -368,14 +395,14 @@ class TestFindCacheFile(BuiltinTestCase):
             find.FindCacheFile(regenerate.RegenerateFiles([], []),
                                cache).save('path')
             mock_dump.assert_called_once_with({
-                'version': 1,
+                'version': 2,
                 'data': {
                     'regen_files': {'inputs': [], 'outputs': []},
                     'cache': [
                         [{'include': [{'pattern': ['*', 'srcdir', False],
                                        'type': 'f'}],
                           'extra': [], 'exclude': [], 'filter_fn': None},
-                         [], []]
+                         [], [], []]
                     ]
                 }
             }, mock.ANY)
@@ -421,6 +448,81 @@ class TestFindCacheFile(BuiltinTestCase):
             find.FindCacheFile.load('path', self.context)
 
 
+class TestFindCheckCache(BuiltinTestCase):
+    def test_abort(self):
+        self.context.regenerating = Regenerating.lazy
+        regen_files = regenerate.RegenerateFiles(
+            [srcpath('build.bfg')],
+            [Path('build.ninja'), Path('foo.unity.cpp'), Path('foo.pc')]
+        )
+        mtimes = {srcpath('build.bfg'): 1, Path('build.ninja'): 2,
+                  Path('foo.unity.cpp'): 1, Path('foo.pc'): 1}
+
+        with mock.patch.object(find.FindCacheFile, 'load',
+                               return_value=(regen_files, find.FindCache())), \
+             mock.patch('bfg9000.path.getmtime_ns',
+                        lambda p, *args, **kwargs: mtimes[p]), \
+             mock.patch('bfg9000.path.exists', return_value=True), \
+             mock.patch('bfg9000.path.touch') as mtouch, \
+             self.assertRaises(AbortConfigure):
+            find.find_check_cache(self.context)
+        mtouch.assert_called_once_with(Path('build.ninja'), mock.ANY)
+
+    def test_regenerate(self):
+        self.context.regenerating = Regenerating.lazy
+        regen_files = regenerate.RegenerateFiles(
+            [srcpath('build.bfg')],
+            [Path('build.ninja'), Path('foo.unity.cpp')]
+        )
+        mtimes = {srcpath('build.bfg'): 3, Path('build.ninja'): 2,
+                  Path('foo.unity.cpp'): 1}
+
+        with mock.patch.object(find.FindCacheFile, 'load',
+                               return_value=(regen_files, find.FindCache())), \
+             mock.patch('bfg9000.path.getmtime_ns',
+                        lambda p, *args, **kwargs: mtimes[p]), \
+             mock.patch('bfg9000.path.touch') as mtouch:
+            find.find_check_cache(self.context)
+        mtouch.assert_not_called()
+
+
+class TestDirsChanged(BuiltinTestCase):
+    def test_unchanged(self):
+        file_filter = find.FileFilter('**/*.txt')
+        dirs = {srcpath('./'): 1, srcpath('dir/'): 2}
+        with mock.patch('bfg9000.path.getmtime_ns',
+                        lambda p, *args, **kwargs: dirs[p]):
+            self.assertFalse(find._dirs_changed(self.env, file_filter, dirs))
+
+    def test_changed(self):
+        file_filter = find.FileFilter('**/*.txt')
+        dirs = {srcpath('./'): 1, srcpath('dir/'): 2}
+        with mock.patch('bfg9000.path.getmtime_ns', return_value=1):
+            self.assertTrue(find._dirs_changed(self.env, file_filter, dirs))
+
+    def test_shared_mtimes(self):
+        file_filter = find.FileFilter('**/*.txt')
+        dirs = {srcpath('./'): 1, srcpath('dir/'): 2}
+        mtimes = {}
+        with mock.patch('bfg9000.path.getmtime_ns',
+                        lambda p, *args, **kwargs: dirs[p]):
+            self.assertFalse(find._dirs_changed(self.env, file_filter, dirs,
+                                                mtimes))
+        self.assertEqual(mtimes, dirs)
+
+        with mock.patch('bfg9000.path.getmtime_ns') as m:
+            self.assertFalse(find._dirs_changed(self.env, file_filter, dirs,
+                                                mtimes))
+            m.assert_not_called()
+
+    def test_missing_base(self):
+        file_filter = find.FileFilter('dir/**/*.txt')
+        dirs = {srcpath('./'): 1}
+        with mock.patch('bfg9000.path.getmtime_ns', return_value=1):
+            self.assertTrue(find._dirs_changed(self.env, file_filter, dirs))
+            self.assertTrue(find._dirs_changed(self.env, file_filter, {}))
+
+
 class TestFilterByPlatform(BuiltinTestCase):
     def setUp(self):
         super().setUp()
@@ -544,6 +646,18 @@ class TestFindFiles(FindTestCase):
         })
         self.assertSeenDirs({srcpath('dir/'), srcpath('dir/sub/')})
 
+    def test_shared_walk(self):
+        scandir = self._ctx[0]
+        with mock.patch('os.scandir', side_effect=scandir) as m:
+            self.find('**/*.cpp')
+            self.assertEqual(m.call_count, 4)
+            self.find('**/*.txt')
+            self.find('dir/**')
+            self.assertEqual(m.call_count, 4)
+
+            self.find('**/*.txt', cache=False)
+            self.assertEqual(m.call_count, 8)
+
     def test_path_pattern(self):
         expected_files = [File(srcpath('dir/file2.txt'))]
         self.assertFound(self.find(srcpath('dir/**')), expected_files)
@@ -1,6 +1,7 @@
+import os
 from unittest import mock
 
-from .. import make_env
+from .. import make_env, mock_open
 from .common import AttrDict, BuiltinTestCase, MockPackage
 
 from bfg9000 import file_types, options as opts
@@ -8,11 +9,14 @@ from bfg9000.backends.make import syntax as make
 from bfg9000.backends.msbuild.solution import Solution
 from bfg9000.backends.ninja import syntax as ninja
 from bfg9000.builtins import (compile, default, link, packages,  # noqa: F401
-                              project)
+                              project, regenerate)
 from bfg9000.environment import LibraryMode
 from bfg9000.iterutils import listify, unlistify
 from bfg9000.path import Path, Root
+from bfg9000.safe_str import literal
+from bfg9000.tools.cc.linker import CcLinker
 from bfg9000.tools.msvc import MsvcBuilder
+from bfg9000.versioning import Version
 
 
 class LinkTest(BuiltinTestCase):
@@ -144,6 +148,20 @@ class TestExecutable(LinkTest):
         self.assertSameFile(result.creator.files[0],
                             self.object_file('dir/main'))
 
+    def test_make_unity(self):
+        executable = self.context['executable']
+        with mock.patch('bfg9000.path.write_if_changed',
+                        mock_open()), \
+             mock.patch('os.makedirs'):
+            result = executable('exe', ['a.cpp', 'b.cpp', 'c.cpp'],
+                                unity=10, unity_exclude=['c.cpp'])
+        self.assertSameFile(result, self.output_file('exe'))
+        self.assertEqual(len(result.creator.files), 2)
+        self.assertSameFile(result.creator.files[0],
+                            self.object_file('exe.int/a.unity'))
+        self.assertSameFile(result.creator.files[1],
+                            self.object_file('exe.int/c'))
+
     def test_make_submodule(self):
         with self.context.push_path(Path('dir/build.bfg', Root.srcdir)):
             executable = self.context['executable']
@@ -753,15 +771,19 @@ class TestLibrary(LinkTest):
         with mock.patch('warnings.warn', lambda s: None):
             result = self.context['library']('library', [src], kind='dual')
 
-        if self.env.builder('c++').can_dual_link:
+        builder = self.env.builder('c++')
+        if builder.can_dual_link:
             self.assertSameFile(result, file_types.DualUseLibrary(
                 self.output_file('library', mode='shared_library'),
                 self.output_file('library', mode='static_library',
                                  extra=static_extra)
             ))
-            for i in result.all:
-                self.assertSameFile(i.creator.files[0],
-                                    self.object_file('liblibrary.int/main'))
+            static_obj = ('liblibrary.int/main' if builder.can_share_objects
+                          else 'liblibrary.static.int/main')
+            self.assertSameFile(result.shared.creator.files[0],
+                                self.object_file('liblibrary.int/main'))
+            self.assertSameFile(result.static.creator.files[0],
+                                self.object_file(static_obj))
         else:
             self.assertSameFile(result, self.output_file(
                 'library', mode='shared_library'
@@ -769,6 +791,61 @@ class TestLibrary(LinkTest):
             self.assertSameFile(result.creator.files[0],
                                 self.object_file('liblibrary.int/main'))
 
+    def test_make_dual_share_objects(self):
+        # Dual-use libraries fall back to shared-only without dual linking.
+        if not self.env.builder('c++').can_dual_link:
+            return
+
+        library = self.context['library']
+        result = library('library', ['main.cpp'], kind='dual',
+                         share_objects=False)
+        self.assertSameFile(result.shared.creator.files[0],
+                            self.object_file('liblibrary.int/main'))
+        self.assertSameFile(result.static.creator.files[0],
+                            self.object_file('liblibrary.static.int/main'))
+        self.assertIsNot(result.shared.creator.files[0],
+                         result.static.creator.files[0])
+
+        result = library('library2', ['main.cpp'], kind='dual',
+                         share_objects=False, intermediate_dir='dir')
+        self.assertSameFile(result.shared.creator.files[0],
+                            self.object_file('dir/main'))
+        self.assertSameFile(result.static.creator.files[0],
+                            self.object_file('dir.static/main'))
+
+        with mock.patch('warnings.warn') as warn:
+            result = library('library3', ['main.cpp'], kind='dual',
+                             share_objects=True)
+        if self.env.builder('c++').can_share_objects:
+            warn.assert_not_called()
+            self.assertIs(result.shared.creator.files[0],
+                          result.static.creator.files[0])
+        else:
+            warn.assert_called_once()
+            self.assertSameFile(
+                result.static.creator.files[0],
+                self.object_file('liblibrary3.static.int/main')
+            )
+
+    def test_make_dual_share_objects_project(self):
+        # Dual-use libraries fall back to shared-only without dual linking.
+        if not self.env.builder('c++').can_dual_link:
+            return
+
+        self.context['project'](share_objects=False)
+        linker = self.env.builder('c++').linker('static_library')
+        result = self.context['library']('library', ['main.cpp'], kind='dual')
+        self.assertSameFile(result.static.creator.files[0],
+                            self.object_file('liblibrary.static.int/main'))
+        self.assertEqual(
+            result.static.forward_opts.compile_options,
+            linker.forwarded_compile_options(AttrDict(name='liblibrary'))
+        )
+
+        whole = self.context['whole_archive'](result.static)
+        self.assertEqual(whole.creator.files, result.static.creator.files)
+        self.assertEqual(whole.forward_opts, result.static.forward_opts)
+
     def test_make_directory(self):
         library = self.context['library']
         expected = self.output_file('dir/library', mode='shared_library')
@@ -902,6 +979,87 @@ class TestMakeBackend(BuiltinTestCase):
         mrule.assert_called_once_with(result, [obj, dep], [], mock.ANY,
                                       self._variables(), None)
 
+    def test_pool(self):
+        with mock.patch('bfg9000.shell.which', return_value=['command']):
+            semaphore = self.env.tool('semaphore')
+        obj = self.context['object_file']('main.o')
+        self.env.link_jobs = 2
+        result = self.context['executable']('exe', obj)
+
+        makefile = make.Makefile(None)
+        with mock.patch.object(make.Makefile, 'rule') as mrule:
+            link.make_link(result.creator, self.build, makefile, self.env)
+        q = literal("'")
+        mrule.assert_called_once_with(result, [obj], [], [
+            semaphore(Path('.bfg_pools/link'), 2, q + make.Function(
+                'subst', q, literal("'\\''"),
+                make.Call(make.var('RULE_CC_LINK'), [obj])
+            ) + q)
+        ], self._variables(), None)
+
+    def test_pool_output(self):
+        obj = self.context['object_file']('main.o')
+        self.env.link_jobs = 2
+        result = self.context['executable']('exe', obj)
+
+        # The linker rule can expand to several shell commands, so the
+        # semaphore runs the whole expanded line in a shell.
+        makefile = make.Makefile(None)
+        with mock.patch('bfg9000.shell.which', return_value=['semaphore']):
+            link.make_link(result.creator, self.build, makefile, self.env)
+        makefile._rules.seek(0)
+        obj_path = os.path.join('$(srcdir)', 'main.o')
+        self.assertEqual(makefile._rules.read(), (
+            'exe: {0}\n'
+            "\t$(SEMAPHORE) -j 2 {1} -c '$(subst ','\\'',"
+            "$(call RULE_CC_LINK,'{0}'))'\n\n"
+        ).format(obj_path, os.path.join('.bfg_pools', 'link')))
+
+    def test_static_pool(self):
+        obj = self.context['object_file']('main.o')
+        self.env.link_jobs = 2
+        result = self.context['static_library']('lib', obj)
+        self.assertIs(result.creator.pool, None)
+
+        result = self.context['shared_library']('shared', obj)
+        self.assertIs(result.creator.pool, self.build['pools']['link'])
+
+        result = self.context['static_library']('lib2', obj, pool='link')
+        self.assertIs(result.creator.pool, self.build['pools']['link'])
+
+    def test_rspfile(self):
+        objs = [self.context['object_file'](i) for i in ('a.o', 'b.o')]
+        result = self.context['executable']('exe', objs)
+        rspfile = Path('exe.rsp')
+
+        makefile = make.Makefile(None)
+        self.env.backend_version = Version('4.3')
+        with mock.patch.object(make.Makefile, 'rule') as mrule, \
+             mock.patch.object(link.Link, 'rspfile_threshold', 1), \
+             mock.patch.object(CcLinker, 'accepts_rspfile', True):
+            link.make_link(result.creator, self.build, makefile, self.env)
+        self.assertTrue(makefile.has_variable('RULE_CC_LINK_RSP'))
+        mrule.assert_called_once_with(result, objs, [], [
+            make.Function('file', literal('>') + rspfile, objs),
+            make.Call(make.var('RULE_CC_LINK_RSP'), rspfile)
+        ], self._variables(), None)
+        self.assertIn(file_types.File(rspfile), list(self.build.targets()))
+
+    def test_rspfile_unsupported(self):
+        objs = [self.context['object_file'](i) for i in ('a.o', 'b.o')]
+        result = self.context['executable']('exe', objs)
+
+        makefile = make.Makefile(None)
+        self.env.backend_version = Version('3.81')
+        with mock.patch.object(make.Makefile, 'rule') as mrule, \
+             mock.patch.object(link.Link, 'rspfile_threshold', 1), \
+             mock.patch.object(CcLinker, 'accepts_rspfile', True):
+            link.make_link(result.creator, self.build, makefile, self.env)
+        mrule.assert_called_once_with(
+            result, objs, [], make.Call(make.var('RULE_CC_LINK'), objs),
+            self._variables(), None
+        )
+
 
 class TestNinjaBackend(BuiltinTestCase):
     def _variables(self, lang='c++'):
@@ -937,6 +1095,57 @@ class TestNinjaBackend(BuiltinTestCase):
             variables=self._variables()
         )
 
+    def test_pool(self):
+        obj = self.context['object_file']('main.o')
+        self.env.link_jobs = 2
+        result = self.context['executable']('exe', obj)
+
+        ninjafile = ninja.NinjaFile(None)
+        with mock.patch.object(ninja.NinjaFile, 'build') as mbuild:
+            link.ninja_link(result.creator, self.build, ninjafile, self.env)
+        self.assertTrue(ninjafile.has_pool('link'))
+
+        variables = self._variables()
+        variables['pool'] = 'link'
+        mbuild.assert_called_once_with(
+            output=[result], rule='cc_link', inputs=[obj], implicit=[],
+            variables=variables
+        )
+
+    def test_rspfile(self):
+        objs = [self.context['object_file'](i) for i in ('a.o', 'b.o')]
+        result = self.context['executable']('exe', objs)
+
+        ninjafile = ninja.NinjaFile(None)
+        with mock.patch.object(ninja.NinjaFile, 'build') as mbuild, \
+             mock.patch.object(link.Link, 'rspfile_threshold', 1), \
+             mock.patch.object(CcLinker, 'accepts_rspfile', True):
+            link.ninja_link(result.creator, self.build, ninjafile, self.env)
+        rule = ninjafile._rules['cc_link_rsp']
+        self.assertEqual(rule.rspfile, ninja.var('rspfile'))
+        self.assertEqual(rule.rspfile_content, ninja.var('in'))
+
+        variables = self._variables()
+        variables[ninja.var('rspfile')] = Path('exe.rsp')
+        mbuild.assert_called_once_with(
+            output=[result], rule='cc_link_rsp', inputs=objs, implicit=[],
+            variables=variables
+        )
+
+    def test_rspfile_unsupported(self):
+        objs = [self.context['object_file'](i) for i in ('a.o', 'b.o')]
+        result = self.context['executable']('exe', objs)
+
+        ninjafile = ninja.NinjaFile(None)
+        with mock.patch.object(ninja.NinjaFile, 'build') as mbuild, \
+             mock.patch.object(link.Link, 'rspfile_threshold', 1), \
+             mock.patch.object(CcLinker, 'accepts_rspfile', False):
+            link.ninja_link(result.creator, self.build, ninjafile, self.env)
+        mbuild.assert_called_once_with(
+            output=[result], rule='cc_link', inputs=objs, implicit=[],
+            variables=self._variables()
+        )
+
 
 class TestMsbuildBackend(BuiltinTestCase):
     def setUp(self):
@@ -0,0 +1,46 @@
+from .common import BuiltinTestCase
+from bfg9000.builtins import pool as pool_  # noqa: F401
+
+
+class TestPool(BuiltinTestCase):
+    def test_pool(self):
+        pool = self.context['pool']('heavy', 2)
+        self.assertEqual(pool.name, 'heavy')
+        self.assertEqual(pool.depth, 2)
+        self.assertEqual(self.build['pools'], {'heavy': pool})
+
+    def test_redefine(self):
+        pool = self.context['pool']('heavy', 2)
+        self.assertIs(self.context['pool']('heavy', 2), pool)
+        with self.assertRaises(ValueError):
+            self.context['pool']('heavy', 3)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            self.context['pool']('heavy!', 2)
+        with self.assertRaises(ValueError):
+            self.context['pool']('console', 1)
+        with self.assertRaises(ValueError):
+            self.context['pool']('heavy', 0)
+
+    def test_get_pool(self):
+        pool = self.context['pool']('heavy', 2)
+        self.assertIs(pool_.get_pool(self.context, pool), pool)
+        self.assertIs(pool_.get_pool(self.context, 'heavy'), pool)
+        self.assertIs(pool_.get_pool(self.context, None), None)
+        with self.assertRaises(ValueError):
+            pool_.get_pool(self.context, 'nonexist')
+
+    def test_link_pool(self):
+        self.assertIs(pool_.link_pool(self.context), None)
+
+        self.env.link_jobs = 4
+        pool = pool_.link_pool(self.context)
+        self.assertEqual(pool.name, 'link')
+        self.assertEqual(pool.depth, 4)
+        self.assertIs(pool_.link_pool(self.context), pool)
+
+    def test_user_link_pool(self):
+        self.env.link_jobs = 4
+        pool = self.context['pool']('link', 1)
+        self.assertIs(pool_.link_pool(self.context), pool)
@@ -1,3 +1,5 @@
+from unittest import mock
+
 from .common import BuiltinTestCase
 
 from bfg9000.builtins import project  # noqa: F401
@@ -38,6 +40,18 @@ class TestProject(BuiltinTestCase):
         self.assertEqual(self.build['project']['intermediate_dirs'], False)
         self.assertEqual(self.build['project']['lang'], 'c')
 
+    def test_split_submodules(self):
+        self.assertEqual(self.build['project']['split_submodules'], False)
+        self.context['project'](split_submodules=True)
+        self.assertEqual(self.build['project']['split_submodules'], True)
+
     def test_invalid_option(self):
         with self.assertRaises(KeyError):
             self.context['project'](unknown=True)
+
+    def test_prefetch_lang(self):
+        with mock.patch.object(self.env, 'prefetch') as m:
+            self.context['project'](intermediate_dirs=False)
+            m.assert_not_called()
+            self.context['project'](lang=['c', 'c++'])
+            m.assert_called_once_with(['c', 'c++'])
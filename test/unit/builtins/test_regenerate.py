@@ -0,0 +1,72 @@
+from unittest import mock
+
+from .common import BuiltinTestCase
+
+from bfg9000 import file_types
+from bfg9000.backends.make import syntax as make
+from bfg9000.backends.ninja import syntax as ninja
+from bfg9000.builtins import regenerate
+from bfg9000.path import Path
+from bfg9000.versioning import Version
+
+
+def mock_which(*args, **kwargs):
+    return ['command']
+
+
+class TestRegenerate(BuiltinTestCase):
+    def setUp(self):
+        super().setUp()
+        with mock.patch('bfg9000.shell.which', mock_which):
+            self.bfg9000 = self.env.tool('bfg9000')
+        self.unity = file_types.SourceFile(Path('a.unity.cpp'), 'c++')
+
+    def test_make(self):
+        self.env.backend = 'make'
+        makefile = make.Makefile(None)
+        with mock.patch.object(make.Makefile, 'rule') as mrule:
+            regenerate.make_regenerate_rule(self.build, makefile, self.env)
+        mrule.assert_called_once_with(
+            target=Path('Makefile'), deps=[self.build.bfgpath],
+            recipe=[self.bfg9000('regenerate', lazy=True)]
+        )
+
+    def test_make_extra_outputs(self):
+        self.build['regenerate'].outputs.append(self.unity)
+        self.env.backend = 'make'
+        makefile = make.Makefile(None)
+        with mock.patch.object(make.Makefile, 'rule') as mrule:
+            regenerate.make_regenerate_rule(self.build, makefile, self.env)
+        recipe = [self.bfg9000('regenerate', lazy=True)]
+        self.assertEqual(mrule.mock_calls, [
+            mock.call(target=Path('Makefile'), deps=[self.build.bfgpath],
+                      recipe=recipe),
+            mock.call(target=[self.unity.path], recipe=recipe),
+        ])
+
+    def test_ninja(self):
+        self.env.backend = 'ninja'
+        self.env.backend_version = Version('1.10')
+        ninjafile = ninja.NinjaFile(None)
+        with mock.patch.object(ninja.NinjaFile, 'build') as mbuild:
+            regenerate.ninja_regenerate_rule(self.build, ninjafile, self.env)
+        self.assertTrue(ninjafile.has_rule('regenerate'))
+        self.assertFalse(ninjafile.has_rule('regenerate_missing'))
+        mbuild.assert_called_once_with(
+            output=Path('build.ninja'), rule='regenerate',
+            implicit=[self.build.bfgpath]
+        )
+
+    def test_ninja_extra_outputs(self):
+        self.build['regenerate'].outputs.append(self.unity)
+        self.env.backend = 'ninja'
+        self.env.backend_version = Version('1.10')
+        ninjafile = ninja.NinjaFile(None)
+        with mock.patch.object(ninja.NinjaFile, 'build') as mbuild:
+            regenerate.ninja_regenerate_rule(self.build, ninjafile, self.env)
+        self.assertTrue(ninjafile.has_rule('regenerate_missing'))
+        self.assertEqual(mbuild.mock_calls, [
+            mock.call(output=Path('build.ninja'), rule='regenerate',
+                      implicit=[self.build.bfgpath]),
+            mock.call(output=[self.unity.path], rule='regenerate_missing'),
+        ])
@@ -38,8 +38,7 @@ class TestToolchain(TestCase):
         self.assertEqual(self.context['environ'], {'NAME': 'value'})
 
     def test_srcdir(self):
-        self.assertEqual(self.context['srcdir'], self.env.srcdir)
-        self.assertIsNot(self.context['srcdir'], self.env.srcdir)
+        self.assertIs(self.context['srcdir'], self.env.srcdir)
 
     def test_target_platform(self):
         self.context['target_platform']('winnt')
@@ -83,6 +82,21 @@ class TestToolchain(TestCase):
             with self.assertRaises(FileNotFoundError):
                 compiler(['foo', 'bar'], 'c++', strict=True)
 
+    def test_compiler_launcher(self):
+        launcher = self.context['compiler_launcher']
+        with mock.patch('bfg9000.shell.which', mock_which):
+            launcher('ccache', 'c++')
+            self.assertEqual(self.env.variables, {'CXX_LAUNCHER': 'command'})
+
+        with mock.patch('bfg9000.shell.which', mock_bad_which):
+            launcher(['ccache', 'sccache'], 'c')
+            self.assertEqual(self.env.variables, {
+                'CXX_LAUNCHER': 'command', 'CC_LAUNCHER': 'ccache'
+            })
+
+            with self.assertRaises(FileNotFoundError):
+                launcher('ccache', 'c', strict=True)
+
     def test_compile_options(self):
         compile_options = self.context['compile_options']
         compile_options('foo', 'c++')
@@ -288,3 +288,21 @@ class TestGlobalEnv(TestCase):
             shell_literal('&&'),
             'cmd'
         ]))
+
+
+class TestKeepMtime(TestCase):
+    def test_keep_mtime(self):
+        save = shell_literal('; do test ! -f "$f" || cp -p "$f" ' +
+                             '"$f.keepmtime"; done')
+        restore = shell_literal(
+            '; do if cmp -s "$f.keepmtime" "$f"; then mv -f "$f.keepmtime" ' +
+            '"$f"; else rm -f "$f.keepmtime"; fi; done'
+        )
+        loop = [shell_literal('for'), shell_literal('f'), shell_literal('in')]
+
+        self.assertEqual(
+            posix.keep_mtime(['out1', 'out2'], [['gen', 'out1', 'out2']]),
+            shell_list(loop + ['out1', 'out2', save, shell_literal('&&'),
+                               'gen', 'out1', 'out2', shell_literal('&&')] +
+                       loop + ['out1', 'out2', restore])
+        )
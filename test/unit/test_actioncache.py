@@ -0,0 +1,170 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from . import *
+
+from bfg9000 import actioncache
+
+
+class TestCacheDir(TestCase):
+    def test_explicit(self):
+        with mock.patch.dict(os.environ, {'BFG9000_ACTION_CACHE': '/cache'}):
+            self.assertEqual(actioncache.cache_dir(), '/cache')
+
+    def test_xdg(self):
+        env = {'BFG9000_ACTION_CACHE': '', 'XDG_CACHE_HOME': '/xdg'}
+        with mock.patch.dict(os.environ, env):
+            self.assertEqual(actioncache.cache_dir(),
+                             os.path.join('/xdg', 'bfg9000', 'actions'))
+
+
+class TestParseSize(TestCase):
+    def test_bytes(self):
+        self.assertEqual(actioncache.parse_size('1024'), 1024)
+
+    def test_suffix(self):
+        self.assertEqual(actioncache.parse_size('2K'), 2048)
+        self.assertEqual(actioncache.parse_size('3m'), 3 * 1024 ** 2)
+        self.assertEqual(actioncache.parse_size('1G'), 1024 ** 3)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            actioncache.parse_size('big')
+
+
+class TestActionCache(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache = os.path.join(self.tmpdir, 'cache')
+        self.input = self.path('input')
+        self.output = self.path('output')
+        self.write(self.input, 'input')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def path(self, name):
+        return os.path.join(self.tmpdir, name)
+
+    def write(self, path, contents):
+        with open(path, 'w') as f:
+            f.write(contents)
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def key(self, command=['gen'], environment=[]):
+        return actioncache.action_key(command, [self.input], environment)
+
+    def test_key(self):
+        key = self.key()
+        self.assertEqual(self.key(), key)
+        self.assertNotEqual(self.key(['gen', '-v']), key)
+        self.assertNotEqual(self.key(environment=['FOO=foo']), key)
+
+        self.write(self.input, 'new input')
+        self.assertNotEqual(self.key(), key)
+        self.write(self.input, 'input')
+        self.assertEqual(self.key(), key)
+
+    def test_key_directory(self):
+        os.mkdir(self.input + '.d')
+        key = actioncache.action_key(['gen'], [self.input + '.d'])
+        self.write(os.path.join(self.input + '.d', 'file'), 'file')
+        self.assertNotEqual(actioncache.action_key(['gen'],
+                                                   [self.input + '.d']), key)
+
+    def test_key_missing(self):
+        key = actioncache.action_key(['gen'], [self.path('missing')])
+        self.write(self.path('missing'), '')
+        self.assertNotEqual(actioncache.action_key(
+            ['gen'], [self.path('missing')]
+        ), key)
+
+    def test_miss(self):
+        self.assertFalse(actioncache.fetch(self.key(), [self.output],
+                                           self.cache))
+
+    def test_hit(self):
+        key = self.key()
+        self.write(self.output, 'output')
+        actioncache.store(key, [self.output], self.cache)
+
+        os.remove(self.output)
+        self.assertTrue(actioncache.fetch(key, [self.output], self.cache))
+        self.assertEqual(self.read(self.output), 'output')
+
+    def test_hit_directory(self):
+        key = self.key()
+        os.mkdir(self.output)
+        self.write(os.path.join(self.output, 'file'), 'output')
+        actioncache.store(key, [self.output], self.cache)
+
+        shutil.rmtree(self.output)
+        self.assertTrue(actioncache.fetch(key, [self.output], self.cache))
+        self.assertEqual(self.read(os.path.join(self.output, 'file')),
+                         'output')
+
+    def test_hit_copies(self):
+        key = self.key()
+        self.write(self.output, 'output')
+        actioncache.store(key, [self.output], self.cache)
+        actioncache.fetch(key, [self.output], self.cache)
+
+        # Changing a restored output in place shouldn't affect the cache.
+        with open(self.output, 'a') as f:
+            f.write(' changed')
+        self.assertTrue(actioncache.fetch(key, [self.output], self.cache))
+        self.assertEqual(self.read(self.output), 'output')
+
+    def test_store_size(self):
+        self.write(self.output, 'output')
+        actioncache.store(self.key(['0']), [self.output], self.cache, 100)
+        self.assertEqual(actioncache._read_size(self.cache), 6)
+
+        with mock.patch('bfg9000.actioncache.evict') as m:
+            actioncache.store(self.key(['1']), [self.output], self.cache, 100)
+            m.assert_not_called()
+        self.assertEqual(actioncache._read_size(self.cache), 12)
+
+        with mock.patch('bfg9000.actioncache.evict') as m:
+            actioncache.store(self.key(['2']), [self.output], self.cache, 15)
+            m.assert_called_once_with(self.cache, 13)
+
+    def test_evict(self):
+        keys = [self.key([str(i)]) for i in range(3)]
+        for i, key in enumerate(keys):
+            self.write(self.output, 'output')
+            actioncache.store(key, [self.output], self.cache)
+            entry = os.path.join(self.cache, key[:2], key)
+            os.utime(entry, (i, i))
+
+        # Using the first entry makes the second the least-recently used.
+        actioncache.fetch(keys[0], [self.output], self.cache)
+        actioncache.evict(self.cache, 12)
+        self.assertEqual([actioncache.fetch(i, [self.output], self.cache)
+                          for i in keys], [True, False, True])
+
+
+class TestMain(TestCase):
+    def main(self, action):
+        argv = ['bfg9000-actioncache', action, '-o', 'output', '--',
+                'gen']
+        with mock.patch('sys.argv', argv), \
+             mock.patch('sys.stderr') as stderr:
+            return actioncache.main(), stderr
+
+    def test_fetch_error(self):
+        with mock.patch('bfg9000.actioncache.fetch', side_effect=OSError()):
+            result, stderr = self.main('fetch')
+        self.assertEqual(result, 1)
+        stderr.write.assert_called_once()
+
+    def test_store_error(self):
+        with mock.patch('bfg9000.actioncache.store', side_effect=OSError()):
+            result, stderr = self.main('store')
+        self.assertEqual(result, 0)
+        stderr.write.assert_called_once()
@@ -24,6 +24,7 @@ class TestEdge(TestCase):
         self.assertEqual(edge.public_output, public_output)
         self.assertEqual(edge.extra_deps, extra_deps)
         self.assertEqual(edge.description, description)
+        self.assertEqual(edge.bfgpath, self.build.current_bfgpath)
 
     def test_simple(self):
         output = file_types.File(Path('file.txt'))
@@ -68,3 +69,8 @@ class TestEdge(TestCase):
         output = file_types.File(Path('file.txt'))
         self.assertEdge(Edge(self.build, output, description='desc'),
                         output, description='desc')
+
+    def test_submodule(self):
+        output = file_types.File(Path('dir/file.txt'))
+        self.build.current_bfgpath = Path('dir/build.bfg')
+        self.assertEdge(Edge(self.build, output), output)
@@ -1,4 +1,9 @@
+import os
+import shutil
+import tempfile
+import time
 from io import StringIO
+from unittest import mock
 
 from . import *
 
@@ -42,6 +47,24 @@ class TestEmitDeps(TestCase):
         depfixer.emit_deps(instream, outstream)
         self.assertEqual(outstream.getvalue(), 'bar:\nquux:\n')
 
+    def test_escaped_newline_in_dep(self):
+        instream = StringIO('foo: bar\\\nbaz \\\n \\\n\n')
+        outstream = StringIO()
+        depfixer.emit_deps(instream, outstream)
+        self.assertEqual(outstream.getvalue(), 'barbaz:\n')
+
+    def test_escaped_chars(self):
+        instream = StringIO('foo: bar\\ baz quux\\:\n')
+        outstream = StringIO()
+        depfixer.emit_deps(instream, outstream)
+        self.assertEqual(outstream.getvalue(), 'bar\\ baz:\nquux\\::\n')
+
+    def test_double_colon(self):
+        instream = StringIO('foo:: bar\n')
+        outstream = StringIO()
+        depfixer.emit_deps(instream, outstream)
+        self.assertEqual(outstream.getvalue(), 'bar:\n')
+
     def test_windows_paths(self):
         instream = StringIO('c:\\foo c:\\bar: c:\\baz c:\\quux\n')
         outstream = StringIO()
@@ -108,3 +131,92 @@ class TestEmitDeps(TestCase):
         outstream = StringIO()
         self.assertRaises(depfixer.ParseError, depfixer.emit_deps, instream,
                           outstream)
+
+
+class TestFixDepfiles(TestCase):
+    marker = '# fixed by bfg9000-depfixer\n'
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.stamp = os.path.join(self.tmpdir, 'stamp')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, name, data, mtime=None):
+        filename = os.path.join(self.tmpdir, name)
+        with open(filename, 'w') as f:
+            f.write(data)
+        if mtime is not None:
+            os.utime(filename, ns=(mtime, mtime))
+        return filename
+
+    def read(self, filename):
+        with open(filename) as f:
+            return f.read()
+
+    def test_fix(self):
+        foo = self.write('foo.d', 'foo: bar\n')
+        baz = self.write('baz.d', 'baz: quux\n')
+        depfixer.fix_depfiles([foo, baz])
+        self.assertEqual(self.read(foo), 'foo: bar\nbar:\n' + self.marker)
+        self.assertEqual(self.read(baz),
+                         'baz: quux\nquux:\n' + self.marker)
+        self.assertFalse(os.path.exists(self.stamp))
+
+    def test_fix_twice(self):
+        foo = self.write('foo.d', 'foo: bar\n')
+        depfixer.fix_depfiles([foo])
+        depfixer.fix_depfiles([foo])
+        self.assertEqual(self.read(foo), 'foo: bar\nbar:\n' + self.marker)
+
+    def test_missing(self):
+        foo = os.path.join(self.tmpdir, 'foo.d')
+        baz = self.write('baz.d', 'baz: quux\n')
+        depfixer.fix_depfiles([foo, baz])
+        self.assertFalse(os.path.exists(foo))
+        self.assertEqual(self.read(baz),
+                         'baz: quux\nquux:\n' + self.marker)
+
+        baz = self.write('baz.d', 'baz: quux\n', mtime=3000)
+        self.write('stamp', '', mtime=2000)
+        depfixer.fix_depfiles([foo, baz], self.stamp)
+        self.assertFalse(os.path.exists(foo))
+        self.assertEqual(self.read(baz),
+                         'baz: quux\nquux:\n' + self.marker)
+
+    def test_stamp(self):
+        foo = self.write('foo.d', 'foo: bar\n', mtime=1000)
+        baz = self.write('baz.d', 'baz: quux\n', mtime=3000)
+        self.write('stamp', '', mtime=2000)
+
+        depfixer.fix_depfiles([foo, baz], self.stamp)
+        self.assertEqual(self.read(foo), 'foo: bar\n')
+        self.assertEqual(self.read(baz),
+                         'baz: quux\nquux:\n' + self.marker)
+        self.assertGreater(os.stat(self.stamp).st_mtime_ns, 3000)
+
+    def test_stamp_start_time(self):
+        foo = self.write('foo.d', 'foo: bar\n')
+        start = time.time_ns()
+        with mock.patch('time.time_ns', return_value=start):
+            depfixer.fix_depfiles([foo], self.stamp)
+        self.assertEqual(os.stat(self.stamp).st_mtime_ns, start)
+
+    def test_stamp_same_mtime(self):
+        foo = self.write('foo.d', 'foo: bar\n', mtime=2000)
+        self.write('stamp', '', mtime=2000)
+        depfixer.fix_depfiles([foo], self.stamp)
+        self.assertEqual(self.read(foo), 'foo: bar\nbar:\n' + self.marker)
+
+    def test_new_stamp(self):
+        foo = self.write('foo.d', 'foo: bar\n')
+        depfixer.fix_depfiles([foo], self.stamp)
+        self.assertEqual(self.read(foo), 'foo: bar\nbar:\n' + self.marker)
+        self.assertTrue(os.path.exists(self.stamp))
+
+    def test_parse_error(self):
+        foo = self.write('foo.d', 'foo\n')
+        with self.assertRaisesRegex(depfixer.ParseError, 'foo.d'):
+            depfixer.fix_depfiles([foo])
+        self.assertEqual(self.read(foo), 'foo\n')
@@ -28,6 +28,7 @@ class TestEnvironmentFromArgs(TestCase):
             shared=True,
             static=False,
             compdb=True,
+            link_jobs=None,
         )
 
     def test_basic(self):
@@ -39,6 +40,7 @@ class TestEnvironmentFromArgs(TestCase):
         self.assertEqual(env.install_dirs, {
             k: getattr(self.args, k.name) for k in path.InstallRoot
         })
+        self.assertEqual(env.link_jobs, None)
 
     def test_extra_args(self):
         env, backend = driver.environment_from_args(self.args)
@@ -1,7 +1,11 @@
 import os
+import threading
+import warnings
+from unittest import mock
 
 from . import *
 
+from bfg9000 import log
 from bfg9000.environment import Environment, EnvVarDict, LibraryMode
 from bfg9000.exceptions import ToolNotFoundError
 from bfg9000.file_types import SourceFile
@@ -183,6 +187,22 @@ class TestEnvironment(TestCase):
         }
         self.assertFalse(env.supports_destdir)
 
+    def test_base_dirs(self):
+        env = self.make_env()
+        base_dirs = env.base_dirs
+        self.assertEqual(base_dirs, {
+            Root.srcdir: Path('/srcdir/'),
+            Root.builddir: Path('/builddir/'),
+            InstallRoot.prefix: Path('/prefix/'),
+            InstallRoot.exec_prefix: Path('/exec-prefix/'),
+        })
+        self.assertIs(env.base_dirs, base_dirs)
+
+        env.install_dirs[InstallRoot.prefix] = Path('/other-prefix/')
+        self.assertIsNot(env.base_dirs, base_dirs)
+        self.assertEqual(env.base_dirs[InstallRoot.prefix],
+                         Path('/other-prefix/'))
+
     def test_builder(self):
         env = self.make_env()
         self.assertIsInstance(env.builder('lex'), lex.LexBuilder)
@@ -195,6 +215,90 @@ class TestEnvironment(TestCase):
         with self.assertRaises(ToolNotFoundError):
             env.tool('nonexist')
 
+    def test_builder_error_retries(self):
+        env = self.make_env()
+        with mock.patch('bfg9000.tools.get_builder',
+                        side_effect=ToolNotFoundError()) as m:
+            for i in range(2):
+                with self.assertRaises(ToolNotFoundError):
+                    env.builder('c')
+            self.assertEqual(m.call_count, 2)
+
+    def test_prefetch(self):
+        env = self.make_env()
+        env.prefetch_enabled = True
+        started = threading.Barrier(3, timeout=10)
+
+        def get_builder(env, lang):
+            # Both builders must be running at once to get past the barrier.
+            started.wait()
+            return lang + '-builder'
+
+        def get_tool(env, name):
+            started.wait()
+            return name + '-tool'
+
+        with mock.patch('bfg9000.tools.get_builder',
+                        side_effect=get_builder) as mb, \
+             mock.patch('bfg9000.tools.get_tool',
+                        side_effect=get_tool) as mt:
+            env.prefetch(['c', 'c++', 'nonexist'], ['rm'])
+            self.assertEqual(env.builder('c'), 'c-builder')
+            self.assertEqual(env.builder('c++'), 'c++-builder')
+            self.assertEqual(env.tool('rm'), 'rm-tool')
+            self.assertEqual(mb.call_count, 2)
+            self.assertEqual(mt.call_count, 1)
+
+            # Already-created builders aren't fetched again.
+            env.prefetch(['c'])
+            self.assertEqual(env.builder('c'), 'c-builder')
+            self.assertEqual(mb.call_count, 2)
+
+    def test_prefetch_error(self):
+        env = self.make_env()
+        env.prefetch_enabled = True
+        with mock.patch('bfg9000.tools.get_builder',
+                        side_effect=ToolNotFoundError()) as m:
+            env.prefetch(['c'])
+            with self.assertRaises(ToolNotFoundError):
+                env.builder('c')
+            self.assertEqual(m.call_count, 2)
+
+    def test_prefetch_warnings(self):
+        env = self.make_env()
+        env.prefetch_enabled = True
+        done = threading.Event()
+
+        def get_builder(env, lang):
+            warnings.warn('warning for ' + lang)
+            done.set()
+            return lang + '-builder'
+
+        with mock.patch('bfg9000.tools.get_builder',
+                        side_effect=get_builder), \
+             mock.patch('logging.log') as mocklog:
+            env.prefetch(['c'])
+            self.assertTrue(done.wait(10))
+            mocklog.assert_not_called()
+
+            # Warnings are only reported once someone asks for the builder.
+            self.assertEqual(env.builder('c'), 'c-builder')
+            mocklog.assert_called_once()
+            args, kwargs = mocklog.call_args
+            self.assertEqual(args[0], log.WARNING)
+            self.assertEqual(str(args[1]), 'warning for c')
+            full_stack = kwargs['extra']['full_stack']
+            self.assertEqual(full_stack[-1].name, 'test_prefetch_warnings')
+
+            env.builder('c')
+            self.assertEqual(mocklog.call_count, 1)
+
+    def test_prefetch_disabled(self):
+        env = self.make_env()
+        with mock.patch('bfg9000.tools.get_builder') as m:
+            env.prefetch(['c'])
+            m.assert_not_called()
+
     def test_run_arguments(self):
         env = self.make_env()
         src = SourceFile(Path('foo.py'), 'python')
@@ -224,6 +328,7 @@ class TestEnvironment(TestCase):
 
         self.assertEqual(env.library_mode, LibraryMode(True, False))
         self.assertEqual(env.extra_args, [])
+        self.assertEqual(env.link_jobs, None)
 
         variables = {'HOME': '/home/user'}
         self.assertEqual(env.variables, variables)
@@ -236,6 +341,7 @@ class TestEnvironment(TestCase):
         env.finalize({}, (True, False), True)
         self.assertEqual(env.library_mode, LibraryMode(True, False))
         self.assertEqual(env.compdb, True)
+        self.assertEqual(env.link_jobs, None)
         self.assertPathEqual(env.install_dirs[InstallRoot.prefix],
                              Path('/prefix/'))
         self.assertPathEqual(env.install_dirs[InstallRoot.exec_prefix],
@@ -250,3 +356,8 @@ class TestEnvironment(TestCase):
                              Path('/foo/'))
         self.assertPathEqual(env.install_dirs[InstallRoot.exec_prefix],
                              Path('/exec-prefix/'))
+
+    def test_finalize_link_jobs(self):
+        env = self.make_env()
+        env.finalize({}, (True, False), True, link_jobs=4)
+        self.assertEqual(env.link_jobs, 4)
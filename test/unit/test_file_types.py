@@ -21,6 +21,26 @@ class TestNode(TestCase):
         self.assertFalse(Node('foo') == Node('bar'))
         self.assertTrue(Node('foo') != Node('bar'))
 
+    def test_extra_attrs(self):
+        f = SourceFile(Path('a', Root.srcdir), 'c')
+        self.assertEqual(f.__dict__, {})
+        f.extra = 'value'
+        self.assertEqual(f.extra, 'value')
+        self.assertEqual(f.__dict__, {'extra': 'value'})
+
+    def test_clone_dict(self):
+        # Arbitrary attributes should be cloned too, whether they're set on a
+        # built-in file type or a subclass without slots.
+        class MyFile(File):
+            pass
+
+        for cls in (File, MyFile):
+            f = cls(Path('a', Root.srcdir))
+            f.extra = Path('b', Root.srcdir)
+            clone = f.clone(pathfn)
+            self.assertEqual(clone.path, Path('a'))
+            self.assertEqual(clone.extra, Path('b'))
+
 
 class TestFile(FileTypeTestCase):
     def test_directory_path(self):
@@ -160,6 +180,16 @@ class TestExecutable(FileTypeTestCase):
         self.assertClone(Executable(Path('a', Root.srcdir), 'elf', 'c'),
                          Executable(Path('a'), 'elf', 'c'), recursive=True)
 
+    def test_lazy_deps(self):
+        exe = Executable(Path('a'), 'elf', 'c')
+        self.assertEqual(exe.install_deps, [])
+        exe.runtime_deps.append(SharedLibrary(Path('b'), 'elf', 'c'))
+        self.assertEqual(exe.install_deps, [
+            SharedLibrary(Path('b'), 'elf', 'c')
+        ])
+        with self.assertRaises(AttributeError):
+            exe.nonexist
+
 
 class TestSharedLibrary(FileTypeTestCase):
     def test_clone(self):
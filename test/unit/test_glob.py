@@ -1,3 +1,6 @@
+import posixpath
+from itertools import combinations
+
 from . import *
 
 from bfg9000.glob import *
@@ -266,3 +269,79 @@ class TestNameGlob(TestCase):
     def test_hash(self):
         self.assertEqual(hash(NameGlob('*')), hash(NameGlob('*')))
         self.assertEqual(hash(NameGlob('*')), hash(NameGlob('*', type='f')))
+
+
+# Patterns and paths used to check that the compiled glob sets produce the
+# same results as their individual globs.
+parity_path_patterns = [
+    '*', '*/', '*.c', 'a/*', 'a/*.c', 'a/b/*', '**', '**/', '**/*.c', 'a/**',
+    'a/**/*.c', '**/b/*', '**/a/**/b', 'a/**/b/**', '*/b/**/x.c', 'b*/**/',
+    '**/a/b/**/*.c', Path('**/*.c', Root.builddir),
+]
+parity_name_patterns = ['*', '*/', '*.c', 'a', 'b*/', '[ab]']
+
+
+def parity_paths():
+    names = ['a', 'b', 'x.c']
+    suffixes = ['']
+    for i in range(3):
+        suffixes += [posixpath.join(j, k) for j in suffixes[-len(names) ** i:]
+                     for k in names]
+    for root in (Root.srcdir, Root.builddir):
+        for i in suffixes:
+            yield Path(i, root)
+            yield Path(i, root, directory=True)
+
+
+class TestPathGlobSet(TestCase):
+    def assertParity(self, globs):
+        globset = PathGlobSet(globs)
+        skip_base = len(globs) == 1
+        for path in parity_paths():
+            expected = PathGlob.Result.never
+            for i in globs:
+                expected |= i.match(path, skip_base)
+            self.assertEqual(globset.match(path), expected,
+                             '{!r} with {!r}'.format(globs, path))
+
+    def test_parity_single(self):
+        for i in parity_path_patterns:
+            for t in ('f', 'd', '*'):
+                try:
+                    self.assertParity([PathGlob(i, t)])
+                except ValueError:
+                    # Type 'f' with a directory pattern.
+                    pass
+
+    def test_parity_multiple(self):
+        for i, j in combinations(parity_path_patterns, 2):
+            self.assertParity([PathGlob(i, '*'), PathGlob(j)])
+
+    def test_shared_base(self):
+        g = PathGlobSet([PathGlob('dir/*.txt'), PathGlob('dir/*.c')])
+        self.assertEqual(g.match(src_dir_file_txt), PathGlob.Result.yes)
+        self.assertEqual(g.match(Path('dir/file.c', Root.srcdir)),
+                         PathGlob.Result.yes)
+        self.assertEqual(g.match(Path('dir/file.h', Root.srcdir)),
+                         PathGlob.Result.never)
+        self.assertEqual(g.match(Path('dir', Root.srcdir)),
+                         PathGlob.Result.no)
+        self.assertEqual(g.match(Path('other/file.c', Root.srcdir)),
+                         PathGlob.Result.never)
+        self.assertEqual(g.match(src_file_txt), PathGlob.Result.never)
+
+
+class TestNameGlobSet(TestCase):
+    def test_parity(self):
+        for i in range(len(parity_name_patterns) + 1):
+            for j in range(i, len(parity_name_patterns) + 1):
+                globs = [NameGlob(k) for k in parity_name_patterns[i:j]]
+                globset = NameGlobSet(globs)
+                for path in parity_paths():
+                    self.assertEqual(
+                        globset.match(path), any(k.match(path) for k in globs),
+                        '{!r} with {!r}'.format(globs, path)
+                    )
+
+    def test_empty(self):
+        self.assertEqual(NameGlobSet([]).match(src_file_txt), False)
@@ -0,0 +1,58 @@
+import os
+import shutil
+import tempfile
+
+from . import *
+
+from bfg9000 import keepmtime
+
+
+class TestKeepMtime(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.output = os.path.join(self.tmpdir, 'output')
+        with open(self.output, 'w') as f:
+            f.write('contents')
+        os.utime(self.output, ns=(1000000000, 1000000000))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, contents):
+        with open(self.output, 'w') as f:
+            f.write(contents)
+
+    def test_unchanged(self):
+        keepmtime.save([self.output])
+        self.write('contents')
+        keepmtime.restore([self.output])
+        self.assertEqual(os.stat(self.output).st_mtime_ns, 1000000000)
+        self.assertEqual(os.listdir(self.tmpdir), ['output'])
+
+    def test_changed(self):
+        keepmtime.save([self.output])
+        self.write('new contents')
+        keepmtime.restore([self.output])
+        self.assertNotEqual(os.stat(self.output).st_mtime_ns, 1000000000)
+        self.assertEqual(os.listdir(self.tmpdir), ['output'])
+
+    def test_removed(self):
+        keepmtime.save([self.output])
+        os.remove(self.output)
+        keepmtime.restore([self.output])
+        self.assertEqual(os.listdir(self.tmpdir), [])
+
+    def test_new_output(self):
+        output = os.path.join(self.tmpdir, 'new')
+        keepmtime.save([output])
+        with open(output, 'w') as f:
+            f.write('contents')
+        keepmtime.restore([output])
+        self.assertEqual(sorted(os.listdir(self.tmpdir)), ['new', 'output'])
+
+    def test_directory(self):
+        output = os.path.join(self.tmpdir, 'dir')
+        os.mkdir(output)
+        keepmtime.save([output])
+        keepmtime.restore([output])
+        self.assertEqual(sorted(os.listdir(self.tmpdir)), ['dir', 'output'])
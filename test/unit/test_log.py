@@ -2,6 +2,7 @@ import inspect
 import logging
 import ntpath
 import sys
+import threading
 import traceback
 import warnings
 from io import StringIO
@@ -476,6 +477,42 @@ class TestLogStack(TestCase):
                 })
 
 
+class TestDeferred(TestCase):
+    def test_deferred(self):
+        with mock.patch('logging.log') as mocklog:
+            with log.deferred() as records:
+                log.info('message')
+                log.log_stack(log.WARNING, 'warning')
+            mocklog.assert_not_called()
+            self.assertEqual(records, [
+                (log.INFO, 'message', (),
+                 {'logger': logging, 'show_stack': False}),
+                (log.WARNING, 'warning', (),
+                 {'logger': logging, 'show_stack': True}),
+            ])
+
+            log.replay(records)
+            tb = traceback.extract_stack()[1:]
+            tb[-1].lineno -= 1
+            mocklog.assert_has_calls([
+                mock.call(log.INFO, 'message', extra={
+                    'full_stack': tb, 'show_stack': False
+                }),
+                mock.call(log.WARNING, 'warning', extra={
+                    'full_stack': tb, 'show_stack': True
+                }),
+            ])
+
+    def test_other_thread(self):
+        with mock.patch('logging.log') as mocklog:
+            with log.deferred() as records:
+                t = threading.Thread(target=log.info, args=('message',))
+                t.start()
+                t.join()
+            self.assertEqual(records, [])
+            self.assertEqual(mocklog.call_count, 1)
+
+
 class TestLogger(TestCase):
     @staticmethod
     def _level(levelno):
@@ -1,6 +1,8 @@
 from . import *
 
 from bfg9000 import options
+from bfg9000.file_types import HeaderDirectory
+from bfg9000.path import Path, Root
 
 
 class TestOptionList(TestCase):
@@ -29,6 +31,43 @@ class TestOptionList(TestCase):
         opts.append('-v')
         self.assertEqual(list(opts), ['-v', '-v'])
 
+    def test_append_fields(self):
+        opts = options.option_list()
+        opts.append(options.define('NAME'))
+        opts.append(options.define('NAME', 'value'))
+        opts.append(options.define('NAME'))
+        opts.append(options.warning('all', 'error'))
+        opts.append(options.warning('all', 'error'))
+        self.assertEqual(list(opts), [
+            options.define('NAME'), options.define('NAME', 'value'),
+            options.warning('all', 'error'),
+        ])
+
+    def test_append_unhashable(self):
+        # Frameworks aren't hashable, so these options have no match key.
+        opts = options.option_list()
+        opts.append(options.framework('foo'))
+        opts.append(options.pthread())
+        opts.append(options.framework('foo'))
+        opts.append(options.pthread())
+        self.assertEqual(list(opts), [options.framework('foo'),
+                                      options.pthread()])
+
+    def test_append_custom_matches(self):
+        class my_option(options.Option):
+            name: str
+            value: str
+
+            def matches(self, rhs):
+                return type(self) is type(rhs) and self.name == rhs.name
+
+        opts = options.option_list()
+        opts.append(my_option('foo', 'bar'))
+        opts.append(my_option('foo', 'baz'))
+        opts.append(my_option('quux', 'baz'))
+        self.assertEqual(list(opts), [my_option('foo', 'bar'),
+                                      my_option('quux', 'baz')])
+
     def test_extend(self):
         opts = options.option_list()
         opts.extend([options.pthread(), options.pic()])
@@ -51,6 +90,16 @@ class TestOptionList(TestCase):
         opts.collect(options.pthread(), [options.pic()])
         self.assertEqual(list(opts), [options.pthread(), options.pic()])
 
+    def test_setitem(self):
+        opts = options.option_list(options.pthread(), options.pic())
+        opts[0] = options.debug()
+        self.assertEqual(list(opts), [options.debug(), options.pic()])
+
+        opts.append(options.pthread())
+        opts.append(options.debug())
+        self.assertEqual(list(opts), [options.debug(), options.pic(),
+                                      options.pthread()])
+
     def test_copy(self):
         opts = options.option_list(options.pthread(), [options.pic()])
         opts2 = opts.copy()
@@ -106,6 +155,17 @@ class TestOptionList(TestCase):
         self.assertFalse(opts1 == opts3)
         self.assertTrue(opts1 != opts3)
 
+    def test_flags_key(self):
+        opts1 = options.option_list(options.pthread(), '-v')
+        opts2 = options.option_list(options.pthread(), '-v')
+        opts3 = options.option_list(options.pic(), '-v')
+        self.assertEqual(opts1.flags_key(), opts2.flags_key())
+        self.assertNotEqual(opts1.flags_key(), opts3.flags_key())
+        self.assertEqual(options.option_list().flags_key(), ())
+
+        opts = options.option_list(options.framework('foo'))
+        self.assertEqual(opts.flags_key(), None)
+
     def test_add(self):
         opts1 = options.option_list(options.pthread())
         opts2 = options.option_list(options.pthread())
@@ -127,6 +187,71 @@ class TestOptionList(TestCase):
             opts += [options.pic()]
 
 
+class TestForwardOptions(TestCase):
+    def make_lib(self, name, libs=[], link_options=[]):
+        return AttrDict(name=name, forward_opts=options.ForwardOptions(
+            compile_options=options.option_list(options.define(name)),
+            link_options=options.option_list(*link_options),
+            libs=libs
+        ))
+
+    def test_recurse(self):
+        c = self.make_lib('C')
+        b = self.make_lib('B', [c])
+        a = self.make_lib('A', [b], ['-framework', 'Foo'])
+        shared = AttrDict(name='shared')
+
+        fwd = options.ForwardOptions.recurse([a, shared])
+        self.assertEqual(fwd.compile_options, options.option_list(
+            options.define('A'), options.define('B'), options.define('C')
+        ))
+        self.assertEqual(fwd.link_options,
+                         options.option_list('-framework', 'Foo'))
+        self.assertEqual(fwd.libs, [b, c])
+        self.assertEqual(fwd.packages, [])
+
+    def test_recurse_diamond(self):
+        d = self.make_lib('D', link_options=['-framework', 'Foo'])
+        b = self.make_lib('B', [d])
+        c = self.make_lib('C', [d])
+        a = self.make_lib('A', [b, c])
+
+        fwd = options.ForwardOptions.recurse([a])
+        self.assertEqual(fwd.compile_options, options.option_list(
+            options.define('A'), options.define('B'), options.define('D'),
+            options.define('C')
+        ))
+        self.assertEqual(fwd.link_options,
+                         options.option_list('-framework', 'Foo'))
+        self.assertEqual(fwd.libs, [b, c, d])
+
+    def test_recurse_order(self):
+        # C must come after B, since B depends on it.
+        c = self.make_lib('C')
+        b = self.make_lib('B', [c])
+        a = self.make_lib('A', [c, b])
+        self.assertEqual(options.ForwardOptions.recurse([a]).libs, [b, c])
+
+    def test_recurse_deep(self):
+        # Each level depends on both libraries in the next level; without
+        # memoization, this would take 2^depth steps.
+        libs = [self.make_lib('L0a'), self.make_lib('L0b')]
+        for i in range(1, 64):
+            libs = [self.make_lib('L{}{}'.format(i, j), libs) for j in 'ab']
+
+        fwd = options.ForwardOptions.recurse(libs)
+        self.assertEqual(len(fwd.libs), 126)
+        self.assertEqual(len(fwd.compile_options), 128)
+
+    def test_update(self):
+        c = self.make_lib('C')
+        b = self.make_lib('B')
+        self.assertEqual(options.ForwardOptions.recurse([b]).libs, [])
+
+        b.forward_opts.update(options.ForwardOptions(libs=[c]))
+        self.assertEqual(options.ForwardOptions.recurse([b]).libs, [c])
+
+
 class TestOption(TestCase):
     def test_create(self):
         my_option = options.option('my_option', value=object)
@@ -215,6 +340,38 @@ class TestOption(TestCase):
         self.assertFalse(o1 == o3)
         self.assertTrue(o1 != o3)
 
+    def test_match_key(self):
+        my_option = options.option('my_option', value=object)
+        self.assertEqual(my_option('foo').match_key(),
+                         my_option('foo').match_key())
+        self.assertNotEqual(my_option('foo').match_key(),
+                            my_option('bar').match_key())
+        self.assertNotEqual(my_option('foo').match_key(),
+                            options.option('other', value=object)('foo')
+                            .match_key())
+        self.assertEqual(my_option(['foo']).match_key(),
+                         my_option(['foo']).match_key())
+        self.assertEqual(my_option({}).match_key(), None)
+
+    def test_flags_key(self):
+        my_option = options.option('my_option', value=object)
+        self.assertEqual(my_option('foo').flags_key(),
+                         my_option('foo').flags_key())
+        self.assertNotEqual(my_option('foo').flags_key(),
+                            my_option('bar').flags_key())
+        self.assertEqual(my_option({}).flags_key(), None)
+
+        # File objects are only the same if they're the same object, even if
+        # they have the same path.
+        path = Path('include', Root.srcdir)
+        system = HeaderDirectory(path, system=True)
+        self.assertEqual(my_option(system).flags_key(),
+                         my_option(system).flags_key())
+        self.assertNotEqual(my_option(system).flags_key(),
+                            my_option(HeaderDirectory(path)).flags_key())
+        self.assertNotEqual(my_option([system]).flags_key(),
+                            my_option([HeaderDirectory(path)]).flags_key())
+
 
 class TestDefine(TestCase):
     def test_name_only(self):
@@ -1,4 +1,11 @@
+import copy
+import gc
 import os
+import pickle
+import shutil
+import tempfile
+import threading
+import weakref
 from collections import namedtuple
 from contextlib import contextmanager
 from unittest import mock
@@ -32,17 +39,17 @@ def mock_filesystem(*, listdir=None, exists=None, isdir=None, islink=None):
     def mock_exists(path, variables=None):
         return True
 
-    def mock_isdir(path, variables=None):
-        return not path.basename().startswith('file')
+    def mock_isdir(name):
+        return not name.startswith('file')
 
-    def mock_islink(path, variables=None):
+    def mock_islink(name):
         return False
 
-    with mock.patch('os.listdir', listdir or mock_listdir) as a, \
-         mock.patch('bfg9000.path.exists', exists or mock_exists) as b, \
-         mock.patch('bfg9000.path.isdir', isdir or mock_isdir) as c, \
-         mock.patch('bfg9000.path.islink', islink or mock_islink) as d:
-        yield a, b, c, d
+    scandir = mock_scandir(listdir or mock_listdir, isdir or mock_isdir,
+                           islink or mock_islink)
+    with mock.patch('os.scandir', scandir) as a, \
+         mock.patch('bfg9000.path.exists', exists or mock_exists) as b:
+        yield a, b
 
 
 class TestPath(PathTestCase):
@@ -351,6 +358,65 @@ class TestPath(PathTestCase):
         self.assertFalse(self.Path('a', path.Root.srcdir) == 'a')
         self.assertTrue(self.Path('a', path.Root.srcdir) != 'a')
 
+    def test_intern(self):
+        p = self.Path('foo/bar', path.Root.srcdir)
+        self.assertIs(self.Path('foo/bar', path.Root.srcdir), p)
+        self.assertIs(self.Path('./foo//bar', path.Root.srcdir), p)
+        self.assertIs(self.Path('foo', path.Root.srcdir).append('bar'), p)
+        self.assertIs(p.parent().append('bar'), p)
+        self.assertIs(p.addext('.txt').stripext(), p)
+
+        self.assertIsNot(self.Path('foo/bar', path.Root.builddir), p)
+        self.assertIsNot(self.Path('foo/bar/', path.Root.srcdir), p)
+        self.assertIsNot(self.Path('foo/bar', path.InstallRoot.bindir),
+                         self.Path('foo/bar', path.InstallRoot.bindir, True))
+
+        winpath = target.platform_info('winnt').Path
+        linuxpath = target.platform_info('linux').Path
+        self.assertIsNot(winpath('foo'), linuxpath('foo'))
+
+    def test_intern_release(self):
+        p = self.Path('unused/path', path.Root.srcdir)
+        ref = weakref.ref(p)
+        del p
+        for i in range(self.Path._recent.maxlen):
+            self.Path('filler{}'.format(i), path.Root.srcdir)
+        gc.collect()
+        self.assertIs(ref(), None)
+
+    def test_intern_threads(self):
+        barrier = threading.Barrier(4, timeout=10)
+        results = [None] * 4
+
+        def make_paths(n):
+            barrier.wait()
+            results[n] = [self.Path('thread/{}'.format(i), path.Root.srcdir)
+                          for i in range(1000)]
+
+        threads = [threading.Thread(target=make_paths, args=(i,))
+                   for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        for i in results[1:]:
+            self.assertEqual(len(i), len(results[0]))
+            for a, b in zip(i, results[0]):
+                self.assertIs(a, b)
+
+    def test_copy(self):
+        for p in (self.Path('foo/bar', path.Root.srcdir),
+                  self.Path('foo/', path.Root.builddir),
+                  self.Path('foo', path.InstallRoot.bindir, True)):
+            self.assertIs(copy.copy(p), p)
+            self.assertIs(copy.deepcopy(p), p)
+
+    def test_pickle(self):
+        for p in (self.Path('foo/bar', path.Root.srcdir),
+                  self.Path('foo/', path.Root.builddir),
+                  self.Path('foo', path.InstallRoot.bindir, True)):
+            self.assertIs(pickle.loads(pickle.dumps(p)), p)
+
     def test_cross(self):
         for name in ('winnt', 'linux'):
             platform = target.platform_info(name)
@@ -702,6 +768,24 @@ class TestPath(PathTestCase):
         p = self.Path('.', path.Root.srcdir)
         self.assertEqual(p.string(paths), ospath.join(ospath.sep, 'srcdir'))
 
+    def test_string_cache(self):
+        ospath = self.ospath
+        paths = path.PathVariables({
+            path.Root.srcdir: self.Path('/srcdir', path.Root.absolute)
+        })
+
+        p = self.Path('foo/bar', path.Root.srcdir)
+        expected = ospath.join(ospath.sep, 'srcdir', 'foo', 'bar')
+        self.assertEqual(p.string(paths), expected)
+        self.assertEqual(paths.strings, {p: expected})
+        self.assertEqual(p.string(paths), expected)
+
+        with mock.patch.object(path.PathVariables, 'max_strings', 1):
+            q = self.Path('baz', path.Root.srcdir)
+            self.assertEqual(q.string(paths),
+                             ospath.join(ospath.sep, 'srcdir', 'baz'))
+            self.assertEqual(list(paths.strings), [q])
+
     def test_hash(self):
         d = {self.Path('.', path.Root.srcdir),
              self.Path('.', path.Root.builddir),
@@ -871,7 +955,7 @@ class TestListdir(TestCase):
             self.assertPathListEqual(nondirs, [path.Path('file.cpp')])
 
     def test_not_found(self):
-        with mock.patch('os.listdir', side_effect=OSError()):
+        with mock.patch('os.scandir', side_effect=OSError()):
             dirs, nondirs = path.listdir(path.Path('.'), self.path_vars)
             self.assertEqual(dirs, [])
             self.assertEqual(nondirs, [])
@@ -894,9 +978,73 @@ class TestWalk(TestCase):
             self.assertEqual(list(path.walk(path.Path('.'), self.path_vars)),
                              [])
 
+    def test_cache(self):
+        Path = path.Path
+        cache = {}
+        with mock_filesystem() as (scandir, _):
+            with mock.patch('os.scandir', side_effect=scandir) as m:
+                for i in range(2):
+                    result = []
+                    for base, dirs, files in path.walk(Path('.'),
+                                                       self.path_vars, cache):
+                        result.append(base)
+                        dirs.clear()
+                    self.assertEqual(result, [Path('.')])
+                self.assertEqual(m.call_count, 1)
+
+                self.assertEqual(list(path.walk(Path('.'), self.path_vars,
+                                                cache)), [
+                    (Path('.'), [Path('dir')], [Path('file.cpp')]),
+                    (Path('dir'), [Path('dir/sub')], [Path('dir/file2.txt')]),
+                    (Path('dir/sub'), [], []),
+                ])
+                self.assertEqual(m.call_count, 3)
+
+    def test_mtimes(self):
+        Path = path.Path
+        calls = []
+
+        def mock_getmtime_ns(p, variables=None, strict=True):
+            calls.append(('stat', p))
+            return len(calls)
+
+        with mock_filesystem() as (scandir, _), \
+             mock.patch('bfg9000.path.getmtime_ns', mock_getmtime_ns):
+            def mock_scandir(p):
+                calls.append(('list', p))
+                return scandir(p)
+
+            with mock.patch('os.scandir', mock_scandir):
+                mtimes, cache = {}, {}
+                list(path.walk(Path('.'), self.path_vars, cache, mtimes))
+
+            # Each directory's modification time should be taken before it's
+            # listed.
+            self.assertEqual([i[0] for i in calls],
+                             ['stat', 'list'] * 3)
+            self.assertEqual(mtimes, {
+                Path('.'): 1, Path('dir'): 3, Path('dir/sub'): 5,
+            })
+
+            # Cached listings should report the time taken with the listing.
+            del calls[:]
+            mtimes2 = {}
+            list(path.walk(Path('.'), self.path_vars, cache, mtimes2))
+            self.assertEqual(calls, [])
+            self.assertEqual(mtimes2, mtimes)
+
+    def test_prune(self):
+        Path = path.Path
+        with mock_filesystem():
+            result = []
+            for base, dirs, files in path.walk(Path('.'), self.path_vars):
+                result.append(base)
+                dirs[:] = [i for i in dirs if i.basename() != 'sub']
+            self.assertEqual(result, [Path('.'), Path('dir')])
+
     def test_link(self):
-        def mock_islink(path, variables=None):
-            return path.basename() == 'dir'
+        def mock_islink(name):
+            return name == 'dir'
 
         Path = path.Path
         with mock_filesystem(islink=mock_islink):
@@ -938,3 +1086,64 @@ class TestPushd(TestCase):
             self.assertEqual(os_chdir.mock_calls, [
                 mock.call('foo'), mock.call('cwd')
             ])
+
+
+class TestWriteIfChanged(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'file.txt')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, data, **kwargs):
+        with path.write_if_changed(self.filename, **kwargs) as out:
+            out.write(data)
+
+    def read(self):
+        with open(self.filename) as f:
+            return f.read()
+
+    def set_mtime(self, mtime):
+        os.utime(self.filename, ns=(mtime, mtime))
+
+    def test_new_file(self):
+        self.write('contents\n')
+        self.assertEqual(self.read(), 'contents\n')
+        self.assertEqual(os.listdir(self.tmpdir), ['file.txt'])
+
+    def test_changed(self):
+        self.write('contents\n')
+        self.set_mtime(1000)
+        self.write('new contents\n')
+        self.assertEqual(self.read(), 'new contents\n')
+        self.assertNotEqual(os.stat(self.filename).st_mtime_ns, 1000)
+
+        # Same size, different contents.
+        self.set_mtime(1000)
+        self.write('NEW CONTENTS\n')
+        self.assertEqual(self.read(), 'NEW CONTENTS\n')
+        self.assertNotEqual(os.stat(self.filename).st_mtime_ns, 1000)
+
+    def test_unchanged(self):
+        self.write('contents\n')
+        self.set_mtime(1000)
+        self.write('contents\n')
+        self.assertEqual(self.read(), 'contents\n')
+        self.assertEqual(os.stat(self.filename).st_mtime_ns, 1000)
+
+    def test_error(self):
+        self.write('contents\n')
+        with self.assertRaises(ValueError):
+            with path.write_if_changed(self.filename) as out:
+                out.write('new contents\n')
+                raise ValueError()
+        self.assertEqual(self.read(), 'contents\n')
+        self.assertEqual(os.listdir(self.tmpdir), ['file.txt'])
+
+    def test_unchanged_touch(self):
+        self.write('contents\n')
+        self.set_mtime(1000)
+        self.write('contents\n', touch=True)
+        self.assertEqual(self.read(), 'contents\n')
+        self.assertNotEqual(os.stat(self.filename).st_mtime_ns, 1000)
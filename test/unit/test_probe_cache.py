@@ -0,0 +1,198 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from . import *
+
+from bfg9000 import shell
+from bfg9000.probe_cache import ProbeCache
+
+
+class TestProbeCache(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.builddir = os.path.join(self.tmpdir, 'build')
+        os.mkdir(self.builddir)
+
+        self.compiler = os.path.join(self.tmpdir, 'cc')
+        with open(self.compiler, 'w') as f:
+            f.write('compiler')
+
+        self.env = make_env(variables={'PATH': self.tmpdir})
+        self.env.probe_cache = ProbeCache()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def probe(self, args=['--version'], **kwargs):
+        return self.env.probe([self.compiler] + args, stdout=shell.Mode.pipe,
+                              **kwargs)
+
+    def test_no_cache(self):
+        self.env.probe_cache = None
+        with mock.patch('bfg9000.shell.execute',
+                        return_value='version') as m:
+            self.assertEqual(self.probe(), 'version')
+            self.assertEqual(self.probe(), 'version')
+            self.assertEqual(m.call_count, 2)
+
+    def test_cached(self):
+        with mock.patch('bfg9000.shell.execute',
+                        return_value='version') as m:
+            self.assertEqual(self.probe(), 'version')
+            self.assertEqual(self.probe(), 'version')
+            self.assertEqual(m.call_count, 1)
+
+            self.assertEqual(self.probe(['-v']), 'version')
+            self.assertEqual(m.call_count, 2)
+
+    def test_cached_tuple(self):
+        with mock.patch('bfg9000.shell.execute',
+                        return_value=('out', 'err')) as m:
+            self.assertEqual(self.probe(stderr=shell.Mode.pipe),
+                             ('out', 'err'))
+            self.env.probe_cache.save(self.builddir)
+            self.env.probe_cache = ProbeCache.load(self.builddir)
+            self.assertEqual(self.probe(stderr=shell.Mode.pipe),
+                             ('out', 'err'))
+            self.assertEqual(m.call_count, 1)
+
+    def test_cached_error(self):
+        err = shell.CalledProcessError(1, ['cc'], 'bad')
+        with mock.patch('bfg9000.shell.execute', side_effect=err) as m:
+            for i in range(2):
+                with self.assertRaises(shell.CalledProcessError) as e:
+                    self.probe()
+                self.assertEqual(e.exception.returncode, 1)
+                self.assertEqual(e.exception.output, 'bad')
+            self.assertEqual(m.call_count, 1)
+
+    def test_variables(self):
+        with mock.patch('bfg9000.shell.execute',
+                        return_value='version') as m:
+            self.probe()
+            self.env.variables['CFLAGS'] = '-O2'
+            self.probe()
+            self.assertEqual(m.call_count, 2)
+
+            self.probe(extra_env={'CPATH': '/include'})
+            self.assertEqual(m.call_count, 3)
+
+            # Irrelevant variables don't invalidate the cache.
+            self.env.variables['FOO'] = 'foo'
+            self.probe()
+            self.assertEqual(m.call_count, 3)
+
+    def test_java_variables(self):
+        # The JVM's options can change what `java -version` reports, so
+        # changing them has to invalidate the cache.
+        with mock.patch('bfg9000.shell.execute',
+                        return_value='version') as m:
+            self.probe(['-version'])
+            self.probe(['-version'])
+            self.assertEqual(m.call_count, 1)
+
+            self.env.variables['JAVA_HOME'] = '/jdk'
+            self.probe(['-version'])
+            self.assertEqual(m.call_count, 2)
+
+            self.env.variables['JAVA_TOOL_OPTIONS'] = '-Xmx1g'
+            self.probe(['-version'])
+            self.assertEqual(m.call_count, 3)
+
+    def test_executable_changed(self):
+        with mock.patch('bfg9000.shell.execute',
+                        return_value='version') as m:
+            self.probe()
+            self.env.probe_cache.save(self.builddir)
+
+            with open(self.compiler, 'w') as f:
+                f.write('new compiler')
+            self.env.probe_cache = ProbeCache.load(self.builddir)
+            self.probe()
+            self.assertEqual(m.call_count, 2)
+
+    def test_executable_not_found(self):
+        with mock.patch('bfg9000.shell.execute',
+                        return_value='version') as m:
+            for i in range(2):
+                self.env.probe(['nonexist', '--version'],
+                               stdout=shell.Mode.pipe)
+            self.assertEqual(m.call_count, 2)
+
+    def test_save_load(self):
+        with mock.patch('bfg9000.shell.execute',
+                        return_value='version') as m:
+            self.probe()
+            self.env.probe_cache.save(self.builddir)
+            self.assertTrue(os.path.exists(os.path.join(
+                self.builddir, ProbeCache.cachefile
+            )))
+
+            self.env.probe_cache = ProbeCache.load(self.builddir)
+            self.assertEqual(self.probe(), 'version')
+            self.assertEqual(m.call_count, 1)
+
+    def test_save_prunes_unused(self):
+        with mock.patch('bfg9000.shell.execute', return_value='version'):
+            self.probe()
+            self.probe(['-v'])
+            self.env.probe_cache.save(self.builddir)
+
+            self.env.probe_cache = ProbeCache.load(self.builddir)
+            self.probe()
+            self.env.probe_cache.save(self.builddir)
+
+        self.assertEqual(len(ProbeCache.load(self.builddir)._entries), 1)
+
+    def test_user_dir(self):
+        userdir = os.path.join(self.tmpdir, 'user')
+        otherdir = os.path.join(self.tmpdir, 'other')
+        os.mkdir(otherdir)
+
+        with mock.patch('bfg9000.shell.execute',
+                        return_value='version') as m:
+            self.env.probe_cache = ProbeCache.load(self.builddir, userdir)
+            self.probe()
+            self.env.probe_cache.save(self.builddir)
+
+            self.env.probe_cache = ProbeCache.load(otherdir, userdir)
+            self.assertEqual(self.probe(), 'version')
+            self.assertEqual(m.call_count, 1)
+
+    def test_user_dir_lru(self):
+        userdir = os.path.join(self.tmpdir, 'user')
+        userfile = os.path.join(userdir, ProbeCache.user_cachefile)
+
+        with mock.patch('bfg9000.shell.execute', return_value='version'), \
+             mock.patch.object(ProbeCache, 'max_user_entries', 2):
+            self.env.probe_cache = ProbeCache.load(self.builddir, userdir)
+            self.probe(['-a'])
+            self.probe(['-b'])
+            self.env.probe_cache.save(self.builddir)
+            first = list(ProbeCache._read(userfile).items())[0]
+
+            # Using the oldest entry again should keep it in the shared cache
+            # when a new entry pushes out the least recently used one.
+            self.env.probe_cache = ProbeCache.load(self.builddir, userdir)
+            self.probe(['-a'])
+            self.env.probe_cache.save(self.builddir)
+            self.env.probe_cache = ProbeCache.load(self.builddir, userdir)
+            self.probe(['-c'])
+            self.env.probe_cache.save(self.builddir)
+
+            entries = ProbeCache._read(userfile)
+            self.assertEqual(len(entries), 2)
+            self.assertIn(first[0], entries)
+
+    def test_load_invalid(self):
+        with open(os.path.join(self.builddir, ProbeCache.cachefile),
+                  'w') as f:
+            f.write('invalid')
+        self.assertEqual(ProbeCache.load(self.builddir)._entries, {})
+
+        with open(os.path.join(self.builddir, ProbeCache.cachefile),
+                  'w') as f:
+            f.write('{"version": 999, "data": {"key": "value"}}')
+        self.assertEqual(ProbeCache.load(self.builddir)._entries, {})
@@ -0,0 +1,82 @@
+import json
+import os
+import shutil
+import tempfile
+
+from . import *
+
+from bfg9000 import profiler
+from bfg9000.backends import BuildRuleHandler
+
+
+class TestProfiler(TestCase):
+    def tearDown(self):
+        profiler.stop()
+
+    def test_disabled(self):
+        self.assertFalse(profiler.enabled())
+        with profiler.span('name', 'category'):
+            pass
+        self.assertIsNone(profiler.stop())
+
+    def test_span(self):
+        p = profiler.start()
+        self.assertTrue(profiler.enabled())
+        with profiler.span('outer', 'category', foo='bar'):
+            with profiler.span('inner', 'category'):
+                pass
+        self.assertIs(profiler.stop(), p)
+        self.assertFalse(profiler.enabled())
+
+        inner, outer = p.events
+        self.assertEqual(inner['name'], 'inner')
+        self.assertEqual(inner['cat'], 'category')
+        self.assertEqual(inner['ph'], 'X')
+        self.assertEqual(inner['args'], {})
+        self.assertEqual(outer['name'], 'outer')
+        self.assertEqual(outer['args'], {'foo': 'bar'})
+        self.assertLessEqual(outer['ts'], inner['ts'])
+        self.assertGreaterEqual(outer['dur'], inner['dur'])
+
+    def test_span_exception(self):
+        p = profiler.start()
+        with self.assertRaises(ValueError):
+            with profiler.span('name', 'category'):
+                raise ValueError()
+        self.assertEqual(len(p.events), 1)
+
+    def test_script_location(self):
+        p = profiler.start()
+        filename = os.path.abspath('build.bfg')
+        profiler.add_script(filename)
+        code = compile('\n\nwith span("name", "category"):\n  pass\n',
+                       filename, 'exec')
+        exec(code, {'span': profiler.span})
+        self.assertEqual(p.events[0]['args'],
+                         {'file': filename, 'line': 3})
+
+    def test_rule_handler(self):
+        handler = BuildRuleHandler()
+
+        @handler(int)
+        def handle_int(e):
+            pass
+
+        p = profiler.start()
+        handler.run([1, 2])
+        self.assertEqual([i['name'] for i in p.events],
+                         ['handle_int', 'handle_int'])
+
+    def test_save(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            p = profiler.start()
+            with profiler.span('name', 'category'):
+                pass
+            filename = os.path.join(tmpdir, 'trace.json')
+            profiler.stop().save(filename)
+            with open(filename) as f:
+                data = json.load(f)
+            self.assertEqual(data['traceEvents'], p.events)
+        finally:
+            shutil.rmtree(tmpdir)
@@ -0,0 +1,45 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from . import *
+
+from bfg9000 import semaphore
+
+
+class TestAcquire(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.lockfile = os.path.join(self.tmpdir, 'pools', 'link')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_acquire(self):
+        with semaphore.acquire(self.lockfile, 2):
+            pass
+        self.assertEqual(sorted(os.listdir(os.path.dirname(self.lockfile))),
+                         ['link.0', 'link.1'])
+
+    def test_nested(self):
+        with semaphore.acquire(self.lockfile, 2):
+            with semaphore.acquire(self.lockfile, 2):
+                pass
+
+    def test_wait(self):
+        sleeps = []
+
+        def sleep(interval):
+            sleeps.append(interval)
+            os.close(fd)
+
+        # Hold the only slot from another open file description; once we've
+        # "waited", release it so the acquire can succeed.
+        os.makedirs(os.path.dirname(self.lockfile))
+        fd = os.open(self.lockfile + '.0', os.O_RDWR | os.O_CREAT)
+        self.assertTrue(semaphore._try_lock(fd))
+        with mock.patch('time.sleep', sleep):
+            with semaphore.acquire(self.lockfile, 1, interval=0.5):
+                pass
+        self.assertEqual(sleeps, [0.5])
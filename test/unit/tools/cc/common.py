@@ -2,7 +2,7 @@ from bfg9000.languages import Languages
 
 known_langs = Languages()
 with known_langs.make('c++') as x:
-    x.vars(compiler='CXX', flags='CXXFLAGS')
+    x.vars(compiler='CXX', flags='CXXFLAGS', launcher='CXX_LAUNCHER')
 with known_langs.make('java') as x:
     x.vars(compiler='JAVAC', flags='JAVAFLAGS')
 
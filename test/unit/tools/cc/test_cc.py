@@ -62,6 +62,8 @@ class TestCcBuilder(CrossPlatformTestCase):
         self.assertEqual(cc.family, 'native')
         self.assertEqual(cc.auto_link, False)
         self.assertEqual(cc.can_dual_link, True)
+        self.assertEqual(cc.can_share_objects,
+                         not self.env.target_platform.has_import_library)
 
         self.assertEqual(cc.compiler.num_outputs, 'all')
         self.assertEqual(cc.pch_compiler.num_outputs, 'all')
@@ -197,6 +199,28 @@ class TestCcBuilder(CrossPlatformTestCase):
         self.assertEqual(cc.linker('executable').version, None)
         self.assertEqual(cc.linker('shared_library').version, None)
 
+    def test_launcher(self):
+        version = ('g++ (Ubuntu 5.4.0-6ubuntu1~16.04.6) 5.4.0 20160609\n' +
+                   'Copyright (C) 2015 Free Software Foundation, Inc.')
+
+        with mock.patch('bfg9000.shell.which', mock_which), \
+             mock.patch('bfg9000.shell.execute', mock_execute):
+            cc = CcBuilder(self.env, known_langs['c++'], ['g++'], True,
+                           version)
+        self.assertEqual(cc.compiler.launcher, [])
+        self.assertEqual(cc.pch_compiler.launcher, [])
+
+        self.env.variables['CXX_LAUNCHER'] = 'ccache'
+        with mock.patch('bfg9000.shell.which', mock_which), \
+             mock.patch('bfg9000.shell.execute', mock_execute):
+            cc = CcBuilder(self.env, known_langs['c++'], ['g++'], True,
+                           version)
+        self.assertEqual(cc.brand, 'gcc')
+        self.assertEqual(cc.compiler.command, ['g++'])
+        self.assertEqual(cc.compiler.launcher, ['command'])
+        self.assertEqual(cc.pch_compiler.launcher, ['command'])
+        self.assertEqual(cc.linker('executable').command, ['g++'])
+
     def test_set_ld_gold(self):
         version = ('g++ (Ubuntu 5.4.0-6ubuntu1~16.04.6) 5.4.0 20160609\n' +
                    'Copyright (C) 2015 Free Software Foundation, Inc.')
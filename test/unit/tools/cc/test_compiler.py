@@ -41,6 +41,26 @@ class TestCcCompiler(CrossPlatformTestCase):
             [self.compiler] + extra + ['flags', '-c', 'in', '-MMD', '-MF',
                                        'out.d', '-o', 'out']
         )
+        self.assertEqual(
+            self.compiler('in', 'out', launcher=['ccache']),
+            ['ccache', self.compiler] + extra + ['-c', 'in', '-o', 'out']
+        )
+        self.assertEqual(
+            self.compiler('in', 'out', 'out.d', phony_deps=True),
+            [self.compiler] + extra + ['-c', 'in', '-MMD', '-MF', 'out.d',
+                                       '-MP', '-o', 'out']
+        )
+
+    def test_phony_deps(self):
+        with mock.patch('bfg9000.shell.execute', return_value=''):
+            self.assertEqual(self.compiler.phony_deps, True)
+
+    def test_phony_deps_unsupported(self):
+        def mock_execute(*args, **kwargs):
+            raise OSError()
+
+        with mock.patch('bfg9000.shell.execute', mock_execute):
+            self.assertEqual(self.compiler.phony_deps, False)
 
     def test_default_name(self):
         src = SourceFile(Path('file.cpp', Root.srcdir), 'c++')
@@ -60,6 +60,16 @@ class TestCcLinker(CrossPlatformTestCase):
         self.assertFalse(self.linker.can_link('goofy', ['c']))
         self.assertFalse(self.linker.can_link(fmt, ['objc++']))
 
+    def test_accepts_rspfile(self):
+        self.assertFalse(self.linker.accepts_rspfile)
+
+        version = 'clang version 3.8.0-2ubuntu4 (tags/RELEASE_380/final)'
+        with mock.patch('bfg9000.shell.which', mock_which), \
+             mock.patch('bfg9000.shell.execute', mock_execute):
+            linker = CcBuilder(self.env, known_langs['c++'], ['c++'], True,
+                               version).linker('executable')
+        self.assertTrue(linker.accepts_rspfile)
+
     def test_sysroot(self):
         def mock_execute(*args, **kwargs):
             raise OSError()
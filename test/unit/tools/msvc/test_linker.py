@@ -287,6 +287,9 @@ class TestMsvcStaticLinker(CrossPlatformTestCase):
         self.assertTrue(self.linker.can_link(fmt, ['goofy']))
         self.assertFalse(self.linker.can_link('goofy', ['c']))
 
+    def test_accepts_rspfile(self):
+        self.assertTrue(self.linker.accepts_rspfile)
+
     def test_flags_empty(self):
         self.assertEqual(self.linker.flags(opts.option_list()), [])
 
@@ -58,6 +58,7 @@ class TestMsvcBuilder(CrossPlatformTestCase):
         self.assertEqual(cc.family, 'native')
         self.assertEqual(cc.auto_link, True)
         self.assertEqual(cc.can_dual_link, False)
+        self.assertEqual(cc.can_share_objects, False)
 
         self.assertEqual(cc.compiler.num_outputs, 'all')
         self.assertEqual(cc.pch_compiler.num_outputs, 2)
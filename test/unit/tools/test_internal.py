@@ -2,7 +2,40 @@ from . import *
 
 from bfg9000.safe_str import shell_literal
 from bfg9000.shell.list import shell_list
-from bfg9000.tools.internal import Bfg9000, Depfixer, JvmOutput, RccDep
+from bfg9000.path import Path
+from bfg9000.safe_str import jbos, literal
+from bfg9000.tools.internal import (ActionCache, Bfg9000, Depfixer, JvmOutput,
+                                    KeepMtime, RccDep, Semaphore)
+
+
+class TestActionCache(ToolTestCase):
+    tool_type = ActionCache
+
+    def test_env(self):
+        with mock.patch('bfg9000.shell.which', return_value=['command']):
+            self.assertIsInstance(self.env.tool('actioncache'), ActionCache)
+
+    def test_fetch(self):
+        self.assertEqual(self.tool(
+            'fetch', inputs=['in'], outputs=['out'], cmds=[['gen', 'in']]
+        ), [self.tool, 'fetch', '-i', 'in', '-o', 'out', '--', 'gen', 'in'])
+
+    def test_store(self):
+        self.assertEqual(self.tool(
+            'store', inputs=[], outputs=['out1', 'out2'],
+            environment={'FOO': 'foo'}, cmds=[['gen'], 'touch out2']
+        ), [self.tool, 'store', '-o', 'out1', 'out2', '-e',
+            jbos('FOO', '=', 'foo'), '--', 'gen', '&&', 'touch out2'])
+
+    def test_shell_literal(self):
+        path = Path('out')
+        self.assertEqual(self.tool(
+            'fetch', inputs=[], outputs=[path], cmds=[shell_list([
+                'gen', shell_literal('>'),
+                jbos(shell_literal('--out='), path)
+            ])]
+        ), [self.tool, 'fetch', '-o', path, '--', 'gen', '>',
+            jbos('--out=', path)])
 
 
 class TestBfg9000(ToolTestCase):
@@ -58,6 +91,22 @@ class TestJvmOutput(ToolTestCase):
                          [self.tool, '-o', 'output', '--', 'echo', 'hi'])
 
 
+class TestKeepMtime(ToolTestCase):
+    tool_type = KeepMtime
+
+    def test_env(self):
+        with mock.patch('bfg9000.shell.which', return_value=['command']):
+            self.assertIsInstance(self.env.tool('keepmtime'), KeepMtime)
+
+    def test_save(self):
+        self.assertEqual(self.tool('save', ['foo', 'bar']),
+                         [self.tool, 'save', 'foo', 'bar'])
+
+    def test_restore(self):
+        self.assertEqual(self.tool('restore', 'foo'),
+                         [self.tool, 'restore', 'foo'])
+
+
 class TestRccDep(ToolTestCase):
     tool_type = RccDep
 
@@ -68,3 +117,23 @@ class TestRccDep(ToolTestCase):
     def test_rccdep(self):
         self.assertEqual(self.tool(['echo', 'hi'], 'depfile'),
                          [self.tool, 'echo', 'hi', '-d', 'depfile'])
+
+
+class TestSemaphore(ToolTestCase):
+    tool_type = Semaphore
+
+    def test_env(self):
+        with mock.patch('bfg9000.shell.which', return_value=['command']):
+            self.assertIsInstance(self.env.tool('semaphore'), Semaphore)
+
+    def test_command(self):
+        self.assertEqual(self.tool('lock', 2, ['echo', 'hi']),
+                         [self.tool, '-j', '2', 'lock', '--', 'echo', 'hi'])
+
+    def test_shell_command(self):
+        self.assertEqual(self.tool('lock', 2, 'echo hi'),
+                         [self.tool, '-j', '2', 'lock', '-c', 'echo hi'])
+
+        cmd = jbos(literal("'"), 'echo hi', literal("'"))
+        self.assertEqual(self.tool('lock', 2, cmd),
+                         [self.tool, '-j', '2', 'lock', '-c', cmd])
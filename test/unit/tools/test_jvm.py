@@ -43,6 +43,7 @@ class TestJvmBuilder(CrossPlatformTestCase):
 
         self.assertEqual(jvm.family, 'jvm')
         self.assertEqual(jvm.can_dual_link, False)
+        self.assertEqual(jvm.can_share_objects, False)
 
         self.assertEqual(jvm.compiler.deps_flavor, None)
         self.assertEqual(jvm.compiler.needs_libs, True)